@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Rows generated per chunk; any row count is produced chunk by chunk so 1e8 rows never sit in memory
+GENERATOR_CHUNK_ROWS = 1_000_000
+
+FIRST_NAMES = np.array(["john", "jane", "alice", "bob", "maria", "li", "ahmed", "olga", "sam", "noor"])
+LAST_NAMES = np.array(["smith", "doe", "garcia", "chen", "khan", "ivanova", "brown", "silva"])
+
+
+def etl_chunks(rows, seed=0, null_rate=0.02, duplicate_rate=0.05, outlier_rate=0.01, chunk_rows=GENERATOR_CHUNK_ROWS):
+    """Yield DataFrames with the ETL schema (id, email, amount, name, transaction_date), ``rows`` in total.
+
+    - ``null_rate`` of emails, amounts, names and dates are missing (ids never are, since
+      ETL.transform_data rejects them)
+    - ``duplicate_rate`` of the rows repeat a row from the same or the previous chunk
+    - ``outlier_rate`` of the amounts are far outside the normal range
+    - some emails contain characters the transform strips
+
+    Chunk ``i`` depends only on ``seed``, ``i`` and ``chunk_rows``, so the same arguments
+    always produce the same data.
+    """
+    previous = None
+    for index, start in enumerate(range(0, rows, chunk_rows)):
+        rng = np.random.default_rng([seed, index])
+        n = min(chunk_rows, rows - start)
+        unique = n - int(n * duplicate_rate)
+        ids = np.arange(start, start + unique)
+
+        email_user = np.char.add("user", ids.astype(str))
+        dirty = rng.random(unique) < 0.1
+        email_domain = np.where(dirty, "@ex#ample.com", "@example.com")
+        amount = rng.lognormal(4, 0.5, unique).round(2)
+        outliers = rng.random(unique) < outlier_rate
+        amount[outliers] *= rng.uniform(50, 500, outliers.sum())
+        name = np.char.add(np.char.add(rng.choice(FIRST_NAMES, unique), " "), rng.choice(LAST_NAMES, unique))
+        seconds = rng.integers(0, 3 * 365 * 86400, unique)
+        dates = (np.datetime64("2022-01-01T00:00:00") + seconds.astype("timedelta64[s]")).astype("datetime64[s]")
+
+        chunk = pd.DataFrame({
+            "id": ids,
+            "email": np.char.add(email_user, email_domain).astype(object),
+            "amount": amount,
+            "name": name.astype(object),
+            "transaction_date": np.datetime_as_string(dates, unit="s").astype(object),
+        })
+        for col in ("email", "amount", "name", "transaction_date"):
+            chunk.loc[rng.random(unique) < null_rate, col] = None
+
+        pool = chunk if previous is None else pd.concat([previous, chunk], ignore_index=True)
+        duplicates = pool.iloc[rng.integers(0, len(pool), n - unique)]
+        chunk = pd.concat([chunk, duplicates], ignore_index=True)
+        chunk = chunk.iloc[rng.permutation(len(chunk))].reset_index(drop=True)
+        previous = chunk
+        yield chunk
+
+
+def etl_frame(rows, seed=0, **options):
+    """All of etl_chunks as one DataFrame."""
+    return pd.concat(etl_chunks(rows, seed, **options), ignore_index=True)
+
+
+def anomaly_frame(rows, seed=0, contamination=0.1, features=2):
+    """Feature matrix with labelled outliers, like isolation_forest.generate_synthetic_data at scale.
+
+    Inliers are N(0, 1) and outliers N(5, 1) in every feature; ``true_labels`` is 1 for
+    inliers and -1 for outliers.
+    """
+    rng = np.random.default_rng(seed)
+    outliers = int(rows * contamination)
+    data = np.concatenate([rng.normal(0, 1, size=(rows - outliers, features)),
+                           rng.normal(5, 1, size=(outliers, features))])
+    df = pd.DataFrame(data, columns=[f"Feature{i + 1}" for i in range(features)])
+    df["true_labels"] = [1] * (rows - outliers) + [-1] * outliers
+    return df
+
+
+def write_source(path, source_type, rows, seed=0, engine=None, **options):
+    """Write a generated dataset as a CSV file, Parquet or Feather dataset, or database table."""
+    for index, chunk in enumerate(etl_chunks(rows, seed, **options)):
+        if source_type == "file":
+            chunk.to_csv(path, mode="a" if index else "w", header=not index, index=False)
+        elif source_type in ("parquet", "feather"):
+            os.makedirs(path, exist_ok=True)
+            part = os.path.join(path, f"part-{index:05d}.{source_type}")
+            chunk.to_parquet(part, index=False) if source_type == "parquet" else chunk.to_feather(part)
+        elif source_type == "database":
+            chunk.to_sql(path, engine, if_exists="append" if index else "replace", index=False, chunksize=50000)
+        else:
+            raise ValueError(f"Unsupported source type: {source_type}")
@@ -0,0 +1,300 @@
+"""Reproducible benchmarks for the ETL pipeline, the preprocessing transforms and isolation forest.
+
+Every dataset comes from the seeded generators in datagen.py, so two runs at the same
+scale see identical data. Results are written as sorted JSON under benchmarks/results,
+named after the current commit, so comparing two commits is a diff (or ``--compare``)::
+
+    python benchmarks/run_benchmarks.py --rows 1e5 1e6
+    python benchmarks/run_benchmarks.py --rows 1e7 --suites etl --pairs all
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/abc1234.json benchmarks/results/def5678.json
+
+Database sources and sinks use DATABASE_URL; point it at Postgres to time the COPY load path
+instead of the batched inserts used elsewhere.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path[:0] = [BENCHMARK_DIR, os.path.join(REPO_DIR, "pipline_automation"), os.path.join(REPO_DIR, "outlier_detection")]
+
+from datagen import GENERATOR_CHUNK_ROWS, anomaly_frame, etl_frame, write_source  # noqa: E402
+
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+
+SOURCE_TYPES = ("file", "parquet", "feather", "database")
+
+# From this many rows the ETL runs stream in chunks instead of loading the whole source
+STREAMING_ROWS = 5_000_000
+
+# Rows the isolation forest is tuned on; every grid point fits a forest, so tuning does not scale with --rows
+TUNE_ROWS = 100_000
+
+# Rows the in-memory transforms are compared on; both hold the whole frame, so they do not scale with --rows
+TRANSFORM_ROWS = 5_000_000
+
+# Rows scored per decision_function call when timing isolation forest scoring
+SCORE_CHUNK_ROWS = 1_000_000
+
+# Relative wall-time change --compare reports as a regression or improvement
+COMPARE_THRESHOLD = 0.10
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _meta(label):
+    import sklearn
+    return {
+        "label": label,
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def etl_pairs(all_pairs=False):
+    """Source/destination pairs to run: every source into Parquet and CSV into every sink, or all of them."""
+    if all_pairs:
+        return [(source, sink) for source in SOURCE_TYPES for sink in SOURCE_TYPES]
+    return [(source, "parquet") for source in SOURCE_TYPES] + \
+        [("file", sink) for sink in SOURCE_TYPES if sink != "parquet"]
+
+
+def _source_path(workdir, source_type, rows):
+    if source_type == "database":
+        return f"bench_source_{rows}"
+    return os.path.join(workdir, f"{source_type}_source_{rows}" + (".csv" if source_type == "file" else ""))
+
+
+def _sink_path(workdir, source_type, sink_type):
+    if sink_type == "database":
+        return f"bench_{source_type}_sink"
+    return os.path.join(workdir, f"{source_type}_sink" + (".csv" if sink_type == "file" else ""))
+
+
+def _remove(path, engine, sink_type):
+    if sink_type == "database":
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f'DROP TABLE IF EXISTS "{path}"')
+    elif os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def _round(stats):
+    return {name: {field: round(value, 4) if isinstance(value, float) else value for field, value in values.items()}
+            for name, values in stats.items()}
+
+
+def bench_etl(rows, workdir, pairs, seed=0):
+    """Generate every source at ``rows`` and time each pair with the pipeline profiler."""
+    from etl import ETL
+    from pipeline_metrics import get_profiler
+
+    etl = ETL()
+    profiler = get_profiler()
+    profiler.enable()
+    chunksize = GENERATOR_CHUNK_ROWS if rows >= STREAMING_ROWS else None
+    results = {"chunksize": chunksize, "database": etl.engine.dialect.name, "generate_seconds": {}, "pairs": {}}
+
+    for source_type in sorted({source for source, _ in pairs}):
+        start = time.perf_counter()
+        write_source(_source_path(workdir, source_type, rows), source_type, rows, seed, engine=etl.engine)
+        results["generate_seconds"][source_type] = round(time.perf_counter() - start, 4)
+
+    for source_type, sink_type in pairs:
+        destination = _sink_path(workdir, source_type, sink_type)
+        _remove(destination, etl.engine, sink_type)
+        profiler.reset()
+        start = time.perf_counter()
+        etl.run_pipeline(_source_path(workdir, source_type, rows), destination, source_type, sink_type,
+                         chunksize=chunksize)
+        wall = time.perf_counter() - start
+        if not etl._destination_exists(destination, sink_type):
+            raise RuntimeError(f"{source_type} -> {sink_type} produced no output at {rows} rows")
+        results["pairs"][f"{source_type}->{sink_type}"] = {"wall_seconds": round(wall, 4),
+                                                            "stages": _round(profiler.to_dict())}
+        _remove(destination, etl.engine, sink_type)
+    profiler.disable()
+    return results
+
+
+def bench_transform(rows, seed=0):
+    """Time transform_data_stepwise against the compiled TransformPlan on up to TRANSFORM_ROWS rows."""
+    from more_on_preprocessing import build_default_plan, transform_data_stepwise
+
+    transform_rows = min(rows, TRANSFORM_ROWS)
+    data = etl_frame(transform_rows, seed)
+    start = time.perf_counter()
+    expected = transform_data_stepwise(data.copy())
+    stepwise_seconds = time.perf_counter() - start
+
+    plan = build_default_plan()
+    start = time.perf_counter()
+    actual = plan.run(data)
+    plan_seconds = time.perf_counter() - start
+    try:
+        pd.testing.assert_frame_equal(actual, expected)
+    except AssertionError as e:
+        raise RuntimeError(f"TransformPlan and transform_data_stepwise differ at {transform_rows} rows: {e}")
+
+    return {
+        "rows": transform_rows,
+        "output_rows": len(actual),
+        "stepwise_seconds": round(stepwise_seconds, 4),
+        "plan_seconds": round(plan_seconds, 4),
+        "speedup": round(stepwise_seconds / plan_seconds, 2) if plan_seconds else None,
+    }
+
+
+def bench_isolation_forest(rows, seed=0):
+    """Time the parameter search on up to TUNE_ROWS rows, then fitting and scoring ``rows`` rows."""
+    from sklearn.ensemble import IsolationForest
+    from isolation_forest import tune_isolation_forest
+
+    columns = ["Feature1", "Feature2"]
+    tune_rows = min(rows, TUNE_ROWS)
+    data = anomaly_frame(tune_rows, seed)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        best_params = tune_isolation_forest(data, columns)
+    tune_seconds = time.perf_counter() - start
+
+    model = IsolationForest(random_state=42, **best_params)
+    start = time.perf_counter()
+    model.fit(data[columns])
+    fit_seconds = time.perf_counter() - start
+
+    score_seconds = 0.0
+    for index, offset in enumerate(range(0, rows, SCORE_CHUNK_ROWS)):
+        chunk = anomaly_frame(min(SCORE_CHUNK_ROWS, rows - offset), seed + index + 1)
+        start = time.perf_counter()
+        model.decision_function(chunk[columns])
+        score_seconds += time.perf_counter() - start
+
+    return {
+        "tune_rows": tune_rows,
+        "tune_seconds": round(tune_seconds, 4),
+        "best_params": best_params,
+        "fit_seconds": round(fit_seconds, 4),
+        "score_rows": rows,
+        "score_seconds": round(score_seconds, 4),
+        "score_rows_per_second": round(rows / score_seconds) if score_seconds else None,
+    }
+
+
+def run(scales, suites, all_pairs=False, label=None, seed=0, workdir=None):
+    own_workdir = workdir is None
+    workdir = workdir or tempfile.mkdtemp(prefix="etl_bench_")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    os.environ.setdefault("ETL_STATE_DIR", os.path.join(workdir, "state"))
+    results = {"meta": _meta(label), "scales": {}}
+    try:
+        for rows in scales:
+            scale = results["scales"][str(rows)] = {}
+            if "etl" in suites:
+                print(f"etl: {rows} rows", file=sys.stderr)
+                scale["etl"] = bench_etl(rows, workdir, etl_pairs(all_pairs), seed)
+            if "transform" in suites:
+                print(f"transform: {min(rows, TRANSFORM_ROWS)} rows", file=sys.stderr)
+                scale["transform"] = bench_transform(rows, seed)
+            if "isolation_forest" in suites:
+                print(f"isolation_forest: {rows} rows", file=sys.stderr)
+                scale["isolation_forest"] = bench_isolation_forest(rows, seed)
+    finally:
+        if own_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def write_results(results, path=None):
+    path = path or os.path.join(RESULTS_DIR, f"{results['meta']['label'] or results['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return path
+
+
+def _timings(node, prefix=""):
+    """Flatten every ``*_seconds`` value of a results tree into {path: seconds}."""
+    timings = {}
+    for key, value in node.items():
+        path = f"{prefix}/{key}" if prefix else key
+        if isinstance(value, dict):
+            timings.update(_timings(value, path))
+        elif key.endswith("seconds") and isinstance(value, (int, float)):
+            timings[path] = value
+    return timings
+
+
+def compare(old, new, threshold=COMPARE_THRESHOLD):
+    """Timings that changed by more than ``threshold`` between two results, as (path, old, new, change)."""
+    old_timings, new_timings = _timings(old["scales"]), _timings(new["scales"])
+    changes = []
+    for path in sorted(old_timings.keys() & new_timings.keys()):
+        before, after = old_timings[path], new_timings[path]
+        if before > 0 and abs(after - before) / before > threshold:
+            changes.append((path, before, after, (after - before) / before))
+    return changes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", nargs="+", default=["1e5"], help="Row counts to run, e.g. 1e5 1e6 1e7 1e8")
+    parser.add_argument("--suites", nargs="+", default=["etl", "transform", "isolation_forest"],
+                        choices=["etl", "transform", "isolation_forest"])
+    parser.add_argument("--pairs", choices=["default", "all"], default="default",
+                        help="default: every source into Parquet and CSV into every sink; all: every combination")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--label", help="Name of the results file (default: the short commit hash)")
+    parser.add_argument("--output", help="Write results here instead of benchmarks/results/<label>.json")
+    parser.add_argument("--workdir", help="Keep generated data here instead of a temporary directory")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="Report timings that changed between two results files and exit")
+    parser.add_argument("--threshold", type=float, default=COMPARE_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            old = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        changes = compare(old, new, args.threshold)
+        for path, before, after, change in changes:
+            print(f"{'REGRESSION' if change > 0 else 'improved  '} {change:+7.1%}  {before:10.3f}s -> {after:10.3f}s  {path}")
+        if not changes:
+            print(f"No timing changed by more than {args.threshold:.0%}.")
+        return 1 if any(change > 0 for *_, change in changes) else 0
+
+    scales = [int(float(rows)) for rows in args.rows]
+    results = run(scales, args.suites, args.pairs == "all", args.label, args.seed, args.workdir)
+    print(write_results(results, args.output))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import sklearn
+from sklearn.ensemble import IsolationForest
+
+logger = logging.getLogger(__name__)
+
+# Rows read and scored at a time
+SCORE_CHUNK_ROWS = 500_000
+
+# Rows the forest is fitted on; isolation trees only look at max_samples rows each, so a
+# uniform sample fits as well as the full data
+RESERVOIR_ROWS = 200_000
+
+# Chunks waiting for a scoring process per worker, so reading stays ahead without holding the whole source
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+
+def iter_chunks(source, chunksize=SCORE_CHUNK_ROWS, columns=None):
+    """Stream a CSV file, a Parquet file or dataset directory, or a glob of CSV files as DataFrames."""
+    if os.path.isdir(source) or source.endswith(".parquet"):
+        dataset = ds.dataset(source, format="parquet", partitioning="hive")
+        for batch in dataset.to_batches(columns=columns, batch_size=chunksize):
+            if batch.num_rows:
+                yield batch.to_pandas()
+        return
+    paths = sorted(glob.glob(source)) if glob.has_magic(source) else [source]
+    for path in paths:
+        for chunk in pd.read_csv(path, chunksize=chunksize, usecols=columns):
+            if len(chunk):
+                yield chunk
+
+
+def reservoir_sample(chunks, size=RESERVOIR_ROWS, seed=42):
+    """Uniform sample of ``size`` rows from a stream of DataFrames in one pass (Algorithm R).
+
+    Returns the sample and the number of rows seen.
+    """
+    rng = np.random.default_rng(seed)
+    reservoir = None
+    seen = 0
+    for chunk in chunks:
+        chunk = chunk.reset_index(drop=True)
+        if reservoir is None or len(reservoir) < size:
+            room = size - (0 if reservoir is None else len(reservoir))
+            head = chunk.iloc[:room]
+            reservoir = head if reservoir is None else pd.concat([reservoir, head], ignore_index=True)
+            seen += len(head)
+            chunk = chunk.iloc[room:].reset_index(drop=True)
+        if len(chunk):
+            # Row i of the stream replaces a random slot with probability size / (i + 1)
+            slots = rng.integers(0, seen + np.arange(len(chunk)) + 1)
+            accepted = np.flatnonzero(slots < size)
+            # Where two rows land in the same slot the later one wins, as it would row by row
+            slots, last = np.unique(slots[accepted][::-1], return_index=True)
+            reservoir.loc[slots] = chunk.iloc[accepted[::-1][last]].set_axis(slots)
+            seen += len(chunk)
+    return reservoir, seen
+
+
+def source_signature(source):
+    """Sizes and modification times of the files behind ``source``; changes when the data does."""
+    if os.path.isdir(source):
+        paths = sorted(os.path.join(root, name) for root, _, names in os.walk(source) for name in names)
+    else:
+        paths = sorted(glob.glob(source)) if glob.has_magic(source) else [source]
+    return [[path, os.stat(path).st_size, os.stat(path).st_mtime_ns] for path in paths]
+
+
+class ModelCache:
+    """Fitted models saved as numbered versions under ``cache_dir/<name>/v0001`` and so on.
+
+    Each version holds the joblib-pickled model and a meta.json with its threshold, columns,
+    parameters, sklearn version and a key identifying what it was fitted on, so a run over
+    unchanged data reuses the model instead of fitting again. Pickles only load safely into
+    the sklearn version that wrote them, so other versions never match.
+    """
+
+    def __init__(self, cache_dir="models"):
+        self.cache_dir = cache_dir
+
+    def versions(self, name):
+        path = os.path.join(self.cache_dir, name)
+        if not os.path.isdir(path):
+            return []
+        return sorted(int(entry[1:]) for entry in os.listdir(path) if entry.startswith("v") and entry[1:].isdigit())
+
+    def _dir(self, name, version):
+        return os.path.join(self.cache_dir, name, f"v{version:04d}")
+
+    def save(self, name, model, threshold, columns, key=None, **metadata):
+        version = (self.versions(name) or [0])[-1] + 1
+        path = self._dir(name, version)
+        os.makedirs(path)
+        joblib.dump(model, os.path.join(path, "model.joblib"))
+        meta = {
+            "name": name,
+            "version": version,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "threshold": float(threshold),
+            "columns": list(columns),
+            "key": key,
+            "sklearn": sklearn.__version__,
+            **metadata,
+        }
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2, default=str)
+        return meta
+
+    def meta(self, name, version=None):
+        version = version or (self.versions(name) or [None])[-1]
+        if version is None:
+            return None
+        with open(os.path.join(self._dir(name, version), "meta.json")) as f:
+            return json.load(f)
+
+    def load(self, name, version=None):
+        """(model, meta) of ``version``, by default the latest."""
+        meta = self.meta(name, version)
+        if meta is None:
+            raise FileNotFoundError(f"No saved model named {name!r} in {self.cache_dir}")
+        return joblib.load(os.path.join(self._dir(name, meta["version"]), "model.joblib")), meta
+
+    def find(self, name, key):
+        """Latest version fitted with ``key`` by this sklearn version, or None."""
+        for version in reversed(self.versions(name)):
+            meta = self.meta(name, version)
+            if meta["key"] == key and meta["sklearn"] == sklearn.__version__:
+                return self.load(name, version)
+        return None
+
+
+def fit_model(source, columns, params, cache=None, name="isolation_forest", sample_rows=RESERVOIR_ROWS,
+              chunksize=SCORE_CHUNK_ROWS, random_state=42):
+    """Fit an IsolationForest on a reservoir sample of ``source`` and save it in ``cache``.
+
+    ``params`` are the forest parameters, for example from tune_isolation_forest (a
+    fractional ``max_samples`` is a share of the sample). The threshold is the forest's
+    ``offset_``, which ``contamination`` puts at that share of the sample. If ``cache``
+    already has a model fitted on the same data, columns, parameters and sample size, it
+    is returned instead. Returns (model, meta); raises ValueError if ``source`` has no rows.
+    """
+    key = hashlib.sha256(json.dumps([source_signature(source), list(columns), params, sample_rows, random_state],
+                                    sort_keys=True).encode()).hexdigest()
+    if cache is not None:
+        found = cache.find(name, key)
+        if found is not None:
+            logger.info(f"Reusing {name} v{found[1]['version']}, fitted on the same data")
+            return found
+
+    start = time.perf_counter()
+    sample, seen = reservoir_sample(iter_chunks(source, chunksize, columns), sample_rows, random_state)
+    if not seen:
+        raise ValueError(f"No rows to fit {name} on in {source}.")
+    model = IsolationForest(random_state=random_state, **params)
+    model.fit(sample[columns].to_numpy())
+    logger.info(f"Fitted on {len(sample)} of {seen} rows in {time.perf_counter() - start:.1f}s")
+
+    metadata = {"params": params, "sample_rows": len(sample), "source_rows": seen, "source": source}
+    if cache is None:
+        return model, {"threshold": float(model.offset_), "columns": list(columns), "key": key, **metadata}
+    meta = cache.save(name, model, model.offset_, columns, key, **metadata)
+    logger.info(f"Saved {name} v{meta['version']} to {cache.cache_dir}")
+    return model, meta
+
+
+_model = None
+
+
+def _init_worker(model):
+    global _model
+    _model = model
+
+
+def _score(features):
+    start = time.perf_counter()
+    scores = _model.score_samples(features)
+    return scores, time.perf_counter() - start
+
+
+class _Done:
+    """Already-computed stand-in for a Future when scoring in this process."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def result(self):
+        return self.value
+
+
+class _ChunkWriter:
+    """Append DataFrames to a CSV file, or to a Parquet file with the schema of the first chunk."""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.endswith(".parquet")
+        self.writer = None
+        self.rows = 0
+
+    def write(self, df):
+        if self.parquet:
+            if self.writer is None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                self.writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                table = pa.Table.from_pandas(df, schema=self.writer.schema, preserve_index=False)
+            self.writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode="a" if self.rows else "w", header=not self.rows, index=False)
+        self.rows += len(df)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        elif not self.rows and not self.parquet:
+            open(self.path, "w").close()
+
+
+def score_source(source, model, threshold, columns, inliers_path=None, outliers_path=None,
+                 chunksize=SCORE_CHUNK_ROWS, workers=None, score_column=None):
+    """Score every row of ``source`` and write inliers and outliers as they are scored.
+
+    Chunks are scored on ``workers`` processes (default: all CPUs; 1 scores in this
+    process), each holding one copy of the model, while this process reads ahead and
+    writes finished chunks in source order. Rows scoring below ``threshold`` are outliers.
+    Output paths ending in .parquet are written as Parquet, anything else as CSV. With
+    ``score_column`` the score is written out too.
+
+    Returns counts and throughput: ``rows_per_second`` over the wall-clock time of the
+    whole pass and ``rows_per_second_per_core`` over the time spent inside score_samples.
+    """
+    workers = workers or os.cpu_count()
+    writers = [_ChunkWriter(path) if path else None for path in (inliers_path, outliers_path)]
+    executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(model,)) if workers > 1 else None
+    if executor is None:
+        _init_worker(model)
+    submit = executor.submit if executor else lambda func, arg: _Done(func(arg))
+    stats = {"rows": 0, "inliers": 0, "outliers": 0, "score_seconds": 0.0}
+    start = time.perf_counter()
+
+    def finish(chunk, future):
+        scores, seconds = future.result()
+        outlier = scores < threshold
+        if score_column:
+            chunk = chunk.assign(**{score_column: scores})
+        for writer, mask in zip(writers, (~outlier, outlier)):
+            if writer is not None:
+                writer.write(chunk[mask])
+        stats["rows"] += len(chunk)
+        stats["outliers"] += int(outlier.sum())
+        stats["score_seconds"] += seconds
+
+    try:
+        in_flight = deque()
+        for chunk in iter_chunks(source, chunksize):
+            in_flight.append((chunk, submit(_score, chunk[columns].to_numpy())))
+            if len(in_flight) >= workers * CHUNKS_IN_FLIGHT_PER_WORKER:
+                finish(*in_flight.popleft())
+        while in_flight:
+            finish(*in_flight.popleft())
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        for writer in writers:
+            if writer is not None:
+                writer.close()
+
+    stats["inliers"] = stats["rows"] - stats["outliers"]
+    stats["seconds"] = time.perf_counter() - start
+    stats["workers"] = workers
+    stats["rows_per_second"] = stats["rows"] / stats["seconds"] if stats["seconds"] else None
+    stats["rows_per_second_per_core"] = stats["rows"] / stats["score_seconds"] if stats["score_seconds"] else None
+    throughput = stats["rows_per_second_per_core"]
+    logger.info(f"Scored {stats['rows']} rows ({stats['outliers']} outliers) in {stats['seconds']:.1f}s"
+                + (f", {throughput:,.0f} rows/s per core" if throughput else ""))
+    return stats
+
+
+def run(source, columns, params, inliers_path, outliers_path=None, cache_dir="models", name="isolation_forest",
+        workers=None, chunksize=SCORE_CHUNK_ROWS):
+    """Fit (or reuse) a model for ``source`` and split it into inliers and outliers."""
+    model, meta = fit_model(source, columns, params, ModelCache(cache_dir), name, chunksize=chunksize)
+    stats = score_source(source, model, meta["threshold"], columns, inliers_path, outliers_path, chunksize, workers)
+    return {"model_version": meta["version"], **stats}
+
+
+# Example usage
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    rng = np.random.default_rng(0)
+    rows = 2_000_000
+    pd.DataFrame({
+        "Feature1": np.concatenate([rng.normal(0, 1, rows - rows // 10), rng.normal(5, 1, rows // 10)]),
+        "Feature2": np.concatenate([rng.normal(0, 1, rows - rows // 10), rng.normal(5, 1, rows // 10)]),
+    }).to_csv("scoring_input.csv", index=False)
+    params = {"n_estimators": 100, "contamination": 0.1, "max_samples": 0.5, "max_features": 1.0}
+    print(run("scoring_input.csv", ["Feature1", "Feature2"], params, "inliers.csv", "outliers.csv"))
@@ -1,9 +1,11 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import IsolationForest
 from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score, roc_curve
 from sklearn.model_selection import ParameterGrid
-import matplotlib.pyplot as plt
 
 def generate_synthetic_data():
     np.random.seed(42)
@@ -16,30 +18,103 @@ def generate_synthetic_data():
     df['true_labels'] = [1] * 100 + [-1] * 10  # 1 = inlier, -1 = outlier
     return df
 
-def tune_isolation_forest(data, columns):
-    param_grid = {
-        'n_estimators': [50, 100, 200],
-        'contamination': [0.05, 0.1, 0.2],
-        'max_samples': [0.5, 1.0],
-        'max_features': [0.5, 1.0]
-    }
+PARAM_GRID = {
+    'n_estimators': [50, 100, 200],
+    'contamination': [0.05, 0.1, 0.2],
+    'max_samples': [0.5, 1.0],
+    'max_features': [0.5, 1.0]
+}
+
+# Successive halving keeps the best 1/HALVING_FACTOR of the candidates per round and grows the sample by the same factor
+HALVING_FACTOR = 3
+HALVING_MIN_ROWS = 1000
+
+def _score_chain(X, max_samples, max_features, n_estimators, random_state=42):
+    # Grow one forest with warm_start and score X at each size: with a fixed random_state the
+    # first 50 trees of a 200-tree forest are exactly a 50-tree forest, so the smaller sizes are free
+    iso_forest = IsolationForest(max_samples=max_samples, max_features=max_features,
+                                 random_state=random_state, warm_start=True)
+    scores = {}
+    for n in sorted(n_estimators):
+        iso_forest.set_params(n_estimators=n)
+        iso_forest.fit(X)
+        scores[n] = iso_forest.score_samples(X)
+    return scores
+
+def _contamination_aucs(scores, inlier, contaminations):
+    # fit_predict with contamination c flags the scores below their c-th percentile, so every
+    # cut comes from one set of scores; the AUC of a 0/1 prediction is (TPR + TNR) / 2
+    thresholds = np.percentile(scores, 100 * np.asarray(contaminations))
+    predicted_inlier = scores[None, :] >= thresholds[:, None]
+    tpr = predicted_inlier[:, inlier].mean(axis=1)
+    tnr = (~predicted_inlier[:, ~inlier]).mean(axis=1)
+    return (tpr + tnr) / 2
+
+def _evaluate(X, inlier, candidates, contaminations, workers, random_state=42):
+    """AUC of every candidate (n_estimators, max_samples, max_features) at every contamination.
+
+    Returns {candidate: (threshold-free AUC of the scores, [AUC per contamination])}.
+    """
+    chains = {}
+    for n, max_samples, max_features in candidates:
+        chains.setdefault((max_samples, max_features), []).append(n)
+    if workers == 1 or len(chains) == 1:
+        scored = {key: _score_chain(X, *key, sizes, random_state) for key, sizes in chains.items()}
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count(), len(chains))) as executor:
+            futures = {key: executor.submit(_score_chain, X, *key, sizes, random_state) for key, sizes in chains.items()}
+            scored = {key: future.result() for key, future in futures.items()}
+    results = {}
+    for (max_samples, max_features), chain in scored.items():
+        for n, scores in chain.items():
+            results[(n, max_samples, max_features)] = (roc_auc_score(inlier, scores),
+                                                       _contamination_aucs(scores, inlier, contaminations))
+    return results
+
+def _halve(X, inlier, candidates, contaminations, workers, random_state=42):
+    # Score every candidate on a small sample, keep the best third and triple the sample, until
+    # a few candidates are left for the full data
+    rng = np.random.default_rng(random_state)
+    rows = len(X)
+    rounds = 0
+    while rows // HALVING_FACTOR ** (rounds + 1) >= HALVING_MIN_ROWS and \
+            len(candidates) > HALVING_FACTOR ** (rounds + 1):
+        rounds += 1
+    for r in range(rounds, 0, -1):
+        sample = rng.choice(len(X), rows // HALVING_FACTOR ** r, replace=False)
+        results = _evaluate(X[sample], inlier[sample], candidates, contaminations, workers, random_state)
+        ranked = sorted(candidates, key=lambda c: results[c][1].max(), reverse=True)
+        candidates = ranked[:max(1, len(candidates) // HALVING_FACTOR)]
+        print(f"Halving: {len(sample)} rows, kept {len(candidates)} of {len(ranked)} candidates")
+    return candidates
+
+def tune_isolation_forest(data, columns, param_grid=None, workers=None, halving=False, random_state=42):
+    """Grid search IsolationForest parameters by ROC AUC against ``data['true_labels']``.
+
+    Picks the same parameters as fitting every grid point, but fits one forest per
+    (max_samples, max_features) pair on a process pool of ``workers`` (default: all CPUs)
+    and derives every n_estimators and contamination from its scores. With ``halving``,
+    candidates are first weeded out on growing subsamples. ``data`` is left unchanged.
+    """
+    param_grid = param_grid or PARAM_GRID
+    X = data[columns].to_numpy()
+    inlier = (data['true_labels'] == 1).to_numpy()
+    contaminations = list(param_grid['contamination'])
+    candidates = [(params['n_estimators'], params['max_samples'], params['max_features'])
+                  for params in ParameterGrid({k: v for k, v in param_grid.items() if k != 'contamination'})]
+    if halving:
+        candidates = _halve(X, inlier, candidates, contaminations, workers, random_state)
+    results = _evaluate(X, inlier, candidates, contaminations, workers, random_state)
 
     best_params = None
     best_auc = -1
-
     for params in ParameterGrid(param_grid):
-        iso_forest = IsolationForest(
-            n_estimators=params['n_estimators'],
-            contamination=params['contamination'],
-            max_samples=params['max_samples'],
-            max_features=params['max_features'],
-            random_state=42
-        )
-
-        data['anomaly'] = iso_forest.fit_predict(data[columns])
-        y_pred = data['anomaly']
-        auc = roc_auc_score(data['true_labels'].map({1: 1, -1: 0}), y_pred.map({1: 1, -1: 0}))
-        print(f"Params: {params}, AUC: {auc}")
+        candidate = (params['n_estimators'], params['max_samples'], params['max_features'])
+        if candidate not in results:
+            continue
+        score_auc, aucs = results[candidate]
+        auc = aucs[contaminations.index(params['contamination'])]
+        print(f"Params: {params}, AUC: {auc} (scores: {score_auc:.4f})")
 
         if auc > best_auc:
             best_auc = auc
@@ -61,6 +136,8 @@ def train_final_model(data, columns, best_params):
     return data
 
 def evaluate_model(data):
+    import matplotlib.pyplot as plt
+
     y_true = data['true_labels']
     y_pred = data['anomaly']
 
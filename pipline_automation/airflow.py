@@ -1,47 +1,280 @@
-from datetime import datetime, timedelta
+"""Airflow DAGs built from pipeline configs, one mapped ETL task per source partition.
+
+Every entry of the JSON list at ``ETL_PIPELINES`` (default: pipelines.json next to this
+file) becomes a DAG of three steps:
+
+- ``discover`` lists the source's partitions: the files of a glob or directory, key
+  ranges of a table, or the days of the run's data interval;
+- ``etl_partition``, mapped over them, extracts and transforms one partition and stages
+  the result as a Parquet file under ``ETL_STAGING_DIR`` (a disk every worker can reach),
+  so only paths and row counts go through XCom;
+- ``publish`` loads the staged partitions into the destination in partition order and
+  removes them.
+
+A failed partition is retried on its own, and clearing it reruns only that partition;
+partitions already staged for the run are reused. As with ``per_file`` runs, duplicates
+and outliers are judged within each partition (rows with the same key always share a
+range, so range and date partitions still drop every duplicate).
+
+To try a DAG locally with the sequential executor::
+
+    export AIRFLOW__CORE__DAGS_FOLDER=pipline_automation AIRFLOW__CORE__EXECUTOR=SequentialExecutor
+    export DATABASE_URL=sqlite:///etl.db ETL_STAGING_DIR=/tmp/etl_staging
+    airflow db migrate
+    airflow pools set etl 4 "ETL partitions"
+    airflow dags test etl_transactions_files 2024-01-01
+
+Sources with more partitions than Airflow's ``[core] max_map_length`` (1024) need it raised.
+"""
+import decimal
+import json
+import logging
+import os
+import re
+import shutil
+from datetime import date, datetime, timedelta
+
+import pendulum
 from airflow import DAG
-from airflow.operators.python_operator import PythonOperator
-
-# Default arguments for the DAG
-default_args = {
-    "owner": "alex",
-    "depends_on_past": False,
-    "email_on_failure": False,
-    "email_on_retry": False,
-    "retries": 1,
-    "retry_delay": timedelta(minutes=5),
-}
-
-# Define the DAG
-with DAG(
-        dag_id="example_python_dag",
-        default_args=default_args,
-        description="A simple Python DAG",
-        schedule_interval=timedelta(days=1),  # Run every day
-        start_date=datetime(2023, 12, 1),  # Start date for the DAG
-        catchup=False,  # Don't run for previous dates
-        tags=["example"],
-) as dag:
-    # Define a Python function to be called by the PythonOperator
-    def print_hello():
-        print("Hello, Airflow!")
-
-
-    # Define the tasks
-    task_1 = PythonOperator(
-        task_id="task_1",
-        python_callable=print_hello,  # Call the function
-    )
-
-
-    def print_goodbye():
-        print("Goodbye, Airflow!")
-
-
-    task_2 = PythonOperator(
-        task_id="task_2",
-        python_callable=print_goodbye,
-    )
-
-    # Define task dependencies
-    task_1 >> task_2  # task_1 must run before task_2
+from airflow.decorators import task
+from airflow.exceptions import AirflowFailException
+from airflow.operators.python import get_current_context
+
+logger = logging.getLogger(__name__)
+
+# JSON list of pipeline configs; one DAG is built per entry
+PIPELINES_PATH = os.getenv("ETL_PIPELINES", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                         "pipelines.json"))
+
+# Where partitions are staged between tasks; must be shared by every worker
+STAGING_DIR = os.getenv("ETL_STAGING_DIR", "/tmp/etl_staging")
+
+# Rows per batch when a staged partition is loaded into the destination
+PUBLISH_CHUNK_ROWS = 500_000
+
+# Files a file-partitioned source is split into, by source type
+DEFAULT_PATTERNS = {"file": "*.csv", "parquet": "*.parquet", "feather": "*.feather"}
+
+PARTITION_KINDS = ("files", "range", "date")
+
+
+def _plain(value):
+    """Range bound as a JSON value XCom can carry; databases compare the strings as literals."""
+    if isinstance(value, (datetime, date, decimal.Decimal)):
+        return str(value)
+    return value
+
+
+def _moment(value):
+    """A date-interval bound as a date when it falls on midnight, else a timestamp."""
+    return value.strftime("%Y-%m-%d" if (value.hour, value.minute, value.second) == (0, 0, 0)
+                          else "%Y-%m-%d %H:%M:%S")
+
+
+def check_config(config):
+    """Reject configs the DAG could not run, so they show up as import errors rather than failed runs."""
+    for key in ("dag_id", "source", "source_type", "destination", "destination_type"):
+        if key not in config:
+            raise ValueError(f"Pipeline config {config.get('dag_id', '?')} has no {key}.")
+    partition = config.get("partition", {})
+    kind = partition.get("by", "files")
+    if kind not in PARTITION_KINDS:
+        raise ValueError(f"Unsupported partitioning: {kind}. Use 'files', 'range' or 'date'.")
+    if kind == "files" and config["source_type"] not in DEFAULT_PATTERNS:
+        raise ValueError("File partitioning needs a 'file', 'parquet' or 'feather' source.")
+    if kind == "range" and config["source_type"] != "database":
+        raise ValueError("Range partitioning needs a 'database' source.")
+    if kind != "files" and config["source_type"] == "database" and "column" not in partition:
+        raise ValueError(f"{kind.capitalize()} partitioning of a table needs a partition column.")
+    if config["destination_type"] not in ("file", "database", "parquet", "feather"):
+        raise ValueError("Unsupported destination type. Use 'file', 'database', 'parquet' or 'feather'.")
+
+
+def discover_partitions(config, data_interval=None):
+    """The source's partitions as small JSON dicts: a ``path`` to read, or a ``where`` clause and ``params``.
+
+    ``data_interval`` is the run's (start, end), split into ``step_days`` long partitions for
+    date partitioning. A file source then names its path with a ``{date}`` placeholder,
+    filled in with ``format``.
+    """
+    # Imported here so parsing the DAG file does not load pandas and the database drivers
+    from etl import ETL
+
+    partition = config.get("partition", {})
+    kind = partition.get("by", "files")
+    source, source_type = config["source"], config["source_type"]
+    if kind == "files":
+        paths = ETL.resolve_paths(source, partition.get("pattern", DEFAULT_PATTERNS[source_type]))
+        return [{"id": path, "path": path} for path in paths]
+
+    if kind == "range":
+        ranges = ETL().partition_ranges(source, partition["column"], partition.get("partitions", 8),
+                                        partition.get("boundaries", "minmax"))
+        partitions = []
+        for where, params in ranges:
+            params = {name: _plain(value) for name, value in params.items()}
+            label = " ".join([where] + [f"{name}={value}" for name, value in params.items()])
+            partitions.append({"id": label, "where": where, "params": params})
+        return partitions
+
+    start, end = data_interval
+    step = timedelta(days=partition.get("step_days", 1))
+    partitions = []
+    while start < end:
+        stop = min(start + step, end)
+        if source_type == "database":
+            column = partition["column"]
+            partitions.append({"id": _moment(start), "where": f"{column} >= :low AND {column} < :high",
+                               "params": {"low": _moment(start), "high": _moment(stop)}})
+        else:
+            partitions.append({"id": _moment(start),
+                               "path": source.format(date=start.strftime(partition.get("format", "%Y-%m-%d")))})
+        start = stop
+    return partitions
+
+
+def staging_dir(config, run_id):
+    """Directory holding one DAG run's staged partitions."""
+    return os.path.join(config.get("staging_dir", STAGING_DIR), config["dag_id"], re.sub(r"[^\w.-]", "_", run_id))
+
+
+def run_partition(config, partition, staged_path):
+    """Extract and transform one partition into ``staged_path``; returns what publish needs to load it."""
+    import pyarrow.parquet as pq
+    from etl import ETL
+
+    if os.path.exists(staged_path):
+        # Staged by an earlier try of this run; the file only appears once it is complete
+        logger.info(f"Partition {partition['id']} is already staged, reusing {staged_path}")
+        return {"id": partition["id"], "path": staged_path, "rows": pq.ParquetFile(staged_path).metadata.num_rows}
+
+    etl = ETL()
+    source_options = config.get("source_options", {})
+    if "path" in partition:
+        extractors = {"file": etl.extract_file, "parquet": etl.extract_parquet, "feather": etl.extract_feather}
+        data = extractors[config["source_type"]](partition["path"], **source_options)
+    else:
+        column = config["partition"]["column"]
+        data = etl.extract_database_range(config["source"], column, partition["where"], partition["params"])
+    data = etl.transform_data(data)
+
+    os.makedirs(os.path.dirname(staged_path), exist_ok=True)
+    data.to_parquet(staged_path + ".tmp", index=False)
+    os.replace(staged_path + ".tmp", staged_path)
+    logger.info(f"Staged {len(data)} rows of partition {partition['id']} at {staged_path}")
+    return {"id": partition["id"], "path": staged_path, "rows": len(data)}
+
+
+def publish_partitions(config, staged, destination=None, run_dir=None):
+    """Load staged partitions in order into ``destination`` (default: the config's), replacing it.
+
+    ``run_dir``, the run's staging directory, is removed once everything is loaded.
+    """
+    from etl import ETL
+
+    etl = ETL()
+    loaders = {
+        "file": etl.load_to_file,
+        "database": etl.load_to_database,
+        "parquet": etl.load_to_parquet,
+        "feather": etl.load_to_feather
+    }
+    loader = loaders[config["destination_type"]]
+    destination = destination or config["destination"]
+    destination_options = config.get("destination_options", {})
+    loaded = 0
+    for partition in staged:
+        if not partition["rows"]:
+            continue
+        for chunk in etl.extract_parquet(partition["path"], chunksize=PUBLISH_CHUNK_ROWS):
+            loader(chunk, destination, append=loaded > 0, **destination_options)
+            loaded += len(chunk)
+    if not loaded:
+        logger.warning(f"No rows in any of {len(staged)} partition(s); {destination} was left as it was.")
+    if run_dir:
+        shutil.rmtree(run_dir, ignore_errors=True)
+    logger.info(f"Published {loaded} rows from {len(staged)} partition(s) to {destination}")
+    return loaded
+
+
+def build_dag(config):
+    """DAG running the pipeline described by ``config``.
+
+    Besides the source and destination (as for ETL.run_pipeline, plus ``source_options`` and
+    ``destination_options``), ``config`` may set:
+
+    - ``partition``: ``{"by": "files", "pattern": "*.csv"}``,
+      ``{"by": "range", "column": "id", "partitions": 16, "boundaries": "quantile"}`` or
+      ``{"by": "date", "column": "transaction_date", "step_days": 1}``
+    - ``pool`` and ``pool_slots`` for the partition tasks, ``max_active_partitions`` running
+      at once across runs, ``max_active_tasks`` and ``max_active_runs`` for the DAG
+    - ``retries``, ``retry_delay_minutes`` and ``retry_exponential_backoff`` per task
+    - ``schedule``, ``start_date``, ``catchup``, ``staging_dir``, ``owner`` and ``tags``
+
+    A ``{ds}`` in the destination is replaced by the run's logical date.
+    """
+    check_config(config)
+    default_args = {
+        "owner": config.get("owner", "etl"),
+        "depends_on_past": False,
+        "email_on_failure": False,
+        "email_on_retry": False,
+        "retries": config.get("retries", 3),
+        "retry_delay": timedelta(minutes=config.get("retry_delay_minutes", 5)),
+        "retry_exponential_backoff": config.get("retry_exponential_backoff", True),
+    }
+
+    with DAG(
+            dag_id=config["dag_id"],
+            default_args=default_args,
+            description=f"{config['source_type']} {config['source']} -> {config['destination_type']} "
+                        f"{config['destination']}",
+            schedule=config.get("schedule"),
+            start_date=pendulum.parse(config.get("start_date", "2024-01-01")),
+            catchup=config.get("catchup", False),
+            # One run at a time, since every run replaces the destination
+            max_active_runs=config.get("max_active_runs", 1),
+            max_active_tasks=config.get("max_active_tasks", 16),
+            tags=config.get("tags", ["etl"]),
+    ) as dag:
+        @task
+        def discover():
+            context = get_current_context()
+            partitions = discover_partitions(config, (context["data_interval_start"], context["data_interval_end"]))
+            logger.info(f"Found {len(partitions)} partition(s) of {config['source']}")
+            return partitions
+
+        @task(pool=config.get("pool", "default_pool"), pool_slots=config.get("pool_slots", 1),
+              max_active_tis_per_dag=config.get("max_active_partitions"))
+        def etl_partition(partition):
+            context = get_current_context()
+            staged_path = os.path.join(staging_dir(config, context["run_id"]),
+                                       f"part-{context['ti'].map_index:05d}.parquet")
+            try:
+                return run_partition(config, partition, staged_path)
+            except ValueError as e:
+                # Bad data (such as missing IDs) fails the same way on every try
+                raise AirflowFailException(f"Partition {partition['id']}: {e}") from e
+
+        @task
+        def publish(staged):
+            context = get_current_context()
+            # A "{ds}" in the destination gives every run (e.g. each day caught up) its own output
+            destination = config["destination"].replace("{ds}", context["ds"])
+            return publish_partitions(config, list(staged), destination, staging_dir(config, context["run_id"]))
+
+        publish(etl_partition.expand(partition=discover()))
+    return dag
+
+
+def load_pipelines(path=PIPELINES_PATH):
+    """Pipeline configs from ``path``, or none if it does not exist."""
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+# Register one DAG per pipeline config for the DagBag to pick up
+for pipeline_config in load_pipelines():
+    globals()[pipeline_config["dag_id"]] = build_dag(pipeline_config)
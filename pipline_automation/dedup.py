@@ -0,0 +1,298 @@
+import logging
+import math
+import os
+import pickle
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+# Hash every null hashes to, whichever dtype its column was read as
+_NULL_HASH = pd.util.hash_array(np.array([np.nan]))[0]
+
+# Hash pandas gives every null (None, NaN, NaT, NA) of an object, string or category column
+_OBJECT_NULL_HASH = np.uint64(2 ** 64 - 1)
+
+# infer_dtype results of object columns holding numbers, hashed as numbers
+_OBJECT_NUMBERS = ("integer", "floating", "mixed-integer-float", "boolean")
+
+
+def _numeric_hashes(series):
+    """Hash integral values as int64 and the rest as float64, whatever dtype the column has.
+
+    A chunk that happens to contain nulls reads an integer column as floats, so the same
+    value must hash equally either way; casting integers to float instead would merge
+    distinct ids above 2**53. Booleans hash as 0 and 1.
+    """
+    if series.dtype.kind in "iub":
+        return pd.util.hash_array(series.to_numpy(dtype="int64", na_value=0))
+    values = series.to_numpy(dtype="float64", na_value=np.nan)
+    hashes = pd.util.hash_array(values)
+    integral = np.isfinite(values) & (values == np.floor(values)) & (np.abs(values) < 2.0 ** 63)
+    hashes[integral] = pd.util.hash_array(values[integral].astype("int64"))
+    return hashes
+
+
+def _column_hashes(series):
+    """Hash of every value of a column that does not depend on the dtype a chunk inferred for it.
+
+    Nulls of any kind (NaN, None, NaT, NA) hash alike, numbers and booleans kept as
+    objects hash like the numeric column they would otherwise be, and strings hash alike
+    as object, string or category values.
+    """
+    kind = pd.api.types.infer_dtype(series, skipna=True) if series.dtype == object else None
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Code -1 (null) picks the null hash appended last
+        categories = _column_hashes(pd.Series(series.cat.categories, dtype=series.cat.categories.dtype))
+        return np.append(categories, _NULL_HASH)[series.cat.codes.to_numpy()]
+    if kind in _OBJECT_NUMBERS:
+        if kind == "integer":
+            series = pd.Series(pd.array(series, dtype="Int64"))
+        elif kind == "boolean":
+            series = pd.Series(pd.array(series, dtype="boolean"))
+        else:
+            series = pd.to_numeric(series)
+    if series.dtype.kind in "iufb":
+        hashes = _numeric_hashes(series)
+        hashes[series.isna().to_numpy()] = _NULL_HASH
+    elif series.dtype.kind in "mM":
+        hashes = pd.util.hash_pandas_object(series, index=False).to_numpy()
+        hashes[series.isna().to_numpy()] = _NULL_HASH
+    else:
+        hashes = pd.util.hash_pandas_object(series, index=False).to_numpy()
+        hashes[hashes == _OBJECT_NULL_HASH] = _NULL_HASH
+    return hashes
+
+
+def row_hashes(chunk):
+    """64-bit hash of every row's values (the index is ignored)."""
+    columns = {i: _column_hashes(chunk.iloc[:, i]) for i in range(chunk.shape[1])}
+    return pd.util.hash_pandas_object(pd.DataFrame(columns, index=range(len(chunk))), index=False).to_numpy()
+
+
+def first_occurrences(hashes):
+    """Boolean mask keeping the first row of every distinct hash."""
+    _, first = np.unique(hashes, return_index=True)
+    keep = np.zeros(len(hashes), dtype=bool)
+    keep[first] = True
+    return keep
+
+
+class HashSet:
+    """Set of uint64 hashes kept as a few sorted numpy runs (about 8 bytes per hash).
+
+    New hashes are added as a run; runs of similar size are merged, so there are only
+    O(log n) runs to binary-search on each lookup.
+    """
+
+    def __init__(self):
+        self.runs = []
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+    @property
+    def nbytes(self):
+        return sum(run.nbytes for run in self.runs)
+
+    def contains(self, hashes):
+        found = np.zeros(len(hashes), dtype=bool)
+        for run in self.runs:
+            positions = np.minimum(np.searchsorted(run, hashes), len(run) - 1)
+            found |= run[positions] == hashes
+        return found
+
+    def add(self, hashes):
+        """Add hashes that are distinct and not yet in the set."""
+        if not len(hashes):
+            return
+        self.runs.append(np.sort(hashes))
+        while len(self.runs) > 1 and len(self.runs[-2]) <= 2 * len(self.runs[-1]):
+            last = self.runs.pop()
+            self.runs[-1] = np.sort(np.concatenate([self.runs[-1], last]), kind="mergesort")
+
+    def values(self):
+        return np.concatenate(self.runs) if self.runs else np.empty(0, dtype=np.uint64)
+
+
+class BloomFilter:
+    """Bloom filter over uint64 hashes, ``num_bits`` bits with ``num_hashes`` probes per item."""
+
+    def __init__(self, num_bits, num_hashes=7):
+        self.num_bits = max(64, int(num_bits))
+        self.num_hashes = num_hashes
+        self.bits = np.zeros((self.num_bits + 7) // 8, dtype=np.uint8)
+
+    @classmethod
+    def for_capacity(cls, capacity, false_positive_rate=0.001):
+        num_bits = math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)
+        return cls(num_bits, max(1, round(num_bits / capacity * math.log(2))))
+
+    def _positions(self, hashes):
+        # Double hashing: probe i is h1 + i * h2
+        h1 = (hashes & np.uint64(0xFFFFFFFF)).astype(np.uint64)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        probes = np.arange(self.num_hashes, dtype=np.uint64)[:, None]
+        return (h1[None, :] + probes * h2[None, :]) % np.uint64(self.num_bits)
+
+    def might_contain(self, hashes):
+        positions = self._positions(hashes)
+        present = (self.bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1
+        return present.all(axis=0).astype(bool)
+
+    def add(self, hashes):
+        positions = self._positions(hashes).ravel()
+        np.bitwise_or.at(self.bits, positions >> np.uint64(3), (1 << (positions & np.uint64(7))).astype(np.uint8))
+
+
+class ChunkDeduplicator:
+    """Remove duplicate rows across a stream of chunks (and files) within a memory budget.
+
+    Row hashes seen so far are kept in a HashSet and new rows are emitted immediately.
+    Once the set outgrows ``memory_budget`` bytes, its hashes are written to
+    hash-partitioned files under ``spill_dir`` and the budget is handed to a Bloom filter:
+    rows the filter has definitely not seen are still emitted straight away, and the rest
+    are spilled to their partition and resolved exactly when the stream ends, one
+    partition at a time. Spilled rows are therefore emitted last, grouped by partition.
+    Rows are compared by 64-bit hash, so two distinct rows collide with probability
+    about n**2 / 2**65 (under 0.03% for 100M rows).
+
+    With ``approximate`` set there is no spilling at all: the Bloom filter alone decides,
+    so memory is fixed but a small fraction of unique rows (``false_positive_rate`` when
+    ``expected_rows`` is accurate) is dropped as duplicates.
+
+    A deduplicator holds the rows seen by ``process``; create one per pass over a source.
+    """
+
+    def __init__(self, memory_budget=256 * 1024 ** 2, spill_dir=None, partitions=64, approximate=False,
+                 expected_rows=None, false_positive_rate=0.001):
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.partitions = partitions
+        self.approximate = approximate
+        self.expected_rows = expected_rows
+        self.false_positive_rate = false_positive_rate
+
+        self.seen = HashSet()
+        self.bloom = self._new_bloom() if approximate else None
+        self.spill_path = None
+        self.rows_in = 0
+        self.rows_out = 0
+
+    def _new_bloom(self):
+        if self.expected_rows:
+            bloom = BloomFilter.for_capacity(self.expected_rows, self.false_positive_rate)
+            if bloom.bits.nbytes <= self.memory_budget:
+                return bloom
+        capacity = self.expected_rows or self.memory_budget // 2
+        num_bits = self.memory_budget * 8
+        return BloomFilter(num_bits, max(1, min(16, round(num_bits / capacity * math.log(2)))))
+
+    def process(self, chunks):
+        """Yield the chunks with every row that was already seen removed."""
+        try:
+            for chunk in chunks:
+                self.rows_in += len(chunk)
+                hashes = row_hashes(chunk)
+                keep = first_occurrences(hashes)
+                chunk, hashes = chunk[keep], hashes[keep]
+
+                if self.approximate:
+                    new = ~self.bloom.might_contain(hashes)
+                    self.bloom.add(hashes[new])
+                elif self.spill_path is None:
+                    new = ~self.seen.contains(hashes)
+                    self.seen.add(hashes[new])
+                    if self.seen.nbytes > self.memory_budget:
+                        self._start_spilling()
+                else:
+                    new = ~self.bloom.might_contain(hashes)
+                    self.bloom.add(hashes)
+                    self._append_emitted(hashes[new])
+                    self._spill_rows(chunk[~new], hashes[~new])
+
+                if new.any():
+                    self.rows_out += int(new.sum())
+                    yield chunk[new]
+
+            if self.spill_path is not None:
+                yield from self._resolve_spilled()
+        finally:
+            self.close()
+
+    def close(self):
+        if self.spill_path is not None:
+            shutil.rmtree(self.spill_path, ignore_errors=True)
+            self.spill_path = None
+
+    def _partition_of(self, hashes):
+        return (hashes % np.uint64(self.partitions)).astype(np.int64)
+
+    def _start_spilling(self):
+        """Move the in-memory hashes to disk and switch to the Bloom filter front end."""
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+        self.spill_path = tempfile.mkdtemp(prefix="dedup-", dir=self.spill_dir)
+        hashes = self.seen.values()
+        self.seen = HashSet()
+        logger.info(f"Dedup memory budget reached after {len(hashes)} distinct rows, spilling to {self.spill_path}")
+        self.bloom = self._new_bloom()
+        self.bloom.add(hashes)
+        self._append_emitted(hashes)
+
+    def _append_emitted(self, hashes):
+        partitions = self._partition_of(hashes)
+        for partition in np.unique(partitions):
+            with open(os.path.join(self.spill_path, f"emitted-{partition}.bin"), "ab") as f:
+                hashes[partitions == partition].tofile(f)
+
+    def _spill_rows(self, chunk, hashes):
+        partitions = self._partition_of(hashes)
+        for partition in np.unique(partitions):
+            mask = partitions == partition
+            with open(os.path.join(self.spill_path, f"rows-{partition}.pkl"), "ab") as f:
+                pickle.dump((hashes[mask], chunk[mask]), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _resolve_spilled(self):
+        """Check spilled rows against everything emitted, one partition at a time."""
+        for partition in range(self.partitions):
+            rows_path = os.path.join(self.spill_path, f"rows-{partition}.pkl")
+            if not os.path.exists(rows_path):
+                continue
+            hash_parts, row_parts = [], []
+            with open(rows_path, "rb") as f:
+                while True:
+                    try:
+                        part_hashes, part_rows = pickle.load(f)
+                    except EOFError:
+                        break
+                    hash_parts.append(part_hashes)
+                    row_parts.append(part_rows)
+            hashes = np.concatenate(hash_parts)
+            rows = pd.concat(row_parts)
+
+            emitted_path = os.path.join(self.spill_path, f"emitted-{partition}.bin")
+            emitted = np.fromfile(emitted_path, dtype=np.uint64) if os.path.exists(emitted_path) \
+                else np.empty(0, dtype=np.uint64)
+            keep = first_occurrences(hashes) & ~np.isin(hashes, emitted)
+            if keep.any():
+                self.rows_out += int(keep.sum())
+                yield rows[keep]
+
+
+# Example usage
+if __name__ == "__main__":
+    def chunks():
+        rng = np.random.default_rng(0)
+        for _ in range(50):
+            yield pd.DataFrame({"id": rng.integers(0, 300_000, 20_000), "flag": rng.integers(0, 2, 20_000)})
+
+    exact = ChunkDeduplicator(memory_budget=1024 ** 2)
+    exact_rows = sum(len(chunk) for chunk in exact.process(chunks()))
+    approximate = ChunkDeduplicator(memory_budget=1024 ** 2, approximate=True, expected_rows=600_000)
+    approximate_rows = sum(len(chunk) for chunk in approximate.process(chunks()))
+    print(f"{exact.rows_in} rows in, {exact_rows} unique (exact), {approximate_rows} kept (approximate)")
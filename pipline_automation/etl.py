@@ -1,57 +1,599 @@
 import pandas as pd
+import numpy as np
 import os
-import schedule
 import time
 import requests
-from sqlalchemy import create_engine
-from datetime import datetime
+from sqlalchemy import inspect, text
+from datetime import date, datetime
+import decimal
 from dotenv import load_dotenv
 import re
+import io
+import json
+import shutil
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from stage_pipeline import run_stages
+from api_extraction import PaginatedAPIExtractor, check_pagination
+from http_cache import ResponseCache
+from quantile_sketch import KLLSketch
+from dedup import ChunkDeduplicator
+from file_parallel_processing import get_executor
+from database_connection_pooling import MAX_OVERFLOW, POOL_SIZE, get_engine
+from stage_cache import StageCache, digest
+from pipeline_metrics import configure_logging, get_profiler, path_bytes, profiled_step
+from scheduler import FilesFailed, PipelineScheduler
+from sql_pushdown import missing_ids_query, transform_query
+from schema_cache import SCHEMA_SAMPLE_ROWS, SchemaCache, apply_schema, infer_schema, learn_date_format, read_dtypes
+import copy
+import functools
+import logging
+import glob
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 # Load environment variables from a .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# pyarrow dataset format names for the columnar source and destination types
+COLUMNAR_FORMATS = {"parquet": "parquet", "feather": "ipc"}
+
+# Seconds before a single API request is abandoned
+API_TIMEOUT = 30
+
+# Rows per INSERT batch / COPY buffer when bulk loading into a database
+BULK_LOAD_CHUNKSIZE = 50000
+
+# Files read at once when a file source is a glob or a directory
+FILE_READ_WORKERS = 8
+
+# Share of a Postgres table sampled to estimate partition boundaries
+QUANTILE_SAMPLE_PERCENT = 1
+
+# Modules whose code determines the transform output; editing them invalidates cached outputs
+TRANSFORM_CODE_FILES = ("etl.py", "schema_cache.py", "sql_pushdown.py")
+
 class ETL:
-    def __init__(self):
+    def __init__(self, ttl_overrides=None):
         self.database_url = os.getenv("DATABASE_URL")
         if not self.database_url:
             raise EnvironmentError("DATABASE_URL environment variable not found.")
-        self.engine = create_engine(self.database_url)
-
-    def extract_file(self, file_path):
-        """Extract data from a CSV file."""
-        print(f"Extracting data from file: {file_path}")
-        return pd.read_csv(file_path)
-
-    def extract_database(self, table_name):
-        """Extract data from a database table."""
-        print(f"Extracting data from database table: {table_name}")
-        query = f"SELECT * FROM {table_name}"
-        return pd.read_sql(query, self.engine)
-
-    def extract_api(self, api_url, headers=None):
-        """Extract data from an API."""
-        print(f"Extracting data from API: {api_url}")
+        # Pooled engine shared with every other ETL instance and extractor using this DSN
+        self.engine = get_engine(self.database_url)
+        self.state_dir = os.getenv("ETL_STATE_DIR", ".etl_state")
+        # Streaming runs compute exact IQR bounds unless a quantile sketch error is configured
+        quantile_error = os.getenv("ETL_QUANTILE_ERROR")
+        self.quantile_error = float(quantile_error) if quantile_error else None
+        self.dedup_memory_budget = int(os.getenv("ETL_DEDUP_MEMORY", 256 * 1024 ** 2))
+        # ``ttl_overrides`` maps URL regexes to seconds cached API responses stay fresh (see ResponseCache)
+        self.response_cache = ResponseCache(os.path.join(self.state_dir, "http_cache"),
+                                            max_bytes=int(os.getenv("ETL_HTTP_CACHE_BYTES", 512 * 1024 ** 2)),
+                                            ttl_overrides=ttl_overrides)
+        # Per-stage metrics, off unless ETL_PROFILE is set (see pipeline_metrics)
+        self.profiler = get_profiler()
+        self.schema_cache = SchemaCache(os.path.join(self.state_dir, "schemas"))
+        self.stage_cache = StageCache(os.path.join(self.state_dir, "stage_cache"),
+                                      max_bytes=int(os.getenv("ETL_STAGE_CACHE_BYTES", 2 * 1024 ** 3)))
+        # High-water marks reached by this run, persisted only once the run succeeds
+        self._pending_watermarks = {}
+        # (path, error) for every file of a multi-file source that could not be read
+        self.file_errors = []
+
+    @profiled_step("extract")
+    def extract_file(self, file_path, chunksize=None, columns=None, workers=None, schema=False):
+        """Extract data from a CSV file (an iterator of chunks if chunksize is set).
+
+        ``file_path`` may also be a glob (``landing/*.csv``) or a directory, whose ``*.csv``
+        files are then read on ``workers`` threads and concatenated in sorted path order.
+        Files that fail are reported, recorded in ``file_errors`` and skipped.
+
+        With ``schema`` set, the source's persisted schema (see _conform) is applied, and
+        text columns are parsed straight into categoricals and Arrow strings.
+        """
+        source_key = f"file:{file_path}"
+        learned = self.schema_cache.get(source_key) if schema else None
+        dtype = read_dtypes(learned) if learned else None
+        paths = self.resolve_paths(file_path)
+        if self.profiler.enabled:
+            self.profiler.count_io(bytes_read=sum(path_bytes(path) for path in paths))
+        if paths == [file_path]:
+            logger.info(f"Extracting data from file: {file_path}")
+            data = pd.read_csv(file_path, chunksize=chunksize, usecols=columns, dtype=dtype)
+        else:
+            logger.info(f"Extracting data from {len(paths)} files: {file_path}")
+            if chunksize:
+                data = self._iter_file_chunks(paths, chunksize, columns, dtype)
+            else:
+                read = lambda path: pd.read_csv(path, usecols=columns, dtype=dtype)
+                frames = [df for _, df in self._read_files(paths, workers=workers, read=read) if df is not None]
+                data = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        return self._with_schema(source_key, data) if schema else data
+
+    def _with_schema(self, source_key, data):
+        """Apply _conform to a frame or to every chunk of an iterator."""
+        if isinstance(data, pd.DataFrame):
+            return self._conform(source_key, data)
+        return (self._conform(source_key, chunk) for chunk in data)
+
+    def _conform(self, source_key, df):
+        """Cast ``df`` to the schema learned for its source, learning any column not seen before.
+
+        Schemas are learned once per source (see schema_cache.infer_schema) and persisted
+        under ``state_dir``, so later runs skip type inference for text columns and parse
+        dates with the learned format instead of guessing. Call
+        ``schema_cache.invalidate(source_key)`` after the source changes shape.
+        """
+        learned = dict(self.schema_cache.get(source_key) or {})
+        new_columns = [col for col in df.columns if col not in learned]
+        if new_columns:
+            learned.update(infer_schema(df[new_columns]))
+            self.schema_cache.put(source_key, learned)
+            logger.info(f"Learned schema of {len(new_columns)} column(s) for {source_key}")
+        return apply_schema(df, learned)
+
+    @staticmethod
+    def resolve_paths(source, pattern="*.csv"):
+        """Expand a directory or glob into a sorted list of files; any other path is returned as is."""
+        if os.path.isdir(source):
+            return sorted(glob.glob(os.path.join(source, pattern)))
+        if any(char in source for char in "*?["):
+            return sorted(glob.glob(source))
+        return [source]
+
+    def _file_failed(self, path, error):
+        # Two-pass streaming reads every file twice; report each failure once
+        if any(failed == path for failed, _ in self.file_errors):
+            return
+        logger.warning(f"Error reading file {path}: {error}")
+        self.file_errors.append((path, str(error)))
+
+    def _read_files(self, paths, columns=None, workers=None, read=None):
+        """Yield ``(path, frame)`` in path order, reading up to ``workers`` files at once on threads.
+
+        ``read`` maps a path to a frame (default: read_csv). The frame is None for a file that failed.
+        """
+        read = read or (lambda path: pd.read_csv(path, usecols=columns))
+        with ThreadPoolExecutor(max_workers=workers or FILE_READ_WORKERS) as pool:
+            yield from self._map_ordered(paths, pool.submit, read, workers or FILE_READ_WORKERS, self._file_failed)
+
+    @staticmethod
+    def _map_ordered(items, submit, func, window, on_error=None):
+        """Run ``func`` on every item with at most ``window`` in flight, yielding ``(item, result)`` in order.
+
+        Errors are raised, or passed to ``on_error(item, error)`` and yielded as a None result.
+        """
+        in_flight = deque()
+        items = iter(items)
+        while True:
+            while len(in_flight) < window:
+                item = next(items, None)
+                if item is None:
+                    break
+                in_flight.append((item, submit(func, item)))
+            if not in_flight:
+                return
+            item, future = in_flight.popleft()
+            try:
+                result = future.result()
+            except Exception as e:
+                if on_error is None:
+                    for _, pending in in_flight:
+                        pending.cancel()
+                    raise
+                on_error(item, e)
+                result = None
+            yield item, result
+
+    def _iter_file_chunks(self, paths, chunksize, columns=None, dtype=None):
+        """Stream the chunks of several CSV files one after another."""
+        for path in paths:
+            try:
+                for chunk in pd.read_csv(path, chunksize=chunksize, usecols=columns, dtype=dtype):
+                    yield chunk
+            except Exception as e:
+                self._file_failed(path, e)
+
+    def extract_parquet(self, path, chunksize=None, columns=None, filters=None):
+        """Extract data from a Parquet file or dataset directory."""
+        return self._extract_columnar(path, "parquet", chunksize, columns, filters)
+
+    def extract_feather(self, path, chunksize=None, columns=None, filters=None):
+        """Extract data from an Arrow IPC/Feather file or dataset directory."""
+        return self._extract_columnar(path, "feather", chunksize, columns, filters)
+
+    @profiled_step("extract")
+    def _extract_columnar(self, path, file_format, chunksize, columns, filters):
+        """Read only ``columns`` and push ``filters`` down so non-matching row groups are skipped.
+
+        ``filters`` uses the pandas/pyarrow DNF form, e.g. ``[("amount", ">", 0)]``.
+        """
+        logger.info(f"Extracting data from {file_format} source: {path}")
+        dataset = ds.dataset(path, format=COLUMNAR_FORMATS[file_format], partitioning="hive")
+        if self.profiler.enabled:
+            # Whole files, although column selection and filters may skip parts of them
+            self.profiler.count_io(bytes_read=sum(path_bytes(file) for file in dataset.files))
+        expression = pq.filters_to_expression(filters) if filters else None
+        if chunksize:
+            batches = dataset.to_batches(columns=columns, filter=expression, batch_size=chunksize)
+            return (pa.Table.from_batches([batch]).to_pandas() for batch in batches if batch.num_rows)
+        return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+    @profiled_step("extract")
+    def extract_database(self, table_name, chunksize=None, incremental_column=None, tiebreaker=None,
+                         page_size=100000, schema=False, partition_column=None, partitions=8,
+                         boundaries="minmax", workers=None):
+        """Extract data from a database table (an iterator of chunks if chunksize is set).
+
+        With ``incremental_column`` set, only rows past the persisted high-water mark are read
+        (see extract_database_incremental). With ``partition_column`` set, the table is read
+        as key ranges over several connections at once (see extract_database_partitioned),
+        and the iterator yields one range at a time. With ``schema`` set, the table's
+        persisted schema is applied (see _conform).
+        """
+        if partition_column:
+            data = self.extract_database_partitioned(table_name, partition_column, partitions, boundaries,
+                                                     workers, stream=bool(chunksize))
+        elif incremental_column:
+            data = self.extract_database_incremental(table_name, incremental_column, tiebreaker,
+                                                     chunksize=chunksize or page_size, page_size=page_size)
+            if not chunksize:
+                chunks = list(data)
+                data = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+        else:
+            logger.info(f"Extracting data from database table: {table_name}")
+            query = f"SELECT * FROM {table_name}"
+            data = pd.read_sql(query, self.engine, chunksize=chunksize)
+        return self._with_schema(f"database:{table_name}", data) if schema else data
+
+    def extract_database_partitioned(self, table_name, partition_column, partitions=8, boundaries="minmax",
+                                     workers=None, stream=False):
+        """Read a table as ``partitions`` ranges of a numeric or date key, fetched concurrently.
+
+        ``boundaries`` is "minmax" for equal-width ranges between the key's MIN and MAX, or
+        "quantile" for ranges holding about the same number of rows (better for skewed
+        keys). Each range is read over its own pooled connection, with at most ``workers``
+        (default: one per range, up to the pool's capacity) in flight. Rows with a null key
+        come last as one more range. Returns one frame in key order, or with ``stream`` a
+        generator of the ranges in key order.
+        """
+        ranges = self.partition_ranges(table_name, partition_column, partitions, boundaries)
+        logger.info(f"Extracting data from database table: {table_name} ({len(ranges)} ranges of {partition_column})")
+
+        def fetch(where_params):
+            return self.extract_database_range(table_name, partition_column, *where_params)
+
+        def fetch_all():
+            window = workers or min(len(ranges), POOL_SIZE + MAX_OVERFLOW)
+            with ThreadPoolExecutor(max_workers=window) as pool:
+                for _, df in self._map_ordered(ranges, pool.submit, fetch, window):
+                    yield df
+
+        if stream:
+            return (df for df in fetch_all() if not df.empty)
+        frames = list(fetch_all())
+        non_empty = [df for df in frames if not df.empty]
+        # A range whose rows are all null in a column (such as the null-key range) reads it as
+        # object; give it the other ranges' type, with integers as floats as a full read has them
+        types = {}
+        for df in non_empty:
+            for col, dtype in df.dtypes.items():
+                if dtype != object:
+                    types.setdefault(col, np.dtype("float64") if dtype.kind in "iub" else dtype)
+        for i, df in enumerate(non_empty):
+            cast = {col: types[col] for col in df.columns
+                    if col in types and df[col].dtype == object and df[col].isna().all()}
+            if cast:
+                non_empty[i] = df.astype(cast)
+        return pd.concat(non_empty or frames[:1], ignore_index=True)
+
+    def partition_ranges(self, table_name, partition_column, partitions=8, boundaries="minmax"):
+        """``(where, params)`` pairs splitting a table into key ranges, the null keys last."""
+        cuts = self._partition_boundaries(table_name, partition_column, partitions, boundaries)
+        ranges = [(f"{partition_column} >= :low AND {partition_column} {'<=' if i == len(cuts) - 2 else '<'} :high",
+                   {"low": low, "high": high}) for i, (low, high) in enumerate(zip(cuts[:-1], cuts[1:]))]
+        if len(cuts) == 1:
+            ranges.append((f"{partition_column} = :low", {"low": cuts[0]}))
+        ranges.append((f"{partition_column} IS NULL", {}))
+        return ranges
+
+    def extract_database_range(self, table_name, partition_column, where, params):
+        """Rows of one key range from partition_ranges, in key order, over a pooled connection."""
+        with self.engine.connect() as conn:
+            query = text(f"SELECT * FROM {table_name} WHERE {where} ORDER BY {partition_column}")
+            return pd.read_sql(query, conn, params=params)
+
+    def _partition_boundaries(self, table_name, column, partitions, boundaries="minmax"):
+        """Sorted distinct cut points from the key's MIN to its MAX (empty if the key is all null)."""
+        with self.engine.connect() as conn:
+            low, high = conn.execute(text(f"SELECT MIN({column}), MAX({column}) FROM {table_name}")).one()
+            if low is None:
+                return []
+            if boundaries == "quantile":
+                inner = self._quantile_cuts(conn, table_name, column, partitions)
+            elif boundaries == "minmax":
+                inner = self._even_cuts(low, high, partitions)
+            else:
+                raise ValueError(f"Unsupported boundaries: {boundaries}. Use 'minmax' or 'quantile'.")
+        return list(dict.fromkeys([low] + [cut for cut in inner if low < cut < high] + [high]))
+
+    def _quantile_cuts(self, conn, table_name, column, partitions):
+        fractions = [i / partitions for i in range(1, partitions)]
+        if self.engine.dialect.name == "postgresql":
+            # Estimate the quantiles from a block sample instead of sorting the whole table
+            query = text(f"SELECT percentile_disc(CAST(:fractions AS float8[])) WITHIN GROUP (ORDER BY {column}) "
+                         f"FROM {table_name} TABLESAMPLE SYSTEM (:percent)")
+            cuts = conn.execute(query, {"fractions": fractions, "percent": QUANTILE_SAMPLE_PERCENT}).scalar()
+            if cuts:
+                return sorted(cuts)
+        count = conn.execute(text(f"SELECT COUNT({column}) FROM {table_name}")).scalar()
+        query = text(f"SELECT {column} FROM {table_name} WHERE {column} IS NOT NULL ORDER BY {column} "
+                     f"LIMIT 1 OFFSET :offset")
+        return [conn.execute(query, {"offset": int(count * fraction)}).scalar() for fraction in fractions]
+
+    @staticmethod
+    def _even_cuts(low, high, partitions):
+        """``partitions - 1`` evenly spaced values between two numbers, dates or date strings."""
+        if isinstance(low, (int, float, decimal.Decimal)):
+            cuts = np.linspace(float(low), float(high), partitions + 1)[1:-1]
+            return np.unique(np.round(cuts)).astype(int).tolist() if isinstance(low, int) else cuts.tolist()
+        date_format = learn_date_format(pd.Series([low, high])) if isinstance(low, str) else None
+        if not isinstance(low, (datetime, date)) and not date_format:
+            raise ValueError(f"Cannot split values like {low!r} evenly; use boundaries='quantile'.")
+        start, end = pd.Timestamp(low), pd.Timestamp(high)
+        cuts = [pd.Timestamp(value) for value in np.linspace(start.value, end.value, partitions + 1)[1:-1]]
+        if date_format:
+            return [cut.strftime(date_format) for cut in cuts]
+        if isinstance(low, datetime):
+            return [cut.to_pydatetime() for cut in cuts]
+        return [cut.date() for cut in cuts]
+
+    def extract_database_incremental(self, table_name, key_column, tiebreaker=None, chunksize=10000,
+                                     page_size=100000):
+        """Yield rows added since the last successful run, in chunks of ``chunksize`` rows.
+
+        Rows are paged in ``key_column`` order with keyset pagination (``WHERE key > last
+        ORDER BY key LIMIT page_size``), and each page is read through a server-side cursor.
+        A non-unique key such as ``updated_at`` needs a unique ``tiebreaker`` column (e.g.
+        ``id``) so rows sharing a key value are not skipped at page boundaries. The upper
+        bound is fixed when a run first reads the table, so repeated passes over the source
+        see the same rows. The new mark is persisted by commit_watermarks().
+        """
+        state_key = f"{table_name}.{key_column}" + (f".{tiebreaker}" if tiebreaker else "")
+        last = self.load_watermarks().get(state_key)
+        logger.info(f"Extracting data from database table: {table_name} ({key_column} after {last})")
+
+        pending = self._pending_watermarks.get(state_key)
+        if pending and "upper" in pending:
+            upper = pending["upper"]
+        else:
+            with self.engine.connect() as conn:
+                upper = self._to_watermark(conn.execute(text(f"SELECT MAX({key_column}) FROM {table_name}")).scalar())
+            self._pending_watermarks[state_key] = {"upper": upper}
+        if upper is None:
+            return
+
+        order_by = f"{key_column}, {tiebreaker}" if tiebreaker else key_column
+        with self.engine.connect().execution_options(stream_results=True) as conn:
+            while True:
+                params = {"upper": upper, "limit": page_size}
+                if last is None:
+                    after = "1 = 1"
+                elif tiebreaker:
+                    after = f"({key_column} > :last_key OR ({key_column} = :last_key AND {tiebreaker} > :last_tie))"
+                    params.update(last_key=last[0], last_tie=last[1])
+                else:
+                    after = f"{key_column} > :last_key"
+                    params["last_key"] = last
+                query = text(f"SELECT * FROM {table_name} WHERE {after} AND {key_column} <= :upper "
+                             f"ORDER BY {order_by} LIMIT :limit")
+
+                page_rows = 0
+                for chunk in pd.read_sql(query, conn, params=params, chunksize=chunksize):
+                    if chunk.empty:
+                        continue
+                    page_rows += len(chunk)
+                    last_key = self._to_watermark(chunk[key_column].iloc[-1])
+                    last = [last_key, self._to_watermark(chunk[tiebreaker].iloc[-1])] if tiebreaker else last_key
+                    self._pending_watermarks[state_key]["last"] = last
+                    yield chunk
+                if page_rows < page_size:
+                    break
+
+    def _to_watermark(self, value):
+        """Convert a key value into something JSON can persist and the database can compare."""
+        if value is None or (not isinstance(value, str) and pd.isnull(value)):
+            return None
+        if isinstance(value, (pd.Timestamp, datetime)):
+            return value.isoformat(sep=" ")
+        return value.item() if isinstance(value, np.generic) else value
+
+    def load_watermarks(self):
+        """Load the persisted high-water marks of incremental extractions."""
+        path = os.path.join(self.state_dir, "watermarks.json")
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def commit_watermarks(self):
+        """Persist the high-water marks reached by the current run."""
+        if not self._pending_watermarks:
+            return
+        watermarks = self.load_watermarks()
+        for state_key, pending in self._pending_watermarks.items():
+            if "last" in pending:
+                watermarks[state_key] = pending["last"]
+        self._pending_watermarks = {}
+        os.makedirs(self.state_dir, exist_ok=True)
+        path = os.path.join(self.state_dir, "watermarks.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(watermarks, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    @profiled_step("extract")
+    def extract_api(self, api_url, headers=None, pagination=None, chunksize=None, cache=False, **client_options):
+        """Extract data from an API.
+
+        With ``cache`` set, a single (unpaginated) response is kept in the on-disk response
+        cache and revalidated with conditional requests, so unchanged payloads are neither
+        downloaded nor parsed again.
+
+        With ``pagination`` set (see PaginatedAPIExtractor), every page of one or more URLs is
+        fetched concurrently over a shared session; ``client_options`` (concurrency, rate_limit,
+        max_retries, records_key, ...) configure the client. Pages are collected into
+        DataFrame batches of ``chunksize`` records, returned as an iterator if chunksize is set.
+        """
+        logger.info(f"Extracting data from API: {api_url}")
+        if pagination:
+            check_pagination(pagination)
+            client = PaginatedAPIExtractor(headers=headers, timeout=client_options.pop("timeout", API_TIMEOUT),
+                                           **client_options)
+            batches = client.extract_batches(api_url, pagination, batch_size=chunksize or 10000)
+            if chunksize:
+                return self._close_after(batches, client)
+            try:
+                batches = list(batches)
+                return pd.concat(batches, ignore_index=True) if batches else pd.DataFrame()
+            except Exception as e:
+                logger.error(f"Error during API extraction: {e}")
+                return pd.DataFrame()
+            finally:
+                client.close()
+
         try:
-            response = requests.get(api_url, headers=headers)
+            if cache:
+                return self.response_cache.fetch(api_url, headers=headers, timeout=API_TIMEOUT)
+            response = requests.get(api_url, headers=headers, timeout=API_TIMEOUT)
             response.raise_for_status()
             return pd.DataFrame(response.json())
         except Exception as e:
-            print(f"Error during API extraction: {e}")
+            logger.error(f"Error during API extraction: {e}")
             return pd.DataFrame()
 
+    def _close_after(self, chunks, client):
+        """Yield from ``chunks`` and close the API client once they are exhausted."""
+        try:
+            yield from chunks
+        finally:
+            client.close()
+
+    @profiled_step("pushdown")
+    def transform_in_database(self, table_name, chunksize=None):
+        """transform_data run by the database that holds ``table_name``; only its result is read.
+
+        De-duplication, missing-value handling, ``amount_squared``, the IQR bounds and the
+        outlier filter become one query (see sql_pushdown.transform_query), and the row-wise
+        formatting of _finalize_rows runs on the result, chunk by chunk if ``chunksize`` is
+        set. The rows match transform_data on the whole table, in no particular order.
+        """
+        logger.info(f"Transforming {table_name} in the database...")
+        quote = self.engine.dialect.identifier_preparer.quote
+        columns = [column["name"] for column in inspect(self.engine).get_columns(table_name)]
+        if "id" in columns:
+            with self.engine.connect() as conn:
+                if conn.execute(text(missing_ids_query(table_name, quote))).scalar():
+                    raise ValueError("Missing ID values detected!")
+        query = transform_query(table_name, columns, self.engine.dialect.name, quote)
+        data = pd.read_sql(text(query), self.engine, chunksize=chunksize)
+        if chunksize:
+            return (self._finalize_rows(chunk, None) for chunk in data)
+        return self._finalize_rows(data, None)
+
+    @profiled_step("transform")
     def transform_data(self, df):
         """Transform the data (cleaning, validation, enrichment)."""
-        print("Transforming data...")
-        df = df.drop_duplicates()
+        logger.info("Transforming data...")
+        return self._transform_rows(df)
+
+    @staticmethod
+    def _transform_rows(df):
+        with get_profiler().stage("drop_duplicates", rows_in=len(df)) as record:
+            df = record.output(df.drop_duplicates())
+        df = ETL._prepare_rows(df)
+        bounds = ETL._amount_bounds(df['amount']) if 'amount' in df.columns else None
+        return ETL._finalize_rows(df, bounds)
+
+    @profiled_step("transform")
+    def transform_parallel(self, df, workers=None):
+        """transform_data with the row-wise steps spread over a pool of worker processes.
+
+        De-duplication, validation and the outlier bounds need the whole frame and run
+        here; date parsing, outlier filtering and text clean-up run per partition.
+        """
+        logger.info("Transforming data in parallel...")
+        df = self._prepare_rows(df.drop_duplicates())
+        bounds = self._amount_bounds(df['amount']) if 'amount' in df.columns else None
+        return get_executor(workers).map(functools.partial(ETL._finalize_rows, bounds=bounds), df)
+
+    def transform_stream(self, make_chunks):
+        """Transform a chunked source in two passes with the same result as transform_data.
+
+        ``make_chunks`` must return a fresh iterator of raw chunks on every call. The first
+        pass only collects the de-duplicated ``amount`` values to compute the IQR bounds;
+        the second pass re-reads the source and yields transformed chunks.
+        """
+        logger.info("Transforming data in streaming mode...")
+        bounds = self._stream_bounds(make_chunks)
+        for chunk in self._deduplicate(make_chunks()):
+            yield self._transform_chunk(chunk, bounds)
+
+    def _deduplicate(self, chunks):
+        """Drop rows already seen in the same or an earlier chunk, spilling to disk past the memory budget."""
+        return ChunkDeduplicator(memory_budget=self.dedup_memory_budget).process(chunks)
+
+    @profiled_step("bounds")
+    def _stream_bounds(self, make_chunks):
+        """First streaming pass: IQR bounds of the de-duplicated, cleaned amount column.
+
+        The amount values are kept in full for exact bounds, or summarized in a KLL sketch
+        when ``quantile_error`` is set, which bounds memory for very large sources.
+        """
+        amounts = []
+        sketch = KLLSketch.from_error(self.quantile_error) if self.quantile_error else None
+        for chunk in self._deduplicate(make_chunks()):
+            chunk = self._prepare_rows(chunk)
+            if 'amount' in chunk.columns:
+                if sketch:
+                    sketch.update(chunk['amount'])
+                else:
+                    amounts.append(chunk['amount'].to_numpy(dtype=float))
+        if sketch:
+            if not sketch.count:
+                return None
+            q1, q3 = sketch.quantile([0.25, 0.75])
+            iqr = q3 - q1
+            return q1 - 1.5 * iqr, q3 + 1.5 * iqr
+        return self._amount_bounds(pd.Series(np.concatenate(amounts))) if amounts else None
+
+    @profiled_step("transform")
+    def _transform_chunk(self, chunk, bounds):
+        """Second streaming pass: transform one de-duplicated chunk given the outlier bounds."""
+        return self._finalize_rows(self._prepare_rows(chunk), bounds)
+
+    @staticmethod
+    @profiled_step("prepare_rows")
+    def _prepare_rows(df):
+        """Row-wise cleaning and validation that runs before the outlier bounds are known."""
+        # Columns are only ever replaced below, so a shallow copy leaves the caller's frame (often
+        # a slice of a chunk) as it was without copying its data
+        df = df.copy(deep=False)
 
         # Handle missing values
         if 'email' in df.columns:
+            if isinstance(df['email'].dtype, pd.CategoricalDtype) and \
+                    "unknown@example.com" not in df['email'].cat.categories:
+                df['email'] = df['email'].cat.add_categories("unknown@example.com")
             df['email'] = df['email'].fillna("unknown@example.com")
 
-        # Add derived columns
+        # Add derived columns (in 64 bits, since a learned schema may have narrowed amount)
         if 'amount' in df.columns:
-            df['amount_squared'] = df['amount'] ** 2
+            amount = df['amount']
+            if amount.dtype.kind in "iuf":
+                amount = amount.astype("int64" if amount.dtype.kind in "iu" else "float64", copy=False)
+            df['amount_squared'] = amount ** 2
 
         # Validate for missing IDs
         if 'id' in df.columns and df['id'].isnull().any():
@@ -59,7 +601,22 @@ class ETL:
 
         # Remove rows where critical fields are null
         critical_columns = ['id', 'email']
-        df = df.dropna(subset=[col for col in critical_columns if col in df.columns])
+        return df.dropna(subset=[col for col in critical_columns if col in df.columns])
+
+    @staticmethod
+    @profiled_step("amount_bounds")
+    def _amount_bounds(amount):
+        """IQR bounds used to filter outliers in the amount column."""
+        q1 = amount.quantile(0.25)
+        q3 = amount.quantile(0.75)
+        iqr = q3 - q1
+        return q1 - 1.5 * iqr, q3 + 1.5 * iqr
+
+    @staticmethod
+    @profiled_step("finalize_rows")
+    def _finalize_rows(df, bounds):
+        """Row-wise steps that need the outlier bounds computed over the whole dataset."""
+        df = df.copy(deep=False)
 
         # Standardize date formats
         for col in df.select_dtypes(include=['object']):
@@ -67,21 +624,27 @@ class ETL:
                 try:
                     df[col] = pd.to_datetime(df[col], errors='coerce')
                 except Exception as e:
-                    print(f"Error parsing dates in column {col}: {e}")
+                    logger.warning(f"Error parsing dates in column {col}: {e}")
 
         # Handle outliers
-        if 'amount' in df.columns:
-            q1 = df['amount'].quantile(0.25)
-            q3 = df['amount'].quantile(0.75)
-            iqr = q3 - q1
-            lower_bound = q1 - 1.5 * iqr
-            upper_bound = q3 + 1.5 * iqr
-            df = df[(df['amount'] >= lower_bound) & (df['amount'] <= upper_bound)]
+        if bounds is not None:
+            lower_bound, upper_bound = bounds
+            df = df.loc[(df['amount'] >= lower_bound) & (df['amount'] <= upper_bound)].copy(deep=False)
 
         # Check for special characters in text fields
-        for col in df.select_dtypes(include=['object']):
+        for col in df.select_dtypes(include=['object', 'string', 'category']):
             if "@" in col or "email" in col.lower():
-                df[col] = df[col].apply(lambda x: re.sub(r'[^a-zA-Z0-9@._-]', '', x) if pd.notnull(x) else x)
+                if isinstance(df[col].dtype, pd.CategoricalDtype):
+                    # Clean each category once; categories that become equal are merged
+                    codes = df[col].cat.codes.to_numpy()
+                    cleaned = df[col].cat.categories.str.replace(r'[^a-zA-Z0-9@._-]', '', regex=True)
+                    categories = cleaned.unique()
+                    codes = np.where(codes >= 0, categories.get_indexer(cleaned)[codes], -1)
+                    df[col] = pd.Categorical.from_codes(codes, categories)
+                elif isinstance(df[col].dtype, pd.StringDtype):
+                    df[col] = df[col].str.replace(r'[^a-zA-Z0-9@._-]', '', regex=True)
+                else:
+                    df[col] = df[col].apply(lambda x: re.sub(r'[^a-zA-Z0-9@._-]', '', x) if pd.notnull(x) else x)
 
         # Capitalize names (example)
         if 'name' in df.columns:
@@ -89,70 +652,485 @@ class ETL:
 
         return df
 
-    def load_to_file(self, df, file_path):
-        """Load the data into a CSV file."""
-        print(f"Loading data to file: {file_path}")
-        df.to_csv(file_path, index=False)
+    @profiled_step("load")
+    def load_to_file(self, df, file_path, append=False):
+        """Load the data into a CSV file (appending without a header if append is set and the file exists)."""
+        logger.info(f"Loading data to file: {file_path}")
+        append = append and os.path.exists(file_path)
+        before = path_bytes(file_path) if append and self.profiler.enabled else 0
+        df.to_csv(file_path, index=False, mode="a" if append else "w", header=not append)
+        if self.profiler.enabled:
+            self.profiler.count_io(bytes_written=path_bytes(file_path) - before)
+
+    @profiled_step("load")
+    def load_to_database(self, df, table_name, append=False, mode="replace", key_columns=None):
+        """Load the data into a database table.
+
+        ``mode`` is ``replace`` (the default; appends instead when ``append`` is set, as for
+        later streaming chunks), ``append`` or ``upsert``. Upserts write the rows to a staging
+        table and then, in one transaction, delete the target rows whose ``key_columns`` match
+        and insert the staged rows, so only deltas need to be loaded.
+        """
+        logger.info(f"Loading data to database table: {table_name} ({mode})")
+        if mode == "upsert":
+            if not key_columns:
+                raise ValueError("Upsert mode requires key_columns.")
+            self._upsert(df, table_name, key_columns)
+        elif mode in ("replace", "append"):
+            self._bulk_insert(df, table_name, "append" if append or mode == "append" else "replace")
+        else:
+            raise ValueError(f"Unsupported load mode: {mode}. Use 'replace', 'append' or 'upsert'.")
+
+    def _bulk_insert(self, df, table_name, if_exists, con=None):
+        """Insert rows through the fastest path the backend offers: COPY on Postgres, batched executemany elsewhere."""
+        method = self._copy_insert if self.engine.dialect.name == "postgresql" else None
+        df.to_sql(table_name, con if con is not None else self.engine, if_exists=if_exists, index=False,
+                  chunksize=BULK_LOAD_CHUNKSIZE, method=method)
+
+    @staticmethod
+    def _copy_field(value):
+        """A value as a COPY CSV field: NULL unquoted and empty, anything else quoted so '' stays a string."""
+        return "" if value is None else '"' + str(value).replace('"', '""') + '"'
+
+    @staticmethod
+    def _copy_insert(table, conn, keys, data_iter):
+        """pandas.to_sql insertion method that streams rows through Postgres COPY FROM STDIN."""
+        buffer = io.StringIO()
+        buffer.writelines(",".join(map(ETL._copy_field, row)) + "\n" for row in data_iter)
+        buffer.seek(0)
+        columns = ", ".join(f'"{key}"' for key in keys)
+        name = f'"{table.schema}"."{table.name}"' if table.schema else f'"{table.name}"'
+        with conn.connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY {name} ({columns}) FROM STDIN WITH CSV", buffer)
+
+    def _upsert(self, df, table_name, key_columns):
+        """Replace rows matching ``key_columns`` and insert new ones via a staging table."""
+        if not inspect(self.engine).has_table(table_name):
+            self._bulk_insert(df, table_name, "replace")
+            return
+
+        staging_table = f"{table_name}_staging"
+        columns = ", ".join(df.columns)
+        matches = " AND ".join(f"{staging_table}.{key} = {table_name}.{key}" for key in key_columns)
+        try:
+            with self.engine.begin() as conn:
+                self._bulk_insert(df, staging_table, "replace", con=conn)
+                conn.execute(text(f"CREATE INDEX {staging_table}_keys ON {staging_table} ({', '.join(key_columns)})"))
+                conn.execute(text(f"DELETE FROM {table_name} WHERE EXISTS "
+                                  f"(SELECT 1 FROM {staging_table} WHERE {matches})"))
+                conn.execute(text(f"INSERT INTO {table_name} ({columns}) SELECT {columns} FROM {staging_table}"))
+                conn.execute(text(f"DROP TABLE {staging_table}"))
+        except Exception:
+            # The rows are rolled back, but backends without transactional DDL (SQLite, MySQL) keep the staging table
+            with self.engine.begin() as conn:
+                conn.execute(text(f"DROP TABLE IF EXISTS {staging_table}"))
+            raise
+
+    def load_to_parquet(self, df, path, append=False, compression="snappy", partition_cols=None):
+        """Load the data into a Parquet dataset directory, optionally hive-partitioned."""
+        self._load_to_columnar(df, path, "parquet", append, compression, partition_cols)
+
+    def load_to_feather(self, df, path, append=False, compression=None, partition_cols=None):
+        """Load the data into an Arrow IPC/Feather dataset directory (compression: lz4 or zstd)."""
+        self._load_to_columnar(df, path, "feather", append, compression, partition_cols)
+
+    @profiled_step("load")
+    def _load_to_columnar(self, df, path, file_format, append, compression, partition_cols):
+        """Write one batch of files into the dataset at ``path``; replaces the dataset unless appending."""
+        logger.info(f"Loading data to {file_format} destination: {path}")
+        if not append:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            elif os.path.exists(path):
+                os.remove(path)
+
+        before = path_bytes(path) if self.profiler.enabled else 0
+        arrow_format = COLUMNAR_FORMATS[file_format]
+        file_options = ds.ParquetFileFormat().make_write_options(compression=compression) \
+            if arrow_format == "parquet" else ds.IpcFileFormat().make_write_options(compression=compression)
+        extension = "parquet" if arrow_format == "parquet" else "feather"
+        # Time-ordered file names keep appended batches in load order when the dataset is read back
+        ds.write_dataset(
+            pa.Table.from_pandas(df, preserve_index=False),
+            path,
+            format=arrow_format,
+            file_options=file_options,
+            partitioning=partition_cols,
+            partitioning_flavor="hive" if partition_cols else None,
+            basename_template=f"part-{time.time_ns():020d}-{{i}}.{extension}",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        if self.profiler.enabled:
+            self.profiler.count_io(bytes_written=path_bytes(path) - before)
+
+    @profiled_step("run_pipeline")
+    def run_pipeline(self, source, destination, source_type, destination_type, api_headers=None,
+                     chunksize=None, overlap=False, source_options=None, destination_options=None, workers=None,
+                     per_file=False, cache=False, pushdown=False):
+        """Run the full ETL pipeline.
 
-    def load_to_database(self, df, table_name):
-        """Load the data into a database table."""
-        print(f"Loading data to database table: {table_name}")
-        df.to_sql(table_name, self.engine, if_exists="replace", index=False)
+        With ``chunksize`` set, file, database and columnar sources are streamed chunk by chunk so
+        peak memory depends on the chunk size rather than on the size of the source. API
+        sources cannot be streamed, as the streaming transform reads its source twice and an
+        API need not return the same records again; their runs fail with ``chunksize``. With
+        ``overlap`` also set, extract, transform and load run concurrently on separate
+        threads connected by bounded queues. Without ``chunksize``, ``workers`` runs the
+        transform on that many processes (see transform_parallel).
 
-    def run_pipeline(self, source, destination, source_type, destination_type, api_headers=None):
-        """Run the full ETL pipeline."""
-        print(f"Starting ETL pipeline at {datetime.now()}...")
+        A file source may be a glob or a directory of CSV files. Its files are read
+        concurrently and merged in sorted path order, or streamed one after another with
+        ``chunksize``. With ``per_file`` each file is instead read and transformed on its own
+        in a worker process and loaded as soon as it and the files before it are done, so
+        duplicates and outliers are judged within each file. Files that fail are reported
+        and skipped without aborting the run.
+
+        With ``cache`` set, the transformed data is cached under a fingerprint of the source
+        (see source_fingerprint), the options and the transform code. A run whose fingerprint
+        matches the last run into the same destination is skipped, and one into another
+        destination loads the cached data without extracting or transforming. Streaming,
+        per-file, incremental and API runs are not cached. ``source_options`` may name a
+        ``fingerprint_column`` (e.g. ``updated_at``) for database sources.
+
+        With ``pushdown`` a database source is transformed by the database itself (see
+        transform_in_database), so only the transformed rows are read. Incremental and
+        partitioned reads, which need ``source_options``, still transform in pandas.
+
+        ``source_options`` and ``destination_options`` are passed on to the extractor and
+        loader, for example:
+
+        - ``{"columns": [...], "filters": [...]}`` for a Parquet source
+        - ``{"compression": "zstd", "partition_cols": ["transaction_year"]}`` for a Parquet destination
+        - ``{"incremental_column": "updated_at", "tiebreaker": "id"}`` to read only new database
+          rows; the high-water mark is saved once the run succeeds
+        - ``{"pagination": {"type": "cursor"}, "concurrency": 16, "rate_limit": 50}`` to walk a
+          paginated API (``source`` may then be a list of URLs)
+
+        Returns True if the run succeeded (or had nothing to do). Extract, transform and
+        streaming errors are logged and return False; load errors propagate.
+        """
+        source_options = dict(source_options or {})
+        destination_options = destination_options or {}
+        fingerprint_column = source_options.pop("fingerprint_column", None)
+        self._pending_watermarks = {}
+        self.file_errors = []
+        pushdown = pushdown and source_type == "database" and not source_options
+        logger.info(f"Starting ETL pipeline at {datetime.now()}...")
+
+        if per_file and source_type == "file":
+            succeeded = self._run_per_file(source, destination, destination_type, workers, source_options,
+                                           destination_options)
+            if succeeded:
+                self._report_file_errors()
+                logger.info(f"ETL pipeline completed successfully at {datetime.now()}.")
+            return succeeded
+
+        if chunksize and source_type == "api":
+            logger.error("API sources cannot be streamed. Run them without chunksize.")
+            return False
+
+        if chunksize:
+            succeeded = self._run_streaming(source, destination, source_type, destination_type, chunksize, overlap,
+                                            source_options, destination_options, pushdown)
+            if succeeded:
+                self.commit_watermarks()
+                self._report_file_errors()
+                logger.info(f"ETL pipeline completed successfully at {datetime.now()}.")
+            return succeeded
 
         extractors = {
             "file": self.extract_file,
             "database": self.extract_database,
-            "api": lambda source: self.extract_api(source, headers=api_headers)
+            "api": lambda source, **options: self.extract_api(source, headers=api_headers, **options),
+            "parquet": self.extract_parquet,
+            "feather": self.extract_feather
         }
         extractor = extractors.get(source_type)
         if not extractor:
-            print("Unsupported source type. Use 'file', 'database', or 'api'.")
-            return
-        data = extractor(source)
+            logger.error("Unsupported source type. Use 'file', 'database', 'api', 'parquet' or 'feather'.")
+            return False
+
+        run_key = self._run_key(source, source_type, source_options, fingerprint_column) if cache else None
+        destination_key = digest(destination_type, destination, destination_options)
+        if run_key and self.stage_cache.last_run(destination_key) == run_key \
+                and self._destination_exists(destination, destination_type):
+            logger.info(f"Source unchanged since the last run into {destination}, nothing to do.")
+            return True
+
+        data = self.stage_cache.get(run_key) if run_key else None
+        if data is not None:
+            logger.info(f"Source unchanged, using cached transform output ({len(data)} rows).")
+        else:
+            try:
+                data = None if pushdown else extractor(source, **source_options)
+            except Exception as e:
+                logger.error(f"Error during extraction: {e}")
+                return False
+            try:
+                if pushdown:
+                    data = self.transform_in_database(source)
+                else:
+                    data = self.transform_parallel(data, workers) if workers else self.transform_data(data)
+            except Exception as e:
+                logger.error(f"Error during transformation: {e}")
+                return False
+            if run_key:
+                self.stage_cache.put(run_key, data)
+
+        loaders = {
+            "file": self.load_to_file,
+            "database": self.load_to_database,
+            "parquet": self.load_to_parquet,
+            "feather": self.load_to_feather
+        }
+        loader = loaders.get(destination_type)
+        if not loader:
+            logger.error("Unsupported destination type. Use 'file', 'database', 'parquet' or 'feather'.")
+            return False
+        loader(data, destination, **destination_options)
+        self.commit_watermarks()
+        self._report_file_errors()
+        if run_key:
+            self.stage_cache.record_run(destination_key, run_key)
+
+        logger.info(f"ETL pipeline completed successfully at {datetime.now()}.")
+        return True
+
+    def source_fingerprint(self, source, source_type, fingerprint_column=None):
+        """Fingerprint of a source's current contents, or None if it cannot be taken cheaply.
+
+        Files (every file of a glob, directory or dataset) are fingerprinted by content hash,
+        recomputed only when their size or mtime changed. Tables use ``COUNT(*)`` and
+        ``MAX(fingerprint_column)``, which catches inserts, deletes and updates that bump a
+        column such as ``updated_at``; without one, Postgres tables use a checksum of every
+        row and other databases are not fingerprinted.
+        """
+        if source_type in ("file", "parquet", "feather"):
+            if source_type == "file":
+                paths = self.resolve_paths(source)
+            elif os.path.isdir(source):
+                paths = sorted(os.path.join(root, name) for root, _, names in os.walk(source) for name in names)
+            else:
+                paths = [source]
+            return [[path, self.stage_cache.file_digest(path)] for path in paths]
+        if source_type == "database":
+            with self.engine.connect() as conn:
+                if fingerprint_column:
+                    query = f"SELECT COUNT(*), MAX({fingerprint_column}) FROM {source}"
+                    return [str(value) for value in conn.execute(text(query)).one()]
+                if self.engine.dialect.name == "postgresql":
+                    query = f"SELECT md5(string_agg(md5(t::text), '' ORDER BY md5(t::text))) FROM {source} AS t"
+                    return conn.execute(text(query)).scalar()
+        return None
+
+    def _run_key(self, source, source_type, source_options, fingerprint_column=None):
+        """Cache key of a run's transformed data, or None if the run cannot be cached."""
+        if source_options.get("incremental_column"):
+            # The watermark, not the table contents, decides what is read
+            return None
+        fingerprint = self.source_fingerprint(source, source_type, fingerprint_column)
+        if fingerprint is None:
+            return None
+        code_dir = os.path.dirname(os.path.abspath(__file__))
+        code = [self.stage_cache.file_digest(os.path.join(code_dir, name)) for name in TRANSFORM_CODE_FILES]
+        return digest(source_type, source, source_options, fingerprint, code)
+
+    def _destination_exists(self, destination, destination_type):
+        if destination_type == "database":
+            return inspect(self.engine).has_table(destination)
+        return os.path.exists(destination)
+
+    def _run_streaming(self, source, destination, source_type, destination_type, chunksize, overlap=False,
+                       source_options=None, destination_options=None, pushdown=False):
+        """Extract, transform and load chunk by chunk. Returns True on success."""
+        source_options = source_options or {}
+        destination_options = destination_options or {}
+        extractors = {
+            "file": self.extract_file,
+            "database": self.extract_database,
+            "parquet": self.extract_parquet,
+            "feather": self.extract_feather
+        }
+        extractor = extractors.get(source_type)
+        if not extractor:
+            logger.error("Unsupported source type for streaming. Use 'file', 'database', 'parquet' or 'feather'.")
+            return False
+
+        loaders = {
+            "file": self.load_to_file,
+            "database": self.load_to_database,
+            "parquet": self.load_to_parquet,
+            "feather": self.load_to_feather
+        }
+        loader = loaders.get(destination_type)
+        if not loader:
+            logger.error("Unsupported destination type. Use 'file', 'database', 'parquet' or 'feather'.")
+            return False
+
+        def make_chunks():
+            return self._profiled_chunks(extractor(source, chunksize=chunksize, **source_options), "extract_chunks")
 
         try:
-            data = self.transform_data(data)
+            if pushdown:
+                for i, chunk in enumerate(self.transform_in_database(source, chunksize)):
+                    loader(chunk, destination, append=i > 0, **destination_options)
+            elif overlap:
+                bounds = self._stream_bounds(make_chunks)
+                loaded = []
+
+                def load(chunk):
+                    loader(chunk, destination, append=bool(loaded), **destination_options)
+                    loaded.append(len(chunk))
+
+                run_stages(self._deduplicate(make_chunks()), [lambda chunk: self._transform_chunk(chunk, bounds), load])
+            else:
+                for i, chunk in enumerate(self.transform_stream(make_chunks)):
+                    loader(chunk, destination, append=i > 0, **destination_options)
         except Exception as e:
-            print(f"Error during transformation: {e}")
-            return
+            logger.error(f"Error during streaming pipeline: {e}")
+            return False
+        return True
 
+    def _run_per_file(self, source, destination, destination_type, workers=None, source_options=None,
+                      destination_options=None):
+        """Read and transform each file of ``source`` in a worker process and load it in path order.
+
+        Returns True unless loading fails; files that cannot be read or transformed are skipped.
+        """
+        source_options = source_options or {}
+        destination_options = destination_options or {}
         loaders = {
             "file": self.load_to_file,
-            "database": self.load_to_database
+            "database": self.load_to_database,
+            "parquet": self.load_to_parquet,
+            "feather": self.load_to_feather
         }
         loader = loaders.get(destination_type)
         if not loader:
-            print("Unsupported destination type. Use 'file' or 'database'.")
-            return
-        loader(data, destination)
+            logger.error("Unsupported destination type. Use 'file', 'database', 'parquet' or 'feather'.")
+            return False
 
-        print(f"ETL pipeline completed successfully at {datetime.now()}.")
+        paths = self.resolve_paths(source)
+        logger.info(f"Extracting and transforming {len(paths)} files: {source}")
+        executor = get_executor(workers)
+        source_key = f"file:{source}"
+        columns = source_options.get("columns")
+        loaded = 0
+        try:
+            learned = None
+            if source_options.get("schema") and paths:
+                learned = self.schema_cache.get(source_key)
+                # Learn from the first file that reads; the others are reported as the run reaches them
+                for path in paths if learned is None else []:
+                    try:
+                        sample = pd.read_csv(path, usecols=columns, nrows=SCHEMA_SAMPLE_ROWS)
+                    except Exception as e:
+                        self._file_failed(path, e)
+                        continue
+                    self._conform(source_key, sample)
+                    learned = self.schema_cache.get(source_key)
+                    break
+            transform = functools.partial(_read_and_transform, columns=columns, schema=learned)
+            # Keep every worker busy and one more file queued behind them
+            for path, df in self._map_ordered(paths, executor.pool.submit, transform, executor.workers + 1,
+                                              self._file_failed):
+                if df is None:
+                    continue
+                if self.profiler.enabled:
+                    self.profiler.count_io(bytes_read=path_bytes(path))
+                loader(df, destination, append=loaded > 0, **destination_options)
+                loaded += 1
+        except Exception as e:
+            logger.error(f"Error during per-file pipeline: {e}")
+            return False
+        return True
 
-    def schedule_pipeline(self, source, destination, source_type, destination_type, api_headers=None):
-        schedule.every().day.at("00:00").do(self.run_pipeline,
-                                             source=source,
-                                             destination=destination,
-                                             source_type=source_type,
-                                             destination_type=destination_type,
-                                             api_headers=api_headers)
-        print("Scheduled ETL pipeline to run daily at midnight.")
+    def _profiled_chunks(self, chunks, name):
+        """Time every chunk pulled from ``chunks`` as one run of stage ``name``."""
+        if not self.profiler.enabled:
+            return chunks
+        return self._time_chunks(iter(chunks), name)
 
+    def _time_chunks(self, chunks, name):
         while True:
-            schedule.run_pending()
-            time.sleep(1)
+            with self.profiler.stage(name) as record:
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    record.output(chunk)
+            if chunk is None:
+                return
+            yield chunk
+
+    def _report_file_errors(self):
+        if self.file_errors:
+            logger.warning(f"{len(self.file_errors)} file(s) skipped: {', '.join(path for path, _ in self.file_errors)}")
+
+    def schedule_pipeline(self, source, destination, source_type, destination_type, api_headers=None, cache=True,
+                          at="00:00", every=None, watch=None, pattern="*.csv", scheduler=None, name=None,
+                          max_concurrent=1):
+        """Run the pipeline on a schedule; with ``cache``, runs on an unchanged source are skipped.
+
+        By default the pipeline runs daily ``at`` midnight, or every ``every`` seconds. With
+        ``watch`` set to a landing directory it instead runs once for every new file matching
+        ``pattern`` (``source`` is then unused) and appends it to ``destination``. A failed
+        run is recorded as failed in the scheduler's state, and files that failed are tried
+        again (see PipelineScheduler.add).
+
+        Without a ``scheduler`` this creates one, keeping its state under ``state_dir``, and
+        blocks running it. Pass a PipelineScheduler to register several pipelines on it and
+        run them concurrently; it is returned without blocking.
+        """
+        own_scheduler = scheduler is None
+        scheduler = scheduler or PipelineScheduler(os.path.join(self.state_dir, "scheduler.json"))
+        name = name or f"{source_type}:{watch or source}->{destination_type}:{destination}"
+
+        # Each run gets its own shallow copy, so concurrent runs keep separate per-run state
+        # (file errors, pending watermarks) while sharing the engine and caches
+        if watch:
+            def run(files):
+                failed = []
+                for path in files:
+                    try:
+                        succeeded = copy.copy(self).run_pipeline(path, destination, source_type, destination_type,
+                                                                 api_headers=api_headers,
+                                                                 destination_options={"append": True})
+                    except Exception as e:
+                        # A load error fails this file only; the ones before it were appended already
+                        logger.error(f"ETL pipeline for {path} failed: {e}")
+                        succeeded = False
+                    if not succeeded:
+                        failed.append(path)
+                if failed:
+                    # Only the failed files are tried again; the others were appended already
+                    raise FilesFailed(failed)
+            scheduler.add(name, run, watch=watch, pattern=pattern, max_concurrent=max_concurrent)
+            logger.info(f"Scheduled ETL pipeline to run when files matching {pattern} land in {watch}.")
+        else:
+            def run():
+                if not copy.copy(self).run_pipeline(source, destination, source_type, destination_type,
+                                                    api_headers=api_headers, cache=cache):
+                    raise RuntimeError(f"ETL pipeline from {source} to {destination} failed")
+            scheduler.add(name, run, every=every, at=None if every else at, max_concurrent=max_concurrent)
+            logger.info(f"Scheduled ETL pipeline to run {f'every {every}s' if every else f'daily at {at}'}.")
+
+        if own_scheduler:
+            scheduler.run_forever()
+        return scheduler
+
+def _read_and_transform(path, columns=None, schema=None):
+    """Worker side of the per-file pipeline: read one CSV file, cast it to ``schema`` and transform it."""
+    df = pd.read_csv(path, usecols=columns, dtype=read_dtypes(schema) if schema else None)
+    return ETL._transform_rows(apply_schema(df, schema) if schema else df)
+
 
 if __name__ == "__main__":
+    configure_logging()
     etl = ETL()
 
-    print("Choose source type: 1) File 2) Database 3) API")
-    source_choice = input("Enter your choice (1/2/3): ").strip()
-    source_type = {"1": "file", "2": "database", "3": "api"}.get(source_choice)
+    print("Choose source type: 1) File 2) Database 3) API 4) Parquet 5) Feather")
+    source_choice = input("Enter your choice (1/2/3/4/5): ").strip()
+    source_type = {"1": "file", "2": "database", "3": "api", "4": "parquet", "5": "feather"}.get(source_choice)
 
-    if source_type == "file":
+    if source_type in ("file", "parquet", "feather"):
         source = input("Enter file path: ").strip()
     elif source_type == "database":
         source = input("Enter table name: ").strip()
@@ -162,11 +1140,11 @@ if __name__ == "__main__":
         print("Invalid choice.")
         exit()
 
-    print("Choose destination type: 1) File 2) Database")
-    dest_choice = input("Enter your choice (1/2): ").strip()
-    destination_type = {"1": "file", "2": "database"}.get(dest_choice)
+    print("Choose destination type: 1) File 2) Database 3) Parquet 4) Feather")
+    dest_choice = input("Enter your choice (1/2/3/4): ").strip()
+    destination_type = {"1": "file", "2": "database", "3": "parquet", "4": "feather"}.get(dest_choice)
 
-    if destination_type == "file":
+    if destination_type in ("file", "parquet", "feather"):
         destination = input("Enter output file path: ").strip()
     elif destination_type == "database":
         destination = input("Enter destination table name: ").strip()
@@ -181,5 +1159,8 @@ if __name__ == "__main__":
             api_headers = {k.strip(): v.strip() for k, v in (pair.split(":") for pair in headers_input.split(","))}
 
     etl.run_pipeline(source, destination, source_type, destination_type, api_headers)
+    if etl.profiler.enabled:
+        # Writes the JSON report and a Prometheus text file next to it
+        etl.profiler.write(os.getenv("ETL_METRICS_PATH", "etl_metrics.json"))
     # Uncomment to enable scheduling
     # etl.schedule_pipeline(source, destination, source_type, destination_type, api_headers=api_headers)
@@ -1,23 +1,30 @@
+import logging
+
 import pandas as pd
 import requests
 
-def extract_api(api_url, headers):
-    print(f"Extracting data from API: {api_url}")
+logger = logging.getLogger(__name__)
+
+
+def extract_api(api_url, headers, timeout=30):
+    logger.info(f"Extracting data from API: {api_url}")
     try:
-        response = requests.get(api_url, headers=headers)
+        response = requests.get(api_url, headers=headers, timeout=timeout)
         response.raise_for_status() # raise HTTPError for bad responses
         if response.headers.get("Content-Type") == "Application/json":
             return pd.jason_normalize(response.json())
         else:
-            print(f"Unsupported content type: {response.headers.get('Content-Type')}")
+            logger.error(f"Unsupported content type: {response.headers.get('Content-Type')}")
             return pd.DataFrame()
     except requests.exceptions.Timeout:
-        print("Error: API request timed out.")
+        logger.error(f"API request to {api_url} timed out.")
         return pd.DataFrame()
     except requests.exceptions.RequestException as e:
-        print(f"Error during API extraction: {e}")
+        logger.error(f"Error during API extraction: {e}")
         return pd.DataFrame()
 
-# determine the response format
-response = requests.get("https://jsonplaceholder.typicode.com/users")
-print(response.headers["Content-Type"])
\ No newline at end of file
+# Example usage: determine the response format
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    response = requests.get("https://jsonplaceholder.typicode.com/users", timeout=30)
+    logger.info(f"Content-Type: {response.headers['Content-Type']}")
@@ -1,17 +1,21 @@
+import logging
+
 import pandas as pd
-from sqlalchemy import create_engine
+from database_connection_pooling import get_engine
+
+logger = logging.getLogger(__name__)
 
 # create a database engine
-engine = create_engine("sqlite:///test.db")
+engine = get_engine("sqlite:///test.db")
 
 def extract_database(table_name, parameters):
     try:
-        print(f"Extracting data from database table: {table_name}")
+        logger.info(f"Extracting data from database table: {table_name}")
         query = f"Select * from {table_name} where id = :id"
         df = pd.read_sql(query, engine, parameters=parameters)
         if df.empty:
-            print("Warning: Query returned no results.")
+            logger.warning(f"Query on {table_name} returned no results.")
         return df
     except Exception as e:
-        print(f"Error during database extraction: {e}")
+        logger.error(f"Error during database extraction: {e}")
         return pd.DataFrame() # this returns an empty dataframe
\ No newline at end of file
@@ -1,14 +1,61 @@
+import glob
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 
+logger = logging.getLogger(__name__)
+
+
 def extract_file(file_path):
     try:
-        print(f"Extracting data from file: {file_path}")
+        logger.info(f"Extracting data from file: {file_path}")
         return pd.read_csv(file_path)
     except FileNotFoundError:
-        print(f"Error: File not found at {file_path}")
+        logger.error(f"File not found at {file_path}")
         return pd.DataFrame()
     except pd.errors.ParseError as e:
-        print(f"Error parsing file: {e}")
+        logger.error(f"Error parsing file {file_path}: {e}")
+        return pd.DataFrame()
+
+
+def extract_parquet(file_path, columns=None, filters=None):
+    """Read only the requested columns, skipping row groups that cannot match the filters."""
+    try:
+        logger.info(f"Extracting data from Parquet file: {file_path}")
+        return pd.read_parquet(file_path, columns=columns, filters=filters)
+    except FileNotFoundError:
+        logger.error(f"File not found at {file_path}")
+        return pd.DataFrame()
+    except Exception as e:
+        logger.error(f"Error reading Parquet file {file_path}: {e}")
         return pd.DataFrame()
 
 
+def _read_file(file_path):
+    """extract_files worker: the file's rows, or None if it cannot be read for any reason."""
+    try:
+        return pd.read_csv(file_path)
+    except Exception as e:
+        logger.error(f"Error reading file {file_path}: {e}")
+        return None
+
+
+def extract_files(pattern, max_workers=8):
+    """Read every CSV matching a glob (or inside a directory) on a thread pool.
+
+    Files are concatenated in sorted path order; files that fail are reported and skipped.
+    Files with a header but no rows still contribute their columns.
+    """
+    paths = sorted(glob.glob(os.path.join(pattern, "*.csv") if os.path.isdir(pattern) else pattern))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        frames = dict(zip(paths, pool.map(_read_file, paths)))
+    failed = [path for path, df in frames.items() if df is None]
+    if failed:
+        logger.warning(f"{len(failed)} file(s) skipped: {', '.join(failed)}")
+    frames = [df for df in frames.values() if df is not None]
+    # Header-only files add their columns but take no part in the dtypes of the concatenation
+    columns = list(dict.fromkeys(col for df in frames for col in df.columns))
+    frames = [df for df in frames if len(df)]
+    return (pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()).reindex(columns=columns)
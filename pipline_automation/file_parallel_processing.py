@@ -1,18 +1,159 @@
-from multiprocessing import Pool
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Pool, shared_memory
 
-# Simulated data
-data = [i for i in range(100)]
+import numpy as np
+import pandas as pd
 
 # Processing function
 def process_chunk(chunk):
     return sum(chunk)
 
 # Parallel processing
-def parallel_process(data, chunk_size):
+def parallel_process(data, chunk_size, processes=None):
     chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
-    with Pool(processes=4) as pool:
+    with Pool(processes=processes or available_cores()) as pool:
         results = pool.map(process_chunk, chunks)
     return results
 
-results = parallel_process(data, chunk_size=10)
-print(f"Processed Results: {results}")
\ No newline at end of file
+def available_cores():
+    """Number of cores this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def _is_shareable(dtype):
+    """Plain numpy numeric, boolean and datetime columns can live in shared memory."""
+    return isinstance(dtype, np.dtype) and dtype.kind in "biufmM"
+
+def _to_shared(df):
+    """Copy the shareable columns of ``df`` into shared memory blocks.
+
+    Returns the blocks (to close and unlink later), their descriptions, and the remaining
+    columns, which are small enough or irregular enough to pickle.
+    """
+    blocks, specs = [], []
+    for col, dtype in df.dtypes.items():
+        if not _is_shareable(dtype):
+            continue
+        values = df[col].to_numpy()
+        block = shared_memory.SharedMemory(create=True, size=max(1, values.nbytes))
+        np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[:] = values
+        blocks.append(block)
+        specs.append((col, block.name, values.dtype.str, len(values)))
+    rest = df[[col for col, dtype in df.dtypes.items() if not _is_shareable(dtype)]]
+    return blocks, specs, rest
+
+def _from_shared(specs, start=0, stop=None, unlink=False):
+    """Copy rows ``start:stop`` of shared columns out of their blocks."""
+    columns = {}
+    for col, name, dtype, length in specs:
+        block = shared_memory.SharedMemory(name=name)
+        try:
+            columns[col] = np.ndarray((length,), dtype=np.dtype(dtype), buffer=block.buf)[start:stop].copy()
+        finally:
+            block.close()
+            if unlink:
+                block.unlink()
+    return columns
+
+def _assemble(shared, rest, columns, index):
+    df = pd.DataFrame(shared, index=index)
+    for col in rest.columns:
+        df[col] = rest[col].array
+    return df[list(columns)]
+
+def _run_partition(func, specs, start, stop, rest, columns, index):
+    """Worker side: rebuild one partition, apply ``func`` and hand the result back through shared memory."""
+    df = _assemble(_from_shared(specs, start, stop), rest, columns, index)
+    result = func(df)
+    blocks, result_specs, result_rest = _to_shared(result)
+    for block in blocks:
+        block.close()
+    return result_specs, result_rest, list(result.columns), result.index
+
+class PartitionExecutor:
+    """Run a function over row partitions of a DataFrame on a reusable process pool.
+
+    Numeric, boolean and datetime columns travel to and from the workers through shared
+    memory instead of being pickled; only the remaining (object) columns are pickled.
+    ``func`` must be picklable (a module-level function or a functools.partial of one)
+    and must be correct on any subset of rows, so steps that need the whole frame, such
+    as de-duplication or quantiles, should run before the partitions are split. Results
+    are concatenated in partition order.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or available_cores()
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def map(self, func, df, partitions=None):
+        """Apply ``func`` to ``partitions`` row slices of ``df`` (default: one per worker)."""
+        partitions = max(1, min(partitions or self.workers, len(df)))
+        bounds = np.linspace(0, len(df), partitions + 1).astype(int)
+        blocks, specs, rest = _to_shared(df)
+        try:
+            futures = [
+                self.pool.submit(_run_partition, func, specs, start, stop, rest.iloc[start:stop],
+                                 list(df.columns), df.index[start:stop])
+                for start, stop in zip(bounds[:-1], bounds[1:])
+            ]
+            # Collect every partition even after a failure so no result block is left behind
+            results, error = [], None
+            for future in futures:
+                try:
+                    result_specs, result_rest, columns, index = future.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                results.append(_assemble(_from_shared(result_specs, unlink=True), result_rest, columns, index))
+            if error:
+                raise error
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+        return pd.concat(results) if len(results) > 1 else results[0]
+
+_default_executor = None
+
+def get_executor(workers=None):
+    """Process-wide PartitionExecutor, so worker processes are reused across calls."""
+    global _default_executor
+    if _default_executor is None or (workers and _default_executor.workers != workers):
+        if _default_executor is not None:
+            _default_executor.close()
+        _default_executor = PartitionExecutor(workers)
+    return _default_executor
+
+def _double_amount(df):
+    df["amount"] = df["amount"] * 2
+    return df
+
+if __name__ == "__main__":
+    # Simulated data
+    data = [i for i in range(100)]
+    results = parallel_process(data, chunk_size=10)
+    print(f"Processed Results: {results}")
+
+    frame = pd.DataFrame({"amount": np.arange(1_000_000, dtype=float), "name": ["x"] * 1_000_000})
+    with PartitionExecutor() as executor:
+        doubled = executor.map(_double_amount, frame)
+    print(f"Partitioned Results: {doubled['amount'].sum()} on {executor.workers} workers")
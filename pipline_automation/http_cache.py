@@ -0,0 +1,165 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+import pandas as pd
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Seconds between index saves triggered only by cache hits (which just update access times)
+INDEX_SAVE_SECONDS = 30
+
+
+class ResponseCache:
+    """Persistent cache of parsed API responses, revalidated with conditional requests.
+
+    Entries are keyed by URL, query parameters and request headers. Each entry keeps the
+    response's ETag/Last-Modified validators and the parsed DataFrame in Parquet (pickle
+    when the frame holds values Parquet cannot store). While an entry is fresh it is used
+    without a request; afterwards it is revalidated with If-None-Match/If-Modified-Since
+    and reused as-is on a 304. Freshness comes from ``Cache-Control: max-age`` unless a
+    ``ttl_overrides`` pattern (regex matched against the URL) sets it. Least recently used
+    entries are evicted once the stored bodies exceed ``max_bytes``; hits record their
+    access time in the index at most every INDEX_SAVE_SECONDS.
+    """
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 ** 2, ttl_overrides=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl_overrides = [(re.compile(pattern), ttl) for pattern, ttl in (ttl_overrides or {}).items()]
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.lock = threading.Lock()
+        self.saved_at = 0
+        self.index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+
+    def _key(self, url, params, headers):
+        raw = json.dumps([url, sorted((params or {}).items()), sorted((headers or {}).items())], default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _ttl(self, url, response):
+        for pattern, ttl in self.ttl_overrides:
+            if pattern.search(url):
+                return ttl
+        match = re.search(r"max-age=(\d+)", response.headers.get("Cache-Control", ""))
+        return int(match.group(1)) if match else 0
+
+    def fetch(self, url, headers=None, params=None, parse=None, timeout=30, session=None):
+        """Return the parsed DataFrame for a GET request, from the cache when it is still valid."""
+        parse = parse or (lambda response: pd.DataFrame(response.json()))
+        http = session or requests
+        key = self._key(url, params, headers)
+        with self.lock:
+            entry = self.index.get(key)
+
+        if entry and time.time() - entry["stored_at"] < entry["ttl"]:
+            cached = self._read_body(key, entry)
+            if cached is not None:
+                # Keep the access times eviction relies on, without a write per hit
+                with self.lock:
+                    if time.time() - self.saved_at >= INDEX_SAVE_SECONDS:
+                        self._save_index()
+                return cached
+
+        request_headers = dict(headers or {})
+        if entry:
+            if entry.get("etag"):
+                request_headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                request_headers["If-Modified-Since"] = entry["last_modified"]
+        response = http.get(url, headers=request_headers, params=params, timeout=timeout)
+
+        if response.status_code == 304 and entry:
+            cached = self._read_body(key, entry)
+            if cached is not None:
+                logger.info(f"Not modified, using cached response for: {url}")
+                with self.lock:
+                    entry.update(stored_at=time.time(), ttl=self._ttl(url, response))
+                    self._save_index()
+                return cached
+            # The body went missing; fetch it again unconditionally
+            response = http.get(url, headers=headers, params=params, timeout=timeout)
+
+        response.raise_for_status()
+        df = parse(response)
+        if response.headers.get("ETag") or response.headers.get("Last-Modified") or self._ttl(url, response):
+            self._store(key, url, response, df)
+        return df
+
+    def _body_path(self, key, body_format):
+        return os.path.join(self.cache_dir, f"{key}.{body_format}")
+
+    def _read_body(self, key, entry):
+        path = self._body_path(key, entry["format"])
+        if not os.path.exists(path):
+            return None
+        with self.lock:
+            entry["last_access"] = time.time()
+        return pd.read_parquet(path) if entry["format"] == "parquet" else pd.read_pickle(path)
+
+    def _store(self, key, url, response, df):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        body_format = "parquet"
+        path = self._body_path(key, body_format)
+        try:
+            df.to_parquet(path + ".tmp", index=False)
+        except Exception:
+            body_format = "pkl"
+            path = self._body_path(key, body_format)
+            df.to_pickle(path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+        now = time.time()
+        with self.lock:
+            old = self.index.get(key)
+            if old and old["format"] != body_format and os.path.exists(self._body_path(key, old["format"])):
+                os.remove(self._body_path(key, old["format"]))
+            self.index[key] = {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "stored_at": now,
+                "last_access": now,
+                "ttl": self._ttl(url, response),
+                "format": body_format,
+                "size": os.path.getsize(path),
+            }
+            self._evict()
+            self._save_index()
+
+    def _evict(self):
+        """Drop least recently used entries until the stored bodies fit in max_bytes."""
+        total = sum(entry["size"] for entry in self.index.values())
+        for key, entry in sorted(self.index.items(), key=lambda item: item[1]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            path = self._body_path(key, entry["format"])
+            if os.path.exists(path):
+                os.remove(path)
+            total -= entry["size"]
+            del self.index[key]
+
+    def _save_index(self):
+        with open(self.index_path + ".tmp", "w") as f:
+            json.dump(self.index, f)
+        os.replace(self.index_path + ".tmp", self.index_path)
+        self.saved_at = time.time()
+
+    def invalidate(self, url=None):
+        """Remove the entries for ``url``, or every entry if no URL is given."""
+        with self.lock:
+            for key, entry in list(self.index.items()):
+                if url is None or entry["url"] == url:
+                    path = self._body_path(key, entry["format"])
+                    if os.path.exists(path):
+                        os.remove(path)
+                    del self.index[key]
+            if os.path.isdir(self.cache_dir):
+                self._save_index()
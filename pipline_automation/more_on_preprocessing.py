@@ -1,23 +1,43 @@
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 import re
+import logging
 from datetime import datetime
+from pipeline_metrics import configure_logging, profiled_step
 
+logger = logging.getLogger(__name__)
+
+# Characters kept by sanitize_text_fields
+SANITIZE_PATTERN = r'[^a-zA-Z0-9@._\-\s]'
+# The same pattern for Arrow's RE2 engine, whose \s is ASCII-only: spell out every
+# character Python's re treats as whitespace so both engines remove exactly the same text.
+ARROW_SANITIZE_PATTERN = (r'[^a-zA-Z0-9@._\-\t\n\x0b\f\r\x1c-\x1f \x{85}\x{a0}\x{1680}\x{2000}-\x{200a}'
+                          r'\x{2028}\x{2029}\x{202f}\x{205f}\x{3000}]')
+
+@profiled_step("remove_duplicates")
 def remove_duplicates(df):
     """Remove duplicate rows."""
-    print("Removing duplicate rows...")
+    logger.info("Removing duplicate rows...")
     return df.drop_duplicates()
 
-def handle_missing_values(df):
-    """Handle missing values by filling or dropping depending on the column."""
-    print("Handling missing values...")
+@profiled_step("handle_missing_values")
+def handle_missing_values(df, means=None):
+    """Handle missing values by filling or dropping depending on the column.
+
+    ``means`` overrides the column means used as fill values, e.g. with the merged moments
+    of a chunked source (quantile_sketch.ColumnSketch.means()).
+    """
+    logger.info("Handling missing values...")
+    means = means or {}
     # Fill missing emails with a default
     if 'email' in df.columns:
         df['email'] = df['email'].fillna("unknown@example.com")
 
     # Fill missing numerical values with the column mean
     for col in df.select_dtypes(include=['float64', 'int64']).columns:
-        df[col] = df[col].fillna(df[col].mean())
+        df[col] = df[col].fillna(means[col] if col in means else df[col].mean())
 
     # Drop rows where critical columns have missing values
     critical_columns = ['id', 'email']
@@ -25,59 +45,71 @@ def handle_missing_values(df):
 
     return df
 
-def detect_and_handle_outliers(df, column):
-    """Detect and handle outliers using the IQR method."""
-    print(f"Handling outliers in column: {column}...")
+@profiled_step("detect_and_handle_outliers")
+def detect_and_handle_outliers(df, column, bounds=None):
+    """Detect and handle outliers using the IQR method.
+
+    ``bounds`` overrides the (lower, upper) limits, e.g. with ones computed over a chunked
+    source by quantile_sketch.ColumnSketch.iqr_bounds().
+    """
+    logger.info(f"Handling outliers in column: {column}...")
     if column in df.columns:
-        q1 = df[column].quantile(0.25)
-        q3 = df[column].quantile(0.75)
-        iqr = q3 - q1
-        lower_bound = q1 - 1.5 * iqr
-        upper_bound = q3 + 1.5 * iqr
+        if bounds is None:
+            q1 = df[column].quantile(0.25)
+            q3 = df[column].quantile(0.75)
+            iqr = q3 - q1
+            bounds = (q1 - 1.5 * iqr, q3 + 1.5 * iqr)
+        lower_bound, upper_bound = bounds
         df = df[(df[column] >= lower_bound) & (df[column] <= upper_bound)]
     return df
 
+@profiled_step("sanitize_text_fields")
 def sanitize_text_fields(df):
     """Sanitize text fields to remove unwanted characters."""
-    print("Sanitizing text fields...")
+    logger.info("Sanitizing text fields...")
     for col in df.select_dtypes(include=['object']):
-        df[col] = df[col].apply(lambda x: re.sub(r'[^a-zA-Z0-9@._\-\s]', '', str(x)) if pd.notnull(x) else x)
+        df[col] = df[col].apply(lambda x: re.sub(SANITIZE_PATTERN, '', str(x)) if pd.notnull(x) else x)
     return df
 
+@profiled_step("standardize_date_formats")
 def standardize_date_formats(df):
     """Convert all date columns to a standard format."""
-    print("Standardizing date formats...")
+    logger.info("Standardizing date formats...")
     for col in df.select_dtypes(include=['object']):
         if "date" in col.lower():
             df[col] = pd.to_datetime(df[col], errors='coerce')
     return df
 
+@profiled_step("add_derived_columns")
 def add_derived_columns(df):
     """Add derived columns for analysis."""
-    print("Adding derived columns...")
+    logger.info("Adding derived columns...")
     if 'amount' in df.columns:
         df['amount_squared'] = df['amount'] ** 2
     if 'transaction_date' in df.columns:
         df['transaction_year'] = df['transaction_date'].dt.year
     return df
 
+@profiled_step("validate_data")
 def validate_data(df):
     """Perform data validation checks."""
-    print("Validating data...")
+    logger.info("Validating data...")
     if 'id' in df.columns and df['id'].isnull().any():
         raise ValueError("Missing ID values detected!")
     if 'email' in df.columns and not df['email'].str.contains('@').all():
         raise ValueError("Invalid email addresses detected!")
     return df
 
+@profiled_step("drop_null_threshold")
 def drop_null_threshold(df, threshold=0.5):
     """Drop columns where more than a threshold of values are missing."""
-    print(f"Dropping columns with more than {threshold*100}% missing values...")
+    logger.info(f"Dropping columns with more than {threshold*100}% missing values...")
     return df.loc[:, df.isnull().mean() < threshold]
 
-def transform_data(df):
-    """Master transformation function to handle all steps."""
-    print("Starting data transformation...")
+@profiled_step("transform_data_stepwise")
+def transform_data_stepwise(df):
+    """Apply every transformation step one after another (reference for TransformPlan)."""
+    logger.info("Starting data transformation...")
     df = remove_duplicates(df)
     df = handle_missing_values(df)
     df = detect_and_handle_outliers(df, 'amount')
@@ -86,7 +118,184 @@ def transform_data(df):
     df = add_derived_columns(df)
     df = validate_data(df)
     df = drop_null_threshold(df, threshold=0.5)
-    print("Data transformation complete.")
+    logger.info("Data transformation complete.")
+    return df
+
+class TransformPlan:
+    """Builder that compiles the steps above into a minimal number of vectorized passes.
+
+    Steps are added in the order transform_data_stepwise applies them (any may be left
+    out) and the result is identical to chaining the step functions. Running the plan
+    builds one boolean row mask from the duplicate, missing-value and outlier filters,
+    takes the surviving rows with a single copy, and then rewrites only the columns that
+    change: fills, sanitizing via Arrow regex kernels, date parsing and derived columns.
+    """
+
+    STEP_ORDER = [
+        "remove_duplicates",
+        "handle_missing_values",
+        "detect_and_handle_outliers",
+        "sanitize_text_fields",
+        "standardize_date_formats",
+        "add_derived_columns",
+        "validate_data",
+        "drop_null_threshold",
+    ]
+
+    def __init__(self):
+        self.steps = {}
+
+    def _add(self, step, **options):
+        position = self.STEP_ORDER.index(step)
+        if any(self.STEP_ORDER.index(added) >= position for added in self.steps):
+            raise ValueError(f"Step {step} must come before {', '.join(self.steps)} and be added once.")
+        self.steps[step] = options
+        return self
+
+    def remove_duplicates(self):
+        return self._add("remove_duplicates")
+
+    def handle_missing_values(self, means=None):
+        return self._add("handle_missing_values", means=means or {})
+
+    def detect_and_handle_outliers(self, column, bounds=None):
+        return self._add("detect_and_handle_outliers", column=column, bounds=bounds)
+
+    def sanitize_text_fields(self):
+        return self._add("sanitize_text_fields")
+
+    def standardize_date_formats(self):
+        return self._add("standardize_date_formats")
+
+    def add_derived_columns(self):
+        return self._add("add_derived_columns")
+
+    def validate_data(self):
+        return self._add("validate_data")
+
+    def drop_null_threshold(self, threshold=0.5):
+        return self._add("drop_null_threshold", threshold=threshold)
+
+    @profiled_step("transform_plan")
+    def run(self, df):
+        """Apply the plan to ``df`` without modifying it."""
+        steps = self.steps
+        keep = np.ones(len(df), dtype=bool)
+        if "remove_duplicates" in steps:
+            keep &= ~df.duplicated().to_numpy()
+
+        # Fill values are computed over the de-duplicated rows, as handle_missing_values does
+        fills = {}
+        if "handle_missing_values" in steps:
+            if 'email' in df.columns:
+                fills['email'] = "unknown@example.com"
+            means = steps["handle_missing_values"]["means"]
+            for col in self._columns_of(df, [np.float64, np.int64]):
+                column = df[col]
+                if col != 'email' and column[keep].isna().any():
+                    fills[col] = means[col] if col in means else column[keep].mean()
+            critical_columns = ['id', 'email']
+            for col in critical_columns:
+                if col in df.columns and pd.isnull(fills.get(col)):
+                    keep &= df[col].notna().to_numpy()
+
+        if "detect_and_handle_outliers" in steps and steps["detect_and_handle_outliers"]["column"] in df.columns:
+            column = steps["detect_and_handle_outliers"]["column"]
+            values = df[column].fillna(fills[column]) if column in fills else df[column]
+            bounds = steps["detect_and_handle_outliers"]["bounds"]
+            if bounds is None:
+                kept = values[keep]
+                q1 = kept.quantile(0.25)
+                q3 = kept.quantile(0.75)
+                iqr = q3 - q1
+                bounds = (q1 - 1.5 * iqr, q3 + 1.5 * iqr)
+            lower_bound, upper_bound = bounds
+            keep &= ((values >= lower_bound) & (values <= upper_bound)).to_numpy()
+
+        # The only row copy: everything after this rewrites whole columns
+        df = df.copy(deep=False) if keep.all() else df.take(np.flatnonzero(keep))
+        for col, value in fills.items():
+            if df[col].isna().any():
+                df[col] = df[col].fillna(value)
+
+        if "sanitize_text_fields" in steps:
+            for col in self._columns_of(df, [object]):
+                df[col] = self._sanitize_column(df[col])
+
+        if "standardize_date_formats" in steps:
+            for col in self._columns_of(df, [object]):
+                if "date" in col.lower():
+                    df[col] = pd.to_datetime(df[col], errors='coerce')
+
+        if "add_derived_columns" in steps:
+            if 'amount' in df.columns:
+                df['amount_squared'] = df['amount'] ** 2
+            if 'transaction_date' in df.columns:
+                df['transaction_year'] = df['transaction_date'].dt.year
+
+        if "validate_data" in steps:
+            if 'id' in df.columns and df['id'].isnull().any():
+                raise ValueError("Missing ID values detected!")
+            if 'email' in df.columns and not self._all_contain(df['email'], '@'):
+                raise ValueError("Invalid email addresses detected!")
+
+        if "drop_null_threshold" in steps:
+            df = df.loc[:, df.isnull().mean() < steps["drop_null_threshold"]["threshold"]]
+        return df
+
+    @staticmethod
+    def _columns_of(df, dtypes):
+        """Names of the columns with one of ``dtypes``, without the copy select_dtypes makes."""
+        dtypes = [np.dtype(dtype) for dtype in dtypes]
+        return [col for col, dtype in df.dtypes.items() if dtype in dtypes]
+
+    @staticmethod
+    def _all_contain(series, substring):
+        """``series.str.contains(substring).all()``, on Arrow kernels when the values are all strings."""
+        if pd.api.types.infer_dtype(series, skipna=True) == "string":
+            return pc.all(pc.match_substring(pa.array(series, type=pa.large_string(), from_pandas=True),
+                                             substring)).as_py() is not False
+        return series.str.contains(substring, regex=False).all()
+
+    @staticmethod
+    def _sanitize_column(series):
+        """Vectorized equivalent of the per-cell re.sub in sanitize_text_fields."""
+        values = series.to_numpy()
+        present = pd.notna(values)
+        if not present.any():
+            # Matches the dtype inference Series.apply does on an all-null column
+            return series.infer_objects()
+        all_present = present.all()
+        strings = values if all_present else values[present]
+        if pd.api.types.infer_dtype(strings, skipna=False) != "string":
+            strings = np.array([str(x) for x in strings], dtype=object)
+        cleaned = pc.replace_substring_regex(pa.array(strings, type=pa.large_string()), ARROW_SANITIZE_PATTERN, "")
+        cleaned = cleaned.to_numpy(zero_copy_only=False)
+        if all_present:
+            result = cleaned
+        else:
+            result = values.copy()
+            result[present] = cleaned
+        return pd.Series(result, index=series.index, name=series.name)
+
+def build_default_plan():
+    """The plan equivalent to transform_data_stepwise."""
+    return (TransformPlan()
+            .remove_duplicates()
+            .handle_missing_values()
+            .detect_and_handle_outliers('amount')
+            .sanitize_text_fields()
+            .standardize_date_formats()
+            .add_derived_columns()
+            .validate_data()
+            .drop_null_threshold(threshold=0.5))
+
+@profiled_step("transform_data")
+def transform_data(df):
+    """Master transformation function to handle all steps."""
+    logger.info("Starting data transformation...")
+    df = build_default_plan().run(df)
+    logger.info("Data transformation complete.")
     return df
 
 # Example usage
@@ -100,6 +309,7 @@ if __name__ == "__main__":
         "extra_col": [None, None, None, None]
     }
 
+    configure_logging()
     df = pd.DataFrame(data)
     print("Raw Data:")
     print(df)
@@ -0,0 +1,361 @@
+import collections
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+
+from database_connection_pooling import pool_metrics
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+def _peak_rss():
+    """Peak resident set size of this process in bytes (0 where it cannot be read)."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def frame_bytes(data):
+    """Shallow in-memory size of a DataFrame or Series; cheap enough to take on every chunk."""
+    usage = data.memory_usage(index=False)
+    return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+
+
+def path_bytes(path):
+    """Size on disk of a file, or of every file under a directory (0 if it does not exist)."""
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+class StageRecord:
+    """What one run of a stage consumed; set ``rows_out`` and friends before it ends.
+
+    ``frame_bytes_in``/``frame_bytes_out`` are in-memory DataFrame sizes;
+    ``bytes_read``/``bytes_written`` are bytes of files and datasets read and written.
+    """
+
+    __slots__ = ("name", "rows_in", "rows_out", "frame_bytes_in", "frame_bytes_out", "bytes_read", "bytes_written")
+
+    def __init__(self, name, rows_in=None, frame_bytes_in=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.frame_bytes_in = frame_bytes_in
+        self.frame_bytes_out = None
+        self.bytes_read = None
+        self.bytes_written = None
+
+    def output(self, df):
+        """Record a DataFrame as the stage's output."""
+        self.rows_out = len(df)
+        self.frame_bytes_out = frame_bytes(df)
+        return df
+
+
+class _NullRecord:
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        pass
+
+    def output(self, df):
+        return df
+
+
+class _NullStage:
+    """Context manager handed out while profiling is off, so a disabled stage costs one call."""
+
+    record = _NullRecord()
+
+    def __enter__(self):
+        return self.record
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, profiler, name, rows_in, frame_bytes_in):
+        self.profiler = profiler
+        self.record = StageRecord(name, rows_in, frame_bytes_in)
+
+    def __enter__(self):
+        stack = self.profiler._stack()
+        if stack:
+            self.record.name = f"{stack[-1].record.name}/{self.record.name}"
+        stack.append(self)
+        logger.debug("Stage %s started", self.record.name)
+        self.rss = _peak_rss()
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+        return self.record
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        rss = _peak_rss() - self.rss
+        self.profiler._stack().pop()
+        self.profiler._add(self.record, wall, cpu, rss, failed=exc_type is not None)
+        logger.debug("Stage %s finished in %.3fs", self.record.name, wall)
+        return False
+
+
+class PipelineProfiler:
+    """Per-stage wall time, CPU time, rows, bytes and peak RSS growth.
+
+    Wrap work in ``with profiler.stage("load", rows_in=len(df)) as record:`` and set
+    ``record.rows_out``/``frame_bytes_out`` (or call ``record.output(df)``); code doing I/O
+    inside a stage reports it with ``count_io``. Stages opened inside
+    another stage on the same thread are named ``outer/inner``. Repeated runs of a stage,
+    such as one per chunk, are added up. CPU time is the whole process's, so stages running
+    side by side on threads see each other's CPU. While disabled, ``stage`` returns a
+    shared no-op context and records nothing.
+
+    With ``sample_interval`` set, enabled stages also run a StackSampler over the
+    profiled thread; see ``samples``. ``pool_metrics`` is a callable returning connection
+    pool metrics by DSN (see database_connection_pooling), exported with the stages.
+    """
+
+    def __init__(self, enabled=False, sample_interval=None, pool_metrics=None):
+        self.enabled = enabled
+        self.sample_interval = sample_interval
+        self.pool_metrics = pool_metrics
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.stats = collections.OrderedDict()
+        self.sampler = None
+
+    def enable(self, sample_interval=None):
+        self.enabled = True
+        self.sample_interval = sample_interval or self.sample_interval
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self.lock:
+            self.stats.clear()
+        if self.sampler is not None:
+            self.sampler.stop()
+            self.sampler = None
+
+    def _stack(self):
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def stage(self, name, rows_in=None, frame_bytes_in=None):
+        if not self.enabled:
+            return NULL_STAGE
+        if self.sample_interval and self.sampler is None:
+            self.sampler = StackSampler(self.sample_interval)
+            self.sampler.start()
+        return _Stage(self, name, rows_in, frame_bytes_in)
+
+    def count_io(self, bytes_read=0, bytes_written=0):
+        """Add bytes read from or written to storage to the innermost stage running on this thread."""
+        stack = self._stack() if self.enabled else None
+        if not stack:
+            return
+        record = stack[-1].record
+        record.bytes_read = (record.bytes_read or 0) + bytes_read
+        record.bytes_written = (record.bytes_written or 0) + bytes_written
+
+    def _add(self, record, wall, cpu, rss, failed=False):
+        with self.lock:
+            stats = self.stats.get(record.name)
+            if stats is None:
+                stats = self.stats[record.name] = {
+                    "calls": 0, "failures": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0, "rows_in": 0,
+                    "rows_out": 0, "frame_bytes_in": 0, "frame_bytes_out": 0, "bytes_read": 0,
+                    "bytes_written": 0, "peak_rss_delta_bytes": 0,
+                }
+            stats["calls"] += 1
+            stats["failures"] += int(failed)
+            stats["wall_seconds"] += wall
+            stats["cpu_seconds"] += cpu
+            for field in ("rows_in", "rows_out", "frame_bytes_in", "frame_bytes_out", "bytes_read", "bytes_written"):
+                value = getattr(record, field)
+                if value is not None:
+                    stats[field] += int(value)
+            stats["peak_rss_delta_bytes"] = max(stats["peak_rss_delta_bytes"], rss)
+
+    def samples(self):
+        """Collapsed stacks (``outer;inner count``) gathered by the sampler, for flame graph tools."""
+        if self.sampler is None:
+            return {}
+        return self.sampler.collapsed()
+
+    def to_dict(self):
+        with self.lock:
+            return {name: dict(stats) for name, stats in self.stats.items()}
+
+    def to_json(self, **kwargs):
+        metrics = {"stages": self.to_dict()}
+        if self.pool_metrics is not None:
+            metrics["pools"] = self.pool_metrics()
+        return json.dumps(metrics, **kwargs)
+
+    def to_prometheus(self, prefix="etl_stage", pool_prefix="etl_pool"):
+        """Prometheus text exposition of the stage totals, followed by the connection pool metrics."""
+        metrics = [
+            ("calls", "calls_total", "counter", "Times the stage ran"),
+            ("failures", "failures_total", "counter", "Times the stage raised"),
+            ("wall_seconds", "wall_seconds_total", "counter", "Wall-clock time spent in the stage"),
+            ("cpu_seconds", "cpu_seconds_total", "counter", "Process CPU time spent in the stage"),
+            ("rows_in", "rows_in_total", "counter", "Rows handed to the stage"),
+            ("rows_out", "rows_out_total", "counter", "Rows produced by the stage"),
+            ("frame_bytes_in", "frame_bytes_in_total", "counter", "In-memory size of the frames handed to the stage"),
+            ("frame_bytes_out", "frame_bytes_out_total", "counter", "In-memory size of the frames the stage produced"),
+            ("bytes_read", "bytes_read_total", "counter", "Bytes of files and datasets the stage read"),
+            ("bytes_written", "bytes_written_total", "counter", "Bytes of files and datasets the stage wrote"),
+            ("peak_rss_delta_bytes", "peak_rss_delta_bytes", "gauge", "Largest growth of peak RSS during one run"),
+        ]
+        stats = self.to_dict()
+        lines = []
+        for field, suffix, kind, description in metrics:
+            name = f"{prefix}_{suffix}"
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for stage, values in stats.items():
+                lines.append(f'{name}{{stage="{_label(stage)}"}} {values[field]}')
+        if self.pool_metrics is not None:
+            lines.extend(_pool_prometheus(self.pool_metrics(), pool_prefix))
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write ``path`` (JSON) and ``path`` with a .prom suffix (Prometheus text)."""
+        with open(path, "w") as f:
+            f.write(self.to_json(indent=2))
+        with open(os.path.splitext(path)[0] + ".prom", "w") as f:
+            f.write(self.to_prometheus())
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _pool_prometheus(pools, prefix):
+    """Prometheus lines for PoolRegistry.pool_metrics() output."""
+    metrics = [
+        ("in_use", "in_use", "gauge", "Connections checked out right now"),
+        ("peak_in_use", "peak_in_use", "gauge", "Most connections checked out at once"),
+        ("checkouts", "checkouts_total", "counter", "Connections handed out by the pool"),
+        ("connects", "connects_total", "counter", "New database connections opened"),
+        ("invalidations", "invalidations_total", "counter", "Connections discarded as broken or stale"),
+        ("timeouts", "timeouts_total", "counter", "Checkouts that gave up waiting for a free connection"),
+        ("connect_errors", "connect_errors_total", "counter", "Checkouts that failed to open a connection"),
+    ]
+    histograms = [
+        ("wait_time", "wait_seconds", "Time spent getting a connection out of the pool"),
+        ("checkout_latency", "checkout_latency_seconds", "Time spent getting a connection, including the pre-ping"),
+    ]
+    lines = []
+    for field, suffix, kind, description in metrics:
+        name = f"{prefix}_{suffix}"
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        for dsn, values in pools.items():
+            lines.append(f'{name}{{pool="{_label(dsn)}"}} {values[field]}')
+    for field, suffix, description in histograms:
+        name = f"{prefix}_{suffix}"
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} histogram")
+        for dsn, values in pools.items():
+            pool = _label(dsn)
+            histogram = values[field]
+            for bound, count in histogram["buckets"].items():
+                le = "+Inf" if bound == "inf" else bound
+                lines.append(f'{name}_bucket{{pool="{pool}",le="{le}"}} {count}')
+            lines.append(f'{name}_sum{{pool="{pool}"}} {histogram["sum"]}')
+            lines.append(f'{name}_count{{pool="{pool}"}} {histogram["count"]}')
+    return lines
+
+
+class StackSampler:
+    """Sample the stack of one thread every ``interval`` seconds on a daemon thread."""
+
+    def __init__(self, interval=0.01, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.counts = collections.Counter()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            stack = []
+            while frame is not None:
+                stack.append(f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)})")
+                frame = frame.f_back
+            self.counts[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return dict(self.counts)
+
+
+_profiler = PipelineProfiler(enabled=os.getenv("ETL_PROFILE", "").lower() in ("1", "true", "yes"),
+                             sample_interval=float(os.getenv("ETL_PROFILE_SAMPLE_INTERVAL", 0)) or None,
+                             pool_metrics=pool_metrics)
+
+
+def get_profiler():
+    """Process-wide profiler (enabled by ETL_PROFILE=1; ETL_PROFILE_SAMPLE_INTERVAL adds stack sampling)."""
+    return _profiler
+
+
+def profiled_step(name):
+    """Run the decorated function as stage ``name`` of the process-wide profiler.
+
+    Rows and in-memory size in come from the first DataFrame or Series argument, rows and
+    size out from a DataFrame result. While profiling is off the function is called directly.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _profiler.enabled:
+                return func(*args, **kwargs)
+            data = next((arg for arg in args if isinstance(arg, (pd.DataFrame, pd.Series))), None)
+            rows_in = len(data) if data is not None else None
+            frame_bytes_in = frame_bytes(data) if data is not None else None
+            with _profiler.stage(name, rows_in, frame_bytes_in) as record:
+                result = func(*args, **kwargs)
+                if isinstance(result, pd.DataFrame):
+                    record.output(result)
+                return result
+        return wrapper
+    return decorate
+
+
+def configure_logging(level=None):
+    """Log to stderr at ``level`` (default: the ETL_LOG_LEVEL environment variable, else INFO)."""
+    logging.basicConfig(level=level or os.getenv("ETL_LOG_LEVEL", "INFO"),
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
@@ -0,0 +1,211 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+
+class KLLSketch:
+    """Mergeable streaming quantile sketch (KLL) for one numeric column.
+
+    Values are kept in levels of compactors; an item on level ``h`` stands for ``2 ** h``
+    input values. When the sketch outgrows its budget, the lowest full level is sorted and
+    every other item is promoted, so memory stays O(k) however many values are added.
+    Sketches built on separate chunks or processes can be merged and answer the same
+    queries as one sketch built on all the data. The normalized rank error is about
+    ``2.3 / k ** 0.97`` (see ``from_error``). Until more than ``k`` values are added the
+    sketch is exact, with the same linear interpolation as ``Series.quantile``.
+    """
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.rng = np.random.default_rng(seed)
+
+    @classmethod
+    def from_error(cls, error, seed=None):
+        """Sketch sized for a normalized rank error of about ``error`` (e.g. 0.01 for 1%)."""
+        return cls(k=max(8, math.ceil((2.296 / error) ** (1 / 0.9723))), seed=seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def update(self, values):
+        """Add an array or Series of values; nulls are ignored as Series.quantile does."""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self.count += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Fold another sketch into this one."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _compress(self):
+        while sum(len(items) for items in self.levels) > sum(self._capacity(h) for h in range(len(self.levels))):
+            for level, items in enumerate(self.levels):
+                if len(items) >= self._capacity(level):
+                    break
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[level])
+            # An odd item out stays behind so the total weight is preserved exactly
+            leftover = items[-1:] if len(items) % 2 else items[:0]
+            pairs = items[:len(items) - len(leftover)]
+            promoted = pairs[self.rng.integers(2)::2]
+            self.levels[level] = leftover
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+
+    def quantile(self, q):
+        """Estimate the q-th quantile (a float or a list of floats)."""
+        if np.ndim(q):
+            return [self.quantile(x) for x in q]
+        if not self.count:
+            return np.nan
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level_items), 2 ** h, dtype=np.int64)
+                                  for h, level_items in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items = items[order]
+        last_rank = np.cumsum(weights[order]) - 1
+
+        rank = q * (self.count - 1)
+        lower = items[np.searchsorted(last_rank, math.floor(rank))]
+        upper = items[np.searchsorted(last_rank, math.ceil(rank))]
+        value = lower + (upper - lower) * (rank - math.floor(rank))
+        return float(min(max(value, self.min), self.max))
+
+
+class Moments:
+    """Mergeable count/mean/variance of a column (Chan et al. parallel update)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values):
+            other = Moments()
+            other.count = len(values)
+            other.mean = values.mean()
+            other.m2 = ((values - other.mean) ** 2).sum()
+            self.merge(other)
+        return self
+
+    def merge(self, other):
+        count = self.count + other.count
+        if count:
+            delta = other.mean - self.mean
+            self.mean += delta * other.count / count
+            self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+            self.count = count
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+
+class ColumnSketch:
+    """Quantile sketch plus moments for each numeric column of a chunked source."""
+
+    def __init__(self, columns=None, error=0.01, seed=None):
+        self.columns = columns
+        self.error = error
+        self.seed = seed
+        self.quantiles = {}
+        self.moments = {}
+
+    def update(self, chunk):
+        columns = self.columns or chunk.select_dtypes(include=['number']).columns
+        for col in columns:
+            if col not in chunk.columns:
+                continue
+            if col not in self.quantiles:
+                self.quantiles[col] = KLLSketch.from_error(self.error, seed=self.seed)
+                self.moments[col] = Moments()
+            self.quantiles[col].update(chunk[col])
+            self.moments[col].update(chunk[col])
+        return self
+
+    def merge(self, other):
+        for col, sketch in other.quantiles.items():
+            if col in self.quantiles:
+                self.quantiles[col].merge(sketch)
+                self.moments[col].merge(other.moments[col])
+            else:
+                self.quantiles[col] = sketch
+                self.moments[col] = other.moments[col]
+        return self
+
+    def means(self):
+        return {col: moments.mean if moments.count else np.nan for col, moments in self.moments.items()}
+
+    def iqr_bounds(self, column, factor=1.5):
+        q1, q3 = self.quantiles[column].quantile([0.25, 0.75])
+        iqr = q3 - q1
+        return q1 - factor * iqr, q3 + factor * iqr
+
+
+def sketch_chunks(chunks, columns=None, error=0.01, seed=None):
+    """Build a ColumnSketch over an iterable of DataFrame chunks."""
+    sketch = ColumnSketch(columns, error, seed)
+    for chunk in chunks:
+        sketch.update(chunk)
+    return sketch
+
+
+def merge_sketches(sketches):
+    """Merge partial sketches, e.g. the results of workers that each sketched one partition."""
+    sketches = list(sketches)
+    merged = sketches[0]
+    for sketch in sketches[1:]:
+        merged.merge(sketch)
+    return merged
+
+
+def stream_filter_outliers(make_chunks, column, error=0.01, factor=1.5):
+    """Two-pass streaming IQR filter: sketch ``column`` over the source, then filter every chunk.
+
+    ``make_chunks`` must return a fresh iterator of chunks on every call.
+    """
+    sketch = sketch_chunks(make_chunks(), columns=[column], error=error)
+    if column not in sketch.quantiles:
+        yield from make_chunks()
+        return
+    lower_bound, upper_bound = sketch.iqr_bounds(column, factor)
+    for chunk in make_chunks():
+        yield chunk[(chunk[column] >= lower_bound) & (chunk[column] <= upper_bound)]
+
+
+# Example usage
+if __name__ == "__main__":
+    values = pd.Series(np.random.default_rng(0).lognormal(size=1_000_000))
+    partials = [sketch_chunks([values[i:i + 100_000].to_frame("amount")], error=0.005)
+                for i in range(0, len(values), 100_000)]
+    merged = merge_sketches(partials)
+    for q in (0.25, 0.5, 0.75):
+        estimate = merged.quantiles["amount"].quantile(q)
+        print(f"q={q}: exact {values.quantile(q):.4f}, sketch {estimate:.4f}, "
+              f"rank error {abs((values < estimate).mean() - q):.4%}")
+    print(f"mean: exact {values.mean():.6f}, merged moments {merged.means()['amount']:.6f}")
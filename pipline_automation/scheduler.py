@@ -0,0 +1,399 @@
+import fnmatch
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locks, overlap is only prevented within the process
+    fcntl = None
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+logger = logging.getLogger(__name__)
+
+# Pipelines running at once across all jobs of a scheduler
+MAX_WORKERS = 4
+
+# Seconds between directory scans when watchdog is not installed
+POLL_INTERVAL = 5
+
+# Seconds a new file's size and mtime must stay unchanged before it counts as landed
+SETTLE_SECONDS = 2
+
+# Seconds before a file whose run failed is tried again, and how often it is tried before
+# it is left alone until it changes
+RETRY_SECONDS = 300
+MAX_FILE_ATTEMPTS = 3
+
+
+class FilesFailed(Exception):
+    """Raised by a watch job when only some of its files failed; the rest count as handled."""
+
+    def __init__(self, files, message=None):
+        super().__init__(message or f"{len(files)} file(s) failed: {', '.join(files)}")
+        self.files = list(files)
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class Job:
+    """One scheduled pipeline: a callable plus its trigger and run bookkeeping."""
+
+    def __init__(self, name, func, every=None, at=None, watch=None, pattern="*", max_concurrent=1, catch_up=True,
+                 settle=SETTLE_SECONDS, retry=RETRY_SECONDS):
+        if sum(trigger is not None for trigger in (every, at, watch)) != 1:
+            raise ValueError("Give a job exactly one of every, at or watch.")
+        self.name = name
+        self.func = func
+        self.every = every.total_seconds() if isinstance(every, timedelta) else every
+        self.at = datetime.strptime(at, "%H:%M").time() if at else None
+        self.watch = watch
+        self.pattern = pattern
+        self.max_concurrent = max_concurrent
+        self.catch_up = catch_up
+        self.settle = settle
+        self.retry = retry
+        self.next_run = None
+        self.running = 0
+        self.pending = None        # Trigger waiting for a free slot: a list of files (empty for clock triggers)
+        self.candidates = {}       # Files seen but not yet settled: path -> (signature, time first seen with it)
+        self.in_flight = set()     # Files handed to a run that has not finished
+        self.attempts = {}         # Files whose runs failed: path -> failed attempts so far
+
+    def next_deadline(self, after):
+        """First clock deadline strictly after ``after`` (epoch seconds)."""
+        if self.every:
+            return after + self.every
+        moment = datetime.fromtimestamp(after)
+        deadline = datetime.combine(moment.date(), self.at)
+        if deadline <= moment:
+            deadline += timedelta(days=1)
+        return deadline.timestamp()
+
+    def previous_deadline(self, now):
+        """Latest clock deadline at or before ``now``, for catching up after a restart."""
+        if self.every:
+            return None
+        moment = datetime.fromtimestamp(now)
+        deadline = datetime.combine(moment.date(), self.at)
+        if deadline > moment:
+            deadline -= timedelta(days=1)
+        return deadline.timestamp()
+
+
+class PipelineScheduler:
+    """Run pipelines on a clock or when files land, without polling in between.
+
+    Jobs fire every ``every`` seconds, daily ``at`` a local "HH:MM", or when files
+    matching ``pattern`` appear in a ``watch`` directory (through watchdog when it is
+    installed, otherwise by scanning every ``poll_interval`` seconds). The scheduler thread
+    sleeps until the next deadline or event.
+
+    Up to ``max_workers`` pipelines run at once, at most ``max_concurrent`` of them per job.
+    A trigger that arrives while a job is at its limit is merged into one pending run
+    instead of piling up, and a lock file keeps a second scheduler process from running the
+    same job at the same time; files whose run was skipped for it are looked at again
+    ``poll_interval`` seconds later.
+
+    The last run of every job and the files each watcher has handled are kept in
+    ``state_path``. After a restart, a clock job whose deadline passed while the scheduler
+    was down runs once straight away, and files that landed meanwhile are picked up.
+    """
+
+    def __init__(self, state_path=".etl_state/scheduler.json", max_workers=MAX_WORKERS, poll_interval=POLL_INTERVAL):
+        self.state_path = state_path
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.jobs = {}
+        self.condition = threading.Condition()
+        self.stopped = threading.Event()
+        self.running = 0
+        self.executor = None
+        self.thread = None
+        self.observer = None
+        self.state = {}
+        if os.path.exists(state_path):
+            with open(state_path) as f:
+                self.state = json.load(f)
+
+    def add(self, name, func, every=None, at=None, watch=None, pattern="*", max_concurrent=1, catch_up=True,
+            settle=SETTLE_SECONDS, retry=RETRY_SECONDS):
+        """Register ``func``; clock jobs call it with no arguments, watch jobs with the list of new files.
+
+        A watch job that raises has its files tried again ``retry`` seconds later, up to
+        MAX_FILE_ATTEMPTS times; raising FilesFailed retries only the files it names.
+        """
+        job = Job(name, func, every, at, watch, pattern, max_concurrent, catch_up, settle, retry)
+        with self.condition:
+            self.jobs[name] = job
+            self._schedule(job, time.time())
+            self.condition.notify()
+        return job
+
+    def _job_state(self, name):
+        return self.state.setdefault(name, {"last_run": None, "last_status": None, "files": {}})
+
+    def _schedule(self, job, now):
+        if job.watch:
+            return
+        last_run = self._job_state(job.name)["last_run"]
+        if job.catch_up and last_run is not None:
+            missed = last_run + job.every <= now if job.every else last_run < job.previous_deadline(now)
+            if missed:
+                logger.info(f"{job.name} missed a run while the scheduler was down, running it now")
+                job.next_run = now
+                return
+        job.next_run = job.next_deadline(now)
+
+    def trigger(self, name, files=None):
+        """Run job ``name`` as soon as it has a free slot."""
+        with self.condition:
+            self._queue(self.jobs[name], files or [])
+            self.condition.notify()
+
+    def _queue(self, job, files):
+        if job.pending is None:
+            job.pending = list(files)
+        else:
+            job.pending.extend(path for path in files if path not in job.pending)
+
+    # Files
+
+    def _scan(self, job):
+        """Note files in the job's directory that were not handled in their current form."""
+        handled = self._job_state(job.name)["files"]
+        try:
+            entries = list(os.scandir(job.watch))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if entry.is_file() and fnmatch.fnmatch(entry.name, job.pattern):
+                self._file_event(job, entry.path, handled)
+
+    def _file_event(self, job, path, handled=None):
+        handled = handled if handled is not None else self._job_state(job.name)["files"]
+        try:
+            signature = _file_signature(path)
+        except FileNotFoundError:
+            job.candidates.pop(path, None)
+            return
+        if handled.get(path) == signature or path in job.in_flight or (job.pending and path in job.pending):
+            return
+        known = job.candidates.get(path)
+        if known is None or known[0] != signature:
+            job.candidates[path] = (signature, time.time())
+
+    def _settle(self, job, now):
+        """Queue candidates that stopped changing; returns when the next one may have settled."""
+        ready = []
+        for path, (signature, since) in list(job.candidates.items()):
+            if now - since < job.settle:
+                continue
+            try:
+                current = _file_signature(path)
+            except FileNotFoundError:
+                del job.candidates[path]
+                continue
+            if current == signature:
+                ready.append(path)
+                del job.candidates[path]
+            else:
+                job.candidates[path] = (current, now)
+        if ready:
+            self._queue(job, sorted(ready))
+        return min((since + job.settle for _, since in job.candidates.values()), default=None)
+
+    def _start_watching(self):
+        watched = [job for job in self.jobs.values() if job.watch]
+        for job in watched:
+            self._scan(job)
+        if not watched or Observer is None:
+            return
+        scheduler = self
+
+        class Handler(FileSystemEventHandler):
+            def __init__(self, job):
+                self.job = job
+
+            def on_any_event(self, event):
+                path = getattr(event, "dest_path", None) or event.src_path
+                if event.is_directory or not fnmatch.fnmatch(os.path.basename(path), self.job.pattern):
+                    return
+                with scheduler.condition:
+                    scheduler._file_event(self.job, path)
+                    scheduler.condition.notify()
+
+        self.observer = Observer()
+        for job in watched:
+            os.makedirs(job.watch, exist_ok=True)
+            self.observer.schedule(Handler(job), job.watch, recursive=False)
+        self.observer.start()
+
+    # Running
+
+    def _lock(self, job):
+        if fcntl is None:
+            return None
+        lock_dir = os.path.join(os.path.dirname(self.state_path) or ".", "locks")
+        os.makedirs(lock_dir, exist_ok=True)
+        handle = open(os.path.join(lock_dir, re.sub(r"[^\w.-]", "_", job.name) + ".lock"), "w")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        return handle
+
+    def _dispatch(self):
+        for job in self.jobs.values():
+            while job.pending is not None and job.running < job.max_concurrent and self.running < self.max_workers:
+                files, job.pending = job.pending, None
+                job.running += 1
+                job.in_flight.update(files)
+                self.running += 1
+                self.executor.submit(self._run, job, files)
+
+    def _run(self, job, files):
+        started = time.time()
+        lock = self._lock(job)
+        status = "success"
+        failed = []
+        try:
+            if lock is False:
+                status = "skipped"
+                logger.warning(f"{job.name} is already running in another process, skipping this run")
+                return
+            logger.info(f"Running {job.name}" + (f" for {len(files)} new file(s)" if job.watch else ""))
+            job.func(files) if job.watch else job.func()
+        except Exception as e:
+            status = "failed"
+            failed = e.files if isinstance(e, FilesFailed) else files
+            logger.exception(f"{job.name} failed: {e}")
+        finally:
+            if lock:
+                lock.close()
+            with self.condition:
+                job.running -= 1
+                job.in_flight.difference_update(files)
+                self.running -= 1
+                state = self._job_state(job.name)
+                if status == "skipped":
+                    for path in files:
+                        try:
+                            # Looked at again after a scan interval, once the other process may be done
+                            job.candidates[path] = (_file_signature(path),
+                                                    time.time() + self.poll_interval - job.settle)
+                        except FileNotFoundError:
+                            pass
+                else:
+                    state.update(last_run=started, last_status=status, duration=time.time() - started)
+                    for path in files:
+                        try:
+                            signature = _file_signature(path)
+                        except FileNotFoundError:
+                            state["files"].pop(path, None)
+                            job.attempts.pop(path, None)
+                            continue
+                        attempts = job.attempts.pop(path, 0) + 1 if path in failed else 0
+                        if attempts and attempts < MAX_FILE_ATTEMPTS:
+                            # Settles (and is queued again) once ``retry`` seconds have passed
+                            job.attempts[path] = attempts
+                            job.candidates[path] = (signature, time.time() + job.retry - job.settle)
+                            logger.warning(f"{job.name} will retry {path} in {job.retry}s "
+                                           f"(attempt {attempts} of {MAX_FILE_ATTEMPTS} failed)")
+                        else:
+                            # Handled, or failed too often: not tried again until it changes
+                            state["files"][path] = signature
+                self._save_state()
+                self.condition.notify()
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        with open(self.state_path + ".tmp", "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(self.state_path + ".tmp", self.state_path)
+
+    def _loop(self):
+        with self.condition:
+            self._start_watching()
+            next_scan = time.time() + self.poll_interval
+            while not self.stopped.is_set():
+                now = time.time()
+                deadlines = []
+                for job in self.jobs.values():
+                    if job.next_run is not None:
+                        if job.next_run <= now:
+                            # A run still going keeps the trigger pending rather than stacking a second one
+                            self._queue(job, [])
+                            job.next_run = job.next_deadline(job.next_run)
+                            while job.next_run <= now:
+                                job.next_run = job.next_deadline(job.next_run)
+                        deadlines.append(job.next_run)
+                    if job.watch:
+                        if self.observer is None and now >= next_scan:
+                            self._scan(job)
+                        settles = self._settle(job, now)
+                        if settles is not None:
+                            deadlines.append(settles)
+                if self.observer is None and any(job.watch for job in self.jobs.values()):
+                    if now >= next_scan:
+                        next_scan = now + self.poll_interval
+                    deadlines.append(next_scan)
+                self._dispatch()
+                timeout = max(0.0, min(deadlines) - time.time()) if deadlines else None
+                self.condition.wait(timeout)
+
+    def start(self):
+        """Run the scheduler on a background thread."""
+        self.stopped.clear()
+        self.executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="pipeline")
+        self.thread = threading.Thread(target=self._loop, name="scheduler", daemon=True)
+        self.thread.start()
+        return self
+
+    def run_forever(self):
+        """Run the scheduler on this thread until stop() is called or the process is interrupted."""
+        self.start()
+        try:
+            while self.thread.is_alive():
+                self.thread.join(1)
+        except KeyboardInterrupt:
+            logger.info("Stopping scheduler")
+        finally:
+            self.stop()
+
+    def stop(self, wait=True):
+        """Stop triggering new runs; with ``wait``, let running pipelines finish."""
+        self.stopped.set()
+        with self.condition:
+            self.condition.notify()
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer = None
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait)
+
+
+# Example usage
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    scheduler = PipelineScheduler(".etl_state/scheduler.json")
+    scheduler.add("heartbeat", lambda: logger.info("still alive"), every=10)
+    scheduler.add("nightly", lambda: logger.info("nightly run"), at="00:00")
+    scheduler.add("landing", lambda files: logger.info(f"new files: {files}"), watch="landing", pattern="*.csv")
+    scheduler.run_forever()
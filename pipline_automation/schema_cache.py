@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_datetime64_any_dtype, is_float_dtype, is_integer_dtype
+from pandas.tseries.api import guess_datetime_format
+
+# Rows of a frame looked at when a schema is inferred
+SCHEMA_SAMPLE_ROWS = 100000
+
+# Text columns with at most this share of distinct values become categoricals
+CATEGORY_MAX_RATIO = 0.5
+
+# Arrow-backed dtype for the remaining text columns
+STRING_DTYPE = "string[pyarrow]"
+
+
+def _integer_dtype(values):
+    # Nothing narrower than int32: a sample's range says little about tomorrow's values,
+    # and int8/int16 arithmetic overflows silently
+    info = np.iinfo(np.int32)
+    return "int32" if len(values) and info.min <= values.min() and values.max() <= info.max else "int64"
+
+
+def _fits_float32(values):
+    values = values.dropna().to_numpy(dtype="float64")
+    return bool(len(values)) and np.array_equal(values.astype("float32").astype("float64"), values)
+
+
+def learn_date_format(values):
+    """strftime format that parses every value, or None if the values are not dates."""
+    fmt = guess_datetime_format(values.iloc[0]) if len(values) else None
+    if not fmt or not ("%Y" in fmt or "%y" in fmt):
+        return None
+    parsed = pd.to_datetime(values, format=fmt, errors="coerce")
+    return fmt if parsed.notna().all() else None
+
+
+def infer_schema(df):
+    """Learn a compact type for every column of ``df``.
+
+    Integers become int32 when they fit and floats float32 when that loses nothing; text
+    columns become dates (with the format that parses them), categoricals when few values
+    repeat, or Arrow-backed strings.
+    """
+    sample = df.head(SCHEMA_SAMPLE_ROWS)
+    schema = {}
+    for col in sample.columns:
+        series = sample[col]
+        if is_bool_dtype(series) or is_datetime64_any_dtype(series):
+            entry = {"kind": "keep"}
+        elif is_integer_dtype(series):
+            entry = {"kind": "int", "dtype": _integer_dtype(series)}
+        elif is_float_dtype(series):
+            entry = {"kind": "float", "dtype": "float32" if _fits_float32(series) else "float64"}
+        elif series.dtype == object:
+            values = series.dropna()
+            all_text = values.map(lambda value: isinstance(value, str)).all()
+            date_format = learn_date_format(values) if all_text else None
+            if not all_text:
+                entry = {"kind": "keep"}
+            elif date_format:
+                entry = {"kind": "date", "format": date_format}
+            elif len(values) and values.nunique() <= CATEGORY_MAX_RATIO * len(values):
+                entry = {"kind": "category"}
+            else:
+                entry = {"kind": "string"}
+        else:
+            entry = {"kind": "keep"}
+        schema[col] = entry
+    return schema
+
+
+def read_dtypes(schema):
+    """``dtype`` argument for read_csv: text columns are parsed straight into their final type.
+
+    Numeric columns are left to the parser and narrowed by apply_schema, which checks that
+    the values fit; read_csv would wrap out-of-range integers silently.
+    """
+    dtypes = {"category": "category", "string": STRING_DTYPE, "date": "object"}
+    return {col: dtypes[entry["kind"]] for col, entry in schema.items() if entry["kind"] in dtypes}
+
+
+def apply_schema(df, schema):
+    """Cast the columns of ``df`` to their learned types.
+
+    A column whose values no longer fit (a float where an int was learned, an integer
+    beyond int32) keeps the type pandas gave it.
+    """
+    for col, entry in schema.items():
+        if col not in df.columns:
+            continue
+        series = df[col]
+        kind = entry["kind"]
+        if kind == "int" and is_integer_dtype(series) and series.dtype != entry["dtype"]:
+            if entry["dtype"] == "int64" or _integer_dtype(series) == entry["dtype"]:
+                df[col] = series.astype(entry["dtype"])
+        elif kind == "float" and is_float_dtype(series) and series.dtype != entry["dtype"]:
+            if entry["dtype"] == "float64" or _fits_float32(series):
+                df[col] = series.astype(entry["dtype"])
+        elif kind == "date" and not is_datetime64_any_dtype(series):
+            df[col] = pd.to_datetime(series, format=entry["format"], errors="coerce")
+        elif kind == "category" and not isinstance(series.dtype, pd.CategoricalDtype):
+            df[col] = series.astype("category")
+        elif kind == "string" and series.dtype == object:
+            df[col] = series.astype(STRING_DTYPE)
+    return df
+
+
+class SchemaCache:
+    """Learned schemas persisted as one JSON file per source under ``cache_dir``."""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.schemas = {}
+
+    def _path(self, source):
+        return os.path.join(self.cache_dir, hashlib.sha256(source.encode()).hexdigest()[:16] + ".json")
+
+    def get(self, source):
+        if source not in self.schemas:
+            path = self._path(source)
+            if not os.path.exists(path):
+                return None
+            with open(path) as f:
+                self.schemas[source] = json.load(f)["columns"]
+        return self.schemas[source]
+
+    def put(self, source, schema):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(source)
+        with open(path + ".tmp", "w") as f:
+            json.dump({"source": source, "columns": schema}, f, indent=2)
+        os.replace(path + ".tmp", path)
+        self.schemas[source] = schema
+
+    def invalidate(self, source=None):
+        """Forget the schema of ``source``, or of every source, so it is learned again."""
+        if source is None:
+            if os.path.isdir(self.cache_dir):
+                for name in os.listdir(self.cache_dir):
+                    if name.endswith(".json"):
+                        os.remove(os.path.join(self.cache_dir, name))
+            self.schemas.clear()
+            return
+        if os.path.exists(self._path(source)):
+            os.remove(self._path(source))
+        self.schemas.pop(source, None)
+
+
+# Example usage
+if __name__ == "__main__":
+    n = 1_000_000
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "id": np.arange(n),
+        "status": rng.choice(["new", "paid", "refunded"], n),
+        "email": [f"user{i}@example.com" for i in range(n)],
+        "transaction_date": pd.date_range("2020-01-01", periods=n, freq="min").strftime("%Y-%m-%d %H:%M"),
+    })
+    schema = infer_schema(df)
+    compact = apply_schema(df.copy(), schema)
+    print(json.dumps(schema, indent=2))
+    print(f"{df.memory_usage(deep=True).sum() / 1e6:.0f} MB -> {compact.memory_usage(deep=True).sum() / 1e6:.0f} MB")
@@ -0,0 +1,82 @@
+# Dialects with the ordered-set aggregate percentile_cont(p) WITHIN GROUP (ORDER BY ...)
+PERCENTILE_CONT_DIALECTS = ("postgresql", "duckdb", "oracle")
+
+# Value ETL._prepare_rows puts in place of a missing email
+UNKNOWN_EMAIL = "unknown@example.com"
+
+
+def quote_identifier(name):
+    """ANSI double-quoted identifier, for dialects without a SQLAlchemy preparer at hand."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _quartiles(dialect, amount):
+    """CTE ``quartiles(q1, q3)`` over the non-null amounts of ``prepared``, interpolated linearly as pandas does."""
+    if dialect in PERCENTILE_CONT_DIALECTS:
+        return (f"quartiles AS (SELECT percentile_cont(0.25) WITHIN GROUP (ORDER BY {amount}) AS q1, "
+                f"percentile_cont(0.75) WITHIN GROUP (ORDER BY {amount}) AS q3 "
+                f"FROM prepared WHERE {amount} IS NOT NULL)")
+    # Window fallback: rank the amounts and interpolate between the two ranks around (n - 1) * p.
+    # SQLite's CAST truncates (other engines round, so they use FLOOR)
+    floor = "CAST({} AS INTEGER)" if dialect == "sqlite" else "FLOOR({})"
+    position = "(n - 1) * p"
+    low = floor.format(position)
+    return f"""ranked AS (
+    SELECT {amount} AS amount, ROW_NUMBER() OVER (ORDER BY {amount}) - 1 AS rn, COUNT(*) OVER () AS n
+    FROM prepared WHERE {amount} IS NOT NULL
+),
+probabilities AS (SELECT 0.25 AS p UNION ALL SELECT 0.75 AS p),
+interpolated AS (
+    SELECT p,
+           MAX(CASE WHEN rn = {low} THEN amount END) AS low_value,
+           MAX(CASE WHEN rn = CASE WHEN {low} + 1 < n THEN {low} + 1 ELSE n - 1 END THEN amount END) AS high_value,
+           MAX({position} - {low}) AS fraction
+    FROM ranked CROSS JOIN probabilities
+    GROUP BY p
+),
+quartiles AS (
+    SELECT MAX(CASE WHEN p = 0.25 THEN low_value + (high_value - low_value) * fraction END) AS q1,
+           MAX(CASE WHEN p = 0.75 THEN low_value + (high_value - low_value) * fraction END) AS q3
+    FROM interpolated
+)"""
+
+
+def transform_query(table, columns, dialect, quote=quote_identifier):
+    """SELECT running the set-wide part of ETL._transform_rows on ``table``.
+
+    In order, as in pandas: DISTINCT over all ``columns``, COALESCE of a missing email, the
+    ``amount_squared`` column, dropping rows without an id, and keeping amounts within 1.5 IQR
+    of the quartiles of the de-duplicated amounts. What remains is row-wise formatting
+    (date parsing, email clean-up, title-case names), which ETL._finalize_rows does on the
+    result. Row order is not preserved.
+    """
+    names = {col: quote(col) for col in columns}
+    select = ", ".join(names.values())
+    derived = {}
+    if "email" in names:
+        derived["email"] = f"COALESCE({names['email']}, '{UNKNOWN_EMAIL}') AS {names['email']}"
+    if "amount" in names:
+        # Replaces an amount_squared the source already has, as the pandas path does
+        derived["amount_squared"] = f"{names['amount']} * {names['amount']} AS {quote('amount_squared')}"
+    prepared = [derived.get(col, names[col]) for col in columns] + \
+        [expression for col, expression in derived.items() if col not in names]
+    # Of the critical columns only id can still be null; email was just filled in
+    ctes = [f"deduplicated AS (SELECT DISTINCT {select} FROM {table})",
+            f"prepared AS (SELECT {', '.join(prepared)} FROM deduplicated"
+            + (f" WHERE {names['id']} IS NOT NULL)" if "id" in names else ")")]
+    if "amount" not in names:
+        return "WITH " + ",\n".join(ctes) + f"\nSELECT {select} FROM prepared"
+    amount = names["amount"]
+    ctes.append(_quartiles(dialect, amount))
+    ctes.append("bounds AS (SELECT q1 - 1.5 * (q3 - q1) AS lower_bound, q3 + 1.5 * (q3 - q1) AS upper_bound "
+                "FROM quartiles)")
+    output = list(names.values()) + ([] if "amount_squared" in names else [quote("amount_squared")])
+    columns_out = ", ".join(f"prepared.{name}" for name in output)
+    return ("WITH " + ",\n".join(ctes) + "\n"
+            f"SELECT {columns_out} FROM prepared CROSS JOIN bounds\n"
+            f"WHERE prepared.{amount} >= bounds.lower_bound AND prepared.{amount} <= bounds.upper_bound")
+
+
+def missing_ids_query(table, quote=quote_identifier):
+    """Count of rows without an id, which ETL._prepare_rows rejects."""
+    return f"SELECT COUNT(*) FROM {table} WHERE {quote('id')} IS NULL"
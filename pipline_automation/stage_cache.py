@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+# Bytes hashed per read when fingerprinting a file
+HASH_BLOCK_SIZE = 1024 ** 2
+
+
+def digest(*parts):
+    """Stable hex digest of JSON-serialisable parts."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class StageCache:
+    """Content-addressed store of stage outputs.
+
+    Outputs are keyed by a digest of everything that determines them (input fingerprint,
+    configuration, code version) and kept as uncompressed Arrow IPC files, which load
+    about as fast as the disk reads; frames Arrow cannot store fall back to pickle. Least
+    recently used outputs are evicted once they exceed ``max_bytes``.
+
+    The cache also remembers file content hashes by size and mtime, so an unchanged file
+    is fingerprinted without being read again, and the run key last loaded into each
+    destination.
+    """
+
+    def __init__(self, cache_dir, max_bytes=2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.lock = threading.Lock()
+        self.index = {"outputs": {}, "files": {}, "runs": {}}
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self.index.update(json.load(f))
+
+    def file_digest(self, path):
+        """Content hash of a file, recomputed only when its size or mtime changed."""
+        stat = os.stat(path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        with self.lock:
+            known = self.index["files"].get(os.path.abspath(path))
+        if known and known["signature"] == signature:
+            return known["sha256"]
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                sha.update(block)
+        with self.lock:
+            self.index["files"][os.path.abspath(path)] = {"signature": signature, "sha256": sha.hexdigest()}
+            self._save_index()
+        return sha.hexdigest()
+
+    def _path(self, key, body_format):
+        return os.path.join(self.cache_dir, f"{key}.{body_format}")
+
+    def get(self, key):
+        """The stored output for ``key``, or None."""
+        with self.lock:
+            entry = self.index["outputs"].get(key)
+        if not entry or not os.path.exists(self._path(key, entry["format"])):
+            return None
+        path = self._path(key, entry["format"])
+        df = pd.read_feather(path) if entry["format"] == "arrow" else pd.read_pickle(path)
+        with self.lock:
+            entry["last_access"] = time.time()
+            self._save_index()
+        return df
+
+    def put(self, key, df):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        body_format = "arrow"
+        path = self._path(key, body_format)
+        try:
+            df.reset_index(drop=True).to_feather(path + ".tmp", compression="uncompressed")
+        except Exception:
+            body_format = "pkl"
+            path = self._path(key, body_format)
+            df.to_pickle(path + ".tmp")
+        os.replace(path + ".tmp", path)
+        with self.lock:
+            self.index["outputs"][key] = {"format": body_format, "size": os.path.getsize(path),
+                                          "last_access": time.time()}
+            self._evict()
+            self._save_index()
+
+    def last_run(self, destination):
+        with self.lock:
+            return self.index["runs"].get(destination)
+
+    def record_run(self, destination, key):
+        with self.lock:
+            self.index["runs"][destination] = key
+            self._save_index()
+
+    def _evict(self):
+        """Drop least recently used outputs until they fit in max_bytes."""
+        outputs = self.index["outputs"]
+        total = sum(entry["size"] for entry in outputs.values())
+        for key, entry in sorted(outputs.items(), key=lambda item: item[1]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            path = self._path(key, entry["format"])
+            if os.path.exists(path):
+                os.remove(path)
+            total -= entry["size"]
+            del outputs[key]
+
+    def _save_index(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.index_path + ".tmp", "w") as f:
+            json.dump(self.index, f)
+        os.replace(self.index_path + ".tmp", self.index_path)
+
+    def invalidate(self, key=None):
+        """Remove the output stored under ``key``, or every output if no key is given.
+
+        Destinations last loaded from a removed output are forgotten too, so the next run loads them again.
+        """
+        with self.lock:
+            keys = [key] if key else list(self.index["outputs"])
+            for removed in keys:
+                entry = self.index["outputs"].pop(removed, None)
+                if entry and os.path.exists(self._path(removed, entry["format"])):
+                    os.remove(self._path(removed, entry["format"]))
+            self.index["runs"] = {destination: run for destination, run in self.index["runs"].items()
+                                  if key and run != key}
+            if os.path.isdir(self.cache_dir):
+                self._save_index()
@@ -0,0 +1,106 @@
+import queue
+import threading
+
+# Marks the end of the stream on a queue
+_DONE = object()
+
+
+def run_stages(source, stages, maxsize=2, poll_interval=0.1):
+    """Run items from ``source`` through ``stages`` with every stage on its own thread.
+
+    Stages are connected by bounded queues, so a slow stage throttles the ones before it
+    instead of letting batches pile up in memory. Item order is preserved. The first error
+    raised by any stage stops all of them and is re-raised here. Returns the number of
+    items that made it through the last stage.
+    """
+    stop = threading.Event()
+    errors = []
+    queues = [queue.Queue(maxsize=maxsize) for _ in stages]
+    processed = [0]
+
+    def put(q, item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=poll_interval)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(q):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=poll_interval)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def fail(error):
+        errors.append(error)
+        stop.set()
+
+    def produce():
+        try:
+            for item in source:
+                if not put(queues[0], item):
+                    return
+            put(queues[0], _DONE)
+        except BaseException as e:
+            fail(e)
+        finally:
+            close = getattr(source, "close", None)
+            if close:
+                close()
+
+    def work(func, inbox, outbox):
+        try:
+            while True:
+                item = get(inbox)
+                if item is _DONE:
+                    break
+                result = func(item)
+                if outbox is None:
+                    processed[0] += 1
+                elif not put(outbox, result):
+                    return
+            if outbox is not None:
+                put(outbox, _DONE)
+        except BaseException as e:
+            fail(e)
+
+    threads = [threading.Thread(target=produce, name="stage-source", daemon=True)]
+    for i, func in enumerate(stages):
+        outbox = queues[i + 1] if i + 1 < len(queues) else None
+        threads.append(threading.Thread(target=work, args=(func, queues[i], outbox),
+                                        name=f"stage-{i}", daemon=True))
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+    return processed[0]
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+
+    def slow_read():
+        for i in range(5):
+            time.sleep(0.2)
+            yield i
+
+    def slow_square(x):
+        time.sleep(0.2)
+        return x * x
+
+    def slow_write(x):
+        time.sleep(0.2)
+        print(f"Loaded: {x}")
+
+    start = time.perf_counter()
+    count = run_stages(slow_read(), [slow_square, slow_write])
+    print(f"Processed {count} items in {time.perf_counter() - start:.2f}s (sequential would take 3.00s)")
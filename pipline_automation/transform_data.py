@@ -1,6 +1,12 @@
+import logging
+
 import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
 def transform_data(df):
-    print("Transforming data...")
+    logger.info("Transforming data...")
 
     # Remove duplicates
     df = df.drop_duplicates()
@@ -0,0 +1,8 @@
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The packages are flat directories of modules that import each other by name
+sys.path[:0] = [os.path.join(REPO_DIR, name)
+                for name in ("pipline_automation", "time_series_forecasting", "outlier_detection")]
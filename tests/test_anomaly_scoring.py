@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from anomaly_scoring import ModelCache, fit_model, score_source
+
+COLUMNS = ["amount", "quantity"]
+
+
+@pytest.fixture
+def source(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"id": range(2000), "amount": rng.normal(100, 10, 2000), "quantity": rng.poisson(3, 2000)})
+    df.loc[:9, "amount"] = 10_000
+    path = tmp_path / "data.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def test_fit_and_score(source, tmp_path):
+    cache = ModelCache(str(tmp_path / "models"))
+    params = {"n_estimators": 50, "contamination": 0.01}
+    model, meta = fit_model(source, COLUMNS, params, cache, sample_rows=500, chunksize=300)
+    assert fit_model(source, COLUMNS, params, cache, sample_rows=500, chunksize=300)[1]["version"] == meta["version"]
+    outliers = tmp_path / "outliers.csv"
+    stats = score_source(source, model, meta["threshold"], COLUMNS, outliers_path=str(outliers), chunksize=300,
+                         workers=1)
+    assert stats["rows"] == 2000 and set(range(10)) <= set(pd.read_csv(outliers)["id"])
+
+
+def test_fit_model_rejects_empty_source(tmp_path):
+    path = tmp_path / "empty.csv"
+    path.write_text("id,amount,quantity\n")
+    with pytest.raises(ValueError, match="No rows"):
+        fit_model(str(path), COLUMNS, {"n_estimators": 10})
+
+
+def test_score_empty_source(source, tmp_path):
+    model, meta = fit_model(source, COLUMNS, {"n_estimators": 10})
+    path = tmp_path / "empty.csv"
+    path.write_text("id,amount,quantity\n")
+    stats = score_source(str(path), model, meta["threshold"], COLUMNS, workers=1)
+    assert stats["rows"] == 0 and stats["rows_per_second_per_core"] is None
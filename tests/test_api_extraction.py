@@ -0,0 +1,143 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+
+from api_extraction import PaginatedAPIExtractor
+
+RECORDS = [{"id": i, "amount": i * 1.5} for i in range(23)]
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Serves RECORDS paged by page number, offset or cursor; /limited answers 429 at first."""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {name: int(values[0]) for name, values in parse_qs(url.query).items()}
+        self.server.requests.append((url.path, params))
+        if url.path == "/limited" and self.server.throttled < 2:
+            self.server.throttled += 1
+            self._send(429, {"error": "slow down"}, {"Retry-After": "0"})
+        elif url.path == "/pages":
+            start = (params["page"] - 1) * params["per_page"]
+            self._send(200, RECORDS[start:start + params["per_page"]])
+        elif url.path == "/offsets":
+            self._send(200, RECORDS[params["offset"]:params["offset"] + params["limit"]])
+        else:
+            start = params.get("cursor", 0)
+            payload = {"data": RECORDS[start:start + 5]}
+            if start + 5 < len(RECORDS):
+                payload["next_cursor"] = start + 5
+            self._send(200, payload)
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.requests, server.throttled = [], 0
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _url(server, path):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+def _ids(extractor, url, pagination):
+    return [record["id"] for records in extractor.iter_records(url, pagination) for record in records]
+
+
+@pytest.mark.parametrize("path, pagination", [
+    ("/pages", {"type": "page", "size_param": "per_page", "page_size": 4}),
+    ("/offsets", {"type": "offset", "page_size": 4}),
+    ("/cursor", {"type": "cursor", "next_cursor_key": "next_cursor"}),
+], ids=["page", "offset", "cursor"])
+def test_pagination_reads_every_record_in_order(server, path, pagination):
+    extractor = PaginatedAPIExtractor(concurrency=3, records_key="data")
+    try:
+        assert _ids(extractor, _url(server, path), pagination) == list(range(len(RECORDS)))
+    finally:
+        extractor.close()
+
+
+def test_cursor_pagination_walks_several_urls(server):
+    extractor = PaginatedAPIExtractor(concurrency=2, records_key="data")
+    try:
+        ids = _ids(extractor, [_url(server, "/a"), _url(server, "/b")], {"type": "cursor"})
+    finally:
+        extractor.close()
+    assert sorted(ids) == sorted(list(range(len(RECORDS))) * 2)
+
+
+def test_offset_pagination_needs_page_size(server):
+    extractor = PaginatedAPIExtractor()
+    with pytest.raises(ValueError, match="page_size"):
+        list(extractor.iter_records(_url(server, "/offsets"), {"type": "offset"}))
+    assert not server.requests
+
+
+def test_throttled_requests_are_retried(server):
+    extractor = PaginatedAPIExtractor(max_retries=3, backoff=0)
+    try:
+        assert extractor.request(_url(server, "/limited")).status_code == 200
+    finally:
+        extractor.close()
+    assert server.throttled == 2 and len(server.requests) == 3
+
+
+def test_retries_give_up_after_max_retries(server):
+    extractor = PaginatedAPIExtractor(max_retries=1, backoff=0)
+    try:
+        with pytest.raises(Exception, match="429"):
+            extractor.request(_url(server, "/limited"))
+    finally:
+        extractor.close()
+    assert len(server.requests) == 2
+
+
+def test_rate_limit_spaces_requests(server):
+    # 5 cursor pages at 20 requests per second, with no burst beyond the first request
+    extractor = PaginatedAPIExtractor(rate_limit=20, burst=1, records_key="data")
+    started = time.monotonic()
+    try:
+        _ids(extractor, _url(server, "/cursor"), {"type": "cursor"})
+    finally:
+        extractor.close()
+    assert len(server.requests) == 5
+    assert time.monotonic() - started >= 4 / 20 * 0.9
+
+
+def test_paginated_api_pipeline(server, tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'etl.db'}")
+    monkeypatch.setenv("ETL_STATE_DIR", str(tmp_path / "state"))
+    from etl import ETL
+    etl = ETL()
+    data = etl.extract_api(_url(server, "/offsets"), pagination={"type": "offset", "page_size": 10}, chunksize=None)
+    assert data["id"].tolist() == list(range(len(RECORDS)))
+    destination = str(tmp_path / "out.csv")
+    source_options = {"pagination": {"type": "offset", "page_size": 10}, "concurrency": 2}
+    assert etl.run_pipeline(_url(server, "/offsets"), destination, "api", "file", source_options=source_options)
+    assert len(pd.read_csv(destination)) == len(RECORDS)
+    # Streaming would read the API twice
+    assert not etl.run_pipeline(_url(server, "/offsets"), destination, "api", "file", chunksize=10,
+                                source_options=source_options)
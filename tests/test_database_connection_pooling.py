@@ -0,0 +1,91 @@
+import pytest
+from sqlalchemy import exc, text
+
+from database_connection_pooling import Histogram, InstrumentedQueuePool, PoolMetrics, PoolRegistry
+
+
+@pytest.fixture
+def registry():
+    registry = PoolRegistry()
+    yield registry
+    registry.dispose()
+
+
+def test_checkouts_are_counted(registry, tmp_path):
+    dsn = f"sqlite:///{tmp_path / 'pool.db'}"
+    engine = registry.get_engine(dsn, pool_size=2, max_overflow=0)
+    assert isinstance(engine.pool, InstrumentedQueuePool)
+    assert registry.get_engine(dsn) is engine
+    with engine.connect() as first, engine.connect() as second:
+        first.execute(text("SELECT 1"))
+        second.execute(text("SELECT 1"))
+        assert registry.pool_metrics()[dsn]["in_use"] == 2
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    metrics = registry.pool_metrics()[dsn]
+    assert (metrics["in_use"], metrics["peak_in_use"], metrics["checkouts"], metrics["connects"]) == (0, 2, 3, 2)
+    assert (metrics["timeouts"], metrics["connect_errors"]) == (0, 0)
+    assert metrics["wait_time"]["count"] == metrics["checkout_latency"]["count"] == 3
+
+
+def test_exhausted_pool_times_out(registry, tmp_path):
+    dsn = f"sqlite:///{tmp_path / 'pool.db'}"
+    engine = registry.get_engine(dsn, pool_size=1, max_overflow=0, pool_timeout=0.05)
+    with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+    metrics = registry.pool_metrics()[dsn]
+    assert (metrics["timeouts"], metrics["connect_errors"], metrics["checkouts"]) == (1, 0, 1)
+    assert metrics["wait_time"]["sum"] >= 0.05
+
+
+def test_failed_connects_are_not_timeouts(registry, tmp_path):
+    dsn = f"sqlite:///{tmp_path / 'missing' / 'pool.db'}"
+    with pytest.raises(exc.OperationalError):
+        registry.get_engine(dsn).connect()
+    metrics = registry.pool_metrics()[dsn]
+    assert (metrics["connect_errors"], metrics["timeouts"], metrics["in_use"]) == (1, 0, 0)
+
+
+def test_metrics_hide_passwords(registry):
+    registry.metrics["postgresql://etl:secret@db/warehouse"] = PoolMetrics()
+    assert list(registry.pool_metrics()) == ["postgresql://etl:***@db/warehouse"]
+
+
+def test_disposed_pools_drop_their_metrics(registry, tmp_path):
+    dsn = f"sqlite:///{tmp_path / 'pool.db'}"
+    engine = registry.get_engine(dsn)
+    registry.dispose(dsn)
+    assert registry.pool_metrics() == {}
+    assert registry.get_engine(dsn) is not engine
+
+
+def test_histogram_counts_are_cumulative():
+    histogram = Histogram(buckets=(0.1, 1))
+    for seconds in (0.05, 0.1, 0.5, 2):
+        histogram.observe(seconds)
+    assert histogram.as_dict() == {"count": 4, "sum": 2.65, "buckets": {"0.1": 2, "1": 3, "inf": 4}}
+
+
+def test_pool_metrics_are_exported_with_the_stages(registry, tmp_path):
+    import json
+
+    from database_connection_pooling import pool_metrics
+    from pipeline_metrics import PipelineProfiler, get_profiler
+
+    assert get_profiler().pool_metrics is pool_metrics
+    dsn = f"sqlite:///{tmp_path / 'pool.db'}"
+    with registry.get_engine(dsn, pool_size=1, max_overflow=0, pool_timeout=0.01).connect() as conn:
+        conn.execute(text("SELECT 1"))
+    profiler = PipelineProfiler(enabled=True, pool_metrics=registry.pool_metrics)
+    with profiler.stage("load"):
+        pass
+
+    assert json.loads(profiler.to_json())["pools"] == registry.pool_metrics()
+    lines = profiler.to_prometheus().splitlines()
+    assert 'etl_stage_calls_total{stage="load"} 1' in lines
+    assert f'etl_pool_checkouts_total{{pool="{dsn}"}} 1' in lines
+    assert f'etl_pool_wait_seconds_bucket{{pool="{dsn}",le="+Inf"}} 1' in lines
+    assert f'etl_pool_wait_seconds_count{{pool="{dsn}"}} 1' in lines
+    assert "# TYPE etl_pool_checkout_latency_seconds histogram" in lines
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from dedup import ChunkDeduplicator, row_hashes
+
+
+def test_row_hashes_ignore_inferred_dtypes():
+    # One row, as chunks with different nulls and values would read it
+    variants = [
+        pd.DataFrame({"text": [np.nan], "flag": [True], "count": [1.0], "when": [pd.NaT]}),
+        pd.DataFrame({"text": pd.Series([None], dtype=object), "flag": pd.Series([True], dtype=object),
+                      "count": pd.Series([1], dtype=object), "when": pd.Series([None], dtype=object)}),
+        pd.DataFrame({"text": pd.Series([None], dtype="string"), "flag": pd.Series([True], dtype="boolean"),
+                      "count": pd.Series([1], dtype="Int64"), "when": pd.Series([pd.NaT], dtype="datetime64[ns]")}),
+        pd.DataFrame({"text": pd.Series([None], dtype="category"), "flag": [1], "count": [1], "when": [np.nan]}),
+    ]
+    assert len({row_hashes(variant)[0] for variant in variants}) == 1
+
+
+def test_row_hashes_keep_large_ids_apart():
+    hashes = row_hashes(pd.DataFrame({"id": [2 ** 60, 2 ** 60 + 1]}))
+    assert hashes[0] != hashes[1]
+
+
+def test_duplicates_across_chunks_with_different_dtypes():
+    # The note column is all null in the first chunk (float64) and text in the second (object);
+    # the flag column is bool in the first and object with a null in the second
+    first = pd.DataFrame({"id": [1, 2], "note": [np.nan, np.nan], "flag": [True, False]})
+    second = pd.DataFrame({"id": [1, 2, 3], "note": [None, np.nan, "x"],
+                           "flag": pd.Series([True, False, None], dtype=object)})
+    assert first["note"].dtype != second["note"].dtype
+    kept = pd.concat(list(ChunkDeduplicator().process(iter([first, second]))), ignore_index=True)
+    assert kept["id"].tolist() == [1, 2, 3]
@@ -0,0 +1,262 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def etl(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'etl.db'}")
+    monkeypatch.setenv("ETL_STATE_DIR", str(tmp_path / "state"))
+    from etl import ETL
+    return ETL()
+
+
+@pytest.fixture
+def mixed_csv(tmp_path):
+    # With 50-row chunks, each column is read as a different dtype in some chunk: email and
+    # transaction_date are all null in the first, note only has text in the third, amount
+    # is whole numbers in the second and flag has a null in the fourth
+    rows = 200
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame({
+        "id": np.arange(rows),
+        "name": rng.choice(["ann lee", "bob"], rows),
+        "email": rng.choice(["x y@z!.com", "a.b@c.org", None], rows).astype(object),
+        "amount": rng.normal(100, 15, rows).round(2),
+        "transaction_date": rng.choice(["2024-01-05", "2024-02-11"], rows).astype(object),
+        "note": None,
+        "flag": rng.choice([True, False], rows).astype(object),
+    })
+    df.loc[:49, ["email", "transaction_date"]] = None
+    df.loc[50:99, "amount"] = df.loc[50:99, "amount"].round()
+    df.loc[100:149:7, "note"] = "late"
+    df.loc[150, "flag"] = None
+    # Repeat rows across chunks so streaming de-duplication has work to do
+    df = pd.concat([df, df.iloc[40:60], df.iloc[[0, 120, 150]]], ignore_index=True)
+    path = tmp_path / "mixed.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.mark.filterwarnings("error::pandas.errors.SettingWithCopyWarning")
+@pytest.mark.parametrize("overlap", [False, True], ids=["sequential", "overlap"])
+def test_chunked_run_matches_in_memory_run(etl, mixed_csv, tmp_path, overlap):
+    whole, chunked = str(tmp_path / "whole.csv"), str(tmp_path / "chunked.csv")
+    assert etl.run_pipeline(mixed_csv, whole, "file", "file")
+    assert etl.run_pipeline(mixed_csv, chunked, "file", "file", chunksize=50, overlap=overlap)
+    expected, actual = pd.read_csv(whole), pd.read_csv(chunked)
+    assert expected["id"].is_unique and len(expected) > 150
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+@pytest.mark.parametrize("failing", ["extract", "transform", "load"])
+def test_overlapped_run_fails_on_any_stage_error(etl, mixed_csv, tmp_path, failing, caplog):
+    def fail_on_third(func):
+        calls = []
+
+        def wrapper(chunk, *args, **kwargs):
+            calls.append(chunk)
+            if len(calls) == 3:
+                raise RuntimeError(f"{failing} failed")
+            return func(chunk, *args, **kwargs)
+        return wrapper
+
+    if failing == "extract":
+        extract_file = etl.extract_file
+        chunks = fail_on_third(lambda chunk: chunk)
+        # The second pass, the one that feeds the stages, breaks off after two chunks
+        passes = []
+
+        def extract(*args, **kwargs):
+            passes.append(None)
+            reader = extract_file(*args, **kwargs)
+            return reader if len(passes) == 1 else map(chunks, reader)
+        etl.extract_file = extract
+    elif failing == "transform":
+        etl._transform_chunk = fail_on_third(etl._transform_chunk)
+    else:
+        etl.load_to_file = fail_on_third(etl.load_to_file)
+
+    assert not etl.run_pipeline(mixed_csv, str(tmp_path / "out.csv"), "file", "file", chunksize=50, overlap=True)
+    assert f"Error during streaming pipeline: {failing} failed" in caplog.text
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith("stage-")]
+
+
+def _transactions(ids, updated_at):
+    return pd.DataFrame({"id": ids, "email": "a@b.com", "amount": 10.0, "updated_at": updated_at})
+
+
+def test_incremental_pages_keep_rows_sharing_a_key(etl):
+    # Seven rows share each timestamp, so most pages end inside a run of equal keys
+    ids = np.arange(21)
+    _transactions(ids, np.repeat(["2024-01-01 00:00:00", "2024-01-02 00:00:00", "2024-01-03 00:00:00"], 7)) \
+        .sample(frac=1, random_state=0).to_sql("transactions", etl.engine, index=False)
+    chunks = etl.extract_database_incremental("transactions", "updated_at", tiebreaker="id", chunksize=2,
+                                              page_size=3)
+    assert pd.concat(list(chunks))["id"].tolist() == ids.tolist()
+
+
+def test_incremental_run_reads_only_new_rows(etl, tmp_path):
+    _transactions([1, 2, 3], "2024-01-01 00:00:00").to_sql("transactions", etl.engine, index=False)
+    options = {"incremental_column": "updated_at", "tiebreaker": "id", "page_size": 2}
+    destination = str(tmp_path / "out.csv")
+    assert etl.run_pipeline("transactions", destination, "database", "file", source_options=options)
+    assert pd.read_csv(destination)["id"].tolist() == [1, 2, 3]
+
+    # A late row with an earlier id but the same timestamp, and a newer one
+    _transactions([0, 4], ["2024-01-01 00:00:00", "2024-01-02 00:00:00"]) \
+        .to_sql("transactions", etl.engine, index=False, if_exists="append")
+    assert etl.run_pipeline("transactions", destination, "database", "file", source_options=options)
+    assert pd.read_csv(destination)["id"].tolist() == [4]
+    assert etl.load_watermarks() == {"transactions.updated_at.id": ["2024-01-02 00:00:00", 4]}
+
+
+@pytest.mark.parametrize("chunksize", [None, 2], ids=["whole", "chunked"])
+def test_failed_incremental_run_keeps_watermark(etl, tmp_path, chunksize):
+    _transactions([1, 2, 3], "2024-01-01 00:00:00").to_sql("transactions", etl.engine, index=False)
+    options = {"incremental_column": "updated_at"}
+    destination = str(tmp_path / "out.csv")
+    assert etl.run_pipeline("transactions", destination, "database", "file", source_options=options)
+    watermarks = etl.load_watermarks()
+
+    _transactions([4], "2024-01-02 00:00:00").to_sql("transactions", etl.engine, index=False, if_exists="append")
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    etl.load_to_file = fail
+    if chunksize:
+        # Streaming runs log the failure, others raise it
+        assert not etl.run_pipeline("transactions", destination, "database", "file", chunksize=chunksize,
+                                    source_options=options)
+    else:
+        with pytest.raises(OSError):
+            etl.run_pipeline("transactions", destination, "database", "file", source_options=options)
+    assert etl.load_watermarks() == watermarks
+
+    del etl.load_to_file
+    assert etl.run_pipeline("transactions", destination, "database", "file", source_options=options)
+    assert pd.read_csv(destination)["id"].tolist() == [4]
+
+
+def test_extract_errors_fail_the_run(etl, tmp_path):
+    assert not etl.run_pipeline(str(tmp_path / "missing.csv"), str(tmp_path / "out.csv"), "file", "file")
+
+
+def test_watch_run_retries_only_failed_files(etl, tmp_path):
+    from scheduler import FilesFailed, PipelineScheduler
+    landing = tmp_path / "landing"
+    landing.mkdir()
+    for name, ids in (("a.csv", [1, 2]), ("c.csv", [3])):
+        pd.DataFrame({"id": ids, "email": "a@b.com", "amount": 1.0}).to_csv(landing / name, index=False)
+    scheduler = PipelineScheduler(str(tmp_path / "scheduler.json"))
+    destination = str(tmp_path / "out.csv")
+    etl.schedule_pipeline(None, destination, "file", "file", watch=str(landing), scheduler=scheduler, name="landing")
+    files = [str(landing / name) for name in ("a.csv", "b.csv", "c.csv")]
+    with pytest.raises(FilesFailed) as failed:
+        scheduler.jobs["landing"].func(files)
+    assert failed.value.files == [files[1]]
+    assert pd.read_csv(destination)["id"].tolist() == [1, 2, 3]
+
+
+def test_upsert_replaces_matching_rows_and_inserts_new_ones(etl):
+    from sqlalchemy import inspect
+    etl.load_to_database(pd.DataFrame({"id": [1, 2, 3], "region": ["a", "a", "b"], "amount": [1.0, 2.0, 3.0]}),
+                         "sales", mode="upsert", key_columns=["id", "region"])
+    etl.load_to_database(pd.DataFrame({"id": [2, 3, 4], "region": ["a", "a", "a"], "amount": [20.0, 30.0, 40.0]}),
+                         "sales", mode="upsert", key_columns=["id", "region"])
+    rows = pd.read_sql("SELECT * FROM sales ORDER BY id, region", etl.engine)
+    assert list(rows.itertuples(index=False, name=None)) == [
+        (1, "a", 1.0), (2, "a", 20.0), (3, "a", 30.0), (3, "b", 3.0), (4, "a", 40.0)]
+    assert not inspect(etl.engine).has_table("sales_staging")
+
+
+def test_failed_upsert_leaves_the_table_unchanged(etl):
+    from sqlalchemy import inspect
+    etl.load_to_database(pd.DataFrame({"id": [1, 2], "amount": [1.0, 2.0]}), "sales")
+    with pytest.raises(Exception):
+        # The staged rows have a column the table lacks, so the insert fails after the delete
+        etl.load_to_database(pd.DataFrame({"id": [2, 3], "amount": [5.0, 6.0], "note": ["x", "y"]}), "sales",
+                             mode="upsert", key_columns=["id"])
+    assert pd.read_sql("SELECT * FROM sales ORDER BY id", etl.engine)["amount"].tolist() == [1.0, 2.0]
+    assert not inspect(etl.engine).has_table("sales_staging")
+
+
+def test_load_modes_are_checked(etl):
+    df = pd.DataFrame({"id": [1]})
+    with pytest.raises(ValueError, match="key_columns"):
+        etl.load_to_database(df, "sales", mode="upsert")
+    with pytest.raises(ValueError, match="Unsupported load mode"):
+        etl.load_to_database(df, "sales", mode="merge")
+
+
+def test_upsert_pipeline(etl, tmp_path):
+    source = tmp_path / "in.csv"
+    options = {"mode": "upsert", "key_columns": ["id"]}
+    pd.DataFrame({"id": [1, 2], "email": "a@b.com", "amount": [1.0, 2.0]}).to_csv(source, index=False)
+    assert etl.run_pipeline(str(source), "sales", "file", "database", destination_options=options)
+    pd.DataFrame({"id": [2, 3], "email": "a@b.com", "amount": [2.0, 3.0]}).to_csv(source, index=False)
+    assert etl.run_pipeline(str(source), "sales", "file", "database", destination_options=options)
+    assert pd.read_sql("SELECT id FROM sales ORDER BY id", etl.engine)["id"].tolist() == [1, 2, 3]
+
+
+def test_copy_insert_keeps_empty_strings_apart_from_nulls(etl):
+    from etl import ETL
+    copies = []
+
+    class Cursor:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def copy_expert(self, sql, buffer):
+            copies.append((sql, buffer.read()))
+
+    class Connection:
+        connection = type("DBAPIConnection", (), {"cursor": lambda self: Cursor()})()
+
+    df = pd.DataFrame({"name": ["", None, 'say "hi"', "a,b\nc"], "amount": [1.5, np.nan, 2.0, 3.0]})
+    # pandas hands the insertion method the rows it would insert, with missing values as None
+    df.to_sql("people", etl.engine, index=False,
+              method=lambda table, conn, keys, data_iter: ETL._copy_insert(table, Connection(), keys, data_iter))
+    assert copies == [('COPY "people" ("name", "amount") FROM STDIN WITH CSV',
+                       '"","1.5"\n,\n"say ""hi""","2.0"\n"a,b\nc","3.0"\n')]
+
+
+def _partitioned_matches_full_read(etl, key, **options):
+    full = pd.read_sql("SELECT * FROM events", etl.engine)
+    parts = etl.extract_database("events", partition_column=key, **options)
+    pd.testing.assert_frame_equal(parts.sort_values("row", ignore_index=True),
+                                  full.sort_values("row", ignore_index=True))
+    streamed = list(etl.extract_database("events", partition_column=key, chunksize=1, **options))
+    assert sum(len(chunk) for chunk in streamed) == len(full)
+
+
+@pytest.mark.parametrize("boundaries", ["minmax", "quantile"])
+@pytest.mark.parametrize("key", ["number", "price", "day"])
+def test_partitioned_read_matches_full_read(etl, boundaries, key):
+    rng = np.random.default_rng(4)
+    rows = 500
+    df = pd.DataFrame({
+        "row": np.arange(rows),
+        # Skewed, so quantile and min/max ranges differ
+        "number": rng.zipf(2, rows).astype(float),
+        "price": rng.lognormal(3, 1, rows),
+        "day": rng.choice(pd.date_range("2024-01-01", periods=40).strftime("%Y-%m-%d"), rows).astype(object),
+    })
+    df.loc[rng.random(rows) < 0.05, ["number", "price", "day"]] = None
+    df["number"] = df["number"].astype("Int64")
+    df.to_sql("events", etl.engine, index=False)
+    _partitioned_matches_full_read(etl, key, partitions=7, boundaries=boundaries, workers=3)
+
+
+@pytest.mark.parametrize("values", [[5, 5, None], [None, None], [7]], ids=["single", "all_null", "one_row"])
+def test_partitioned_read_of_degenerate_keys(etl, values):
+    pd.DataFrame({"row": range(len(values)), "key": pd.array(values, dtype="Int64")}).to_sql(
+        "events", etl.engine, index=False)
+    for boundaries in ("minmax", "quantile"):
+        _partitioned_matches_full_read(etl, "key", partitions=4, boundaries=boundaries)
@@ -0,0 +1,20 @@
+import pandas as pd
+
+from extract_file import extract_files
+
+
+def test_extract_files_skips_unreadable_files(tmp_path):
+    (tmp_path / "a.csv").write_text("id,amount\n1,2.5\n2,3.5\n")
+    (tmp_path / "b.csv").write_text("")
+    (tmp_path / "c.csv").write_bytes(b"id,amount\n3,\xff\xfe\n")
+    (tmp_path / "d.csv").write_text("id,amount,note\n")
+    (tmp_path / "e.csv").write_text("id,amount\n4,1.0\n")
+    data = extract_files(str(tmp_path), max_workers=2)
+    assert data["id"].tolist() == [1, 2, 4]
+    assert list(data.columns) == ["id", "amount", "note"]
+
+
+def test_extract_files_keeps_columns_of_header_only_files(tmp_path):
+    (tmp_path / "a.csv").write_text("id,amount\n")
+    data = extract_files(str(tmp_path / "*.csv"))
+    assert data.empty and list(data.columns) == ["id", "amount"]
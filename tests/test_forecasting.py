@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from forecasting import Forecaster, _ets_init, _ets_run
+
+
+def _history(days, rng):
+    dates = pd.date_range("2024-01-01", periods=days, freq="D")
+    weekly = 10 * np.sin(2 * np.pi * np.arange(days) / 7)
+    return pd.DataFrame({
+        "series_id": np.repeat(["a", "b"], days),
+        "date": np.tile(dates, 2),
+        "value": np.concatenate([100 + weekly + rng.normal(0, 3, days) + 0.5 * np.arange(days),
+                                 60 + weekly + rng.normal(0, 3, days)]),
+    })
+
+
+def test_update_after_gap_matches_full_recursion(tmp_path):
+    history = _history(90, np.random.default_rng(0))
+    day = (history["date"] - history["date"].min()).dt.days
+    # "a" ends its first run on day 59 and resumes on day 66; "b" carries on without a gap
+    first = history[(history["series_id"] == "a") & (day < 60) | (history["series_id"] == "b") & (day < 63)]
+    second = history[(history["series_id"] == "a") & ((day < 60) | (day >= 66)) | (history["series_id"] == "b")]
+
+    forecaster = Forecaster(horizon=7, cache_dir=str(tmp_path), workers=1)
+    forecaster.forecast_frame(first)
+    params = forecaster.load_states()["a"]["params"]
+    forecaster.forecast_frame(second)
+    assert forecaster.last_run["updated"] == 2
+    state = forecaster.load_states()["a"]
+
+    series = second[second["series_id"] == "a"].set_index("date")["value"]
+    Y = series.reindex(pd.date_range(series.index.min(), series.index.max())).to_numpy()[None, :]
+    level, season, begin = _ets_init(Y, 0, 7)
+    level, trend, season, _ = _ets_run(Y, 0, 7, *(np.array([[value]]) for value in params), level[:, None],
+                                       np.zeros((1, 1)), season[:, None, :], begin, np.array([Y.shape[1] - 1]))
+    assert np.isclose(state["level"], level[0, 0])
+    assert np.isclose(state["trend"], trend[0, 0])
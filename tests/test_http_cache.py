@@ -0,0 +1,70 @@
+import json
+
+import http_cache
+from http_cache import ResponseCache
+
+
+class Response:
+    def __init__(self, status_code=200, payload=None, headers=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.headers = headers or {}
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        pass
+
+
+class Session:
+    """Answers every GET with the next queued response and records the request headers."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        self.requests.append(headers or {})
+        return self.responses.pop(0)
+
+
+def _index(cache):
+    with open(cache.index_path) as f:
+        return json.load(f)
+
+
+def test_fresh_hits_persist_access_times_debounced(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path))
+    session = Session(Response(payload=[{"id": 1}], headers={"Cache-Control": "max-age=60"}))
+    cache.fetch("http://api/items", session=session)
+    (stored,) = _index(cache).values()
+
+    monkeypatch.setattr(http_cache, "INDEX_SAVE_SECONDS", 3600)
+    assert cache.fetch("http://api/items", session=session)["id"].tolist() == [1]
+    assert list(_index(cache).values())[0]["last_access"] == stored["last_access"]
+
+    monkeypatch.setattr(http_cache, "INDEX_SAVE_SECONDS", 0)
+    cache.fetch("http://api/items", session=session)
+    assert list(_index(cache).values())[0]["last_access"] > stored["last_access"]
+    assert len(session.requests) == 1
+
+
+def test_stale_entries_are_revalidated(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    session = Session(Response(payload=[{"id": 1}], headers={"ETag": '"v1"'}), Response(status_code=304))
+    cache.fetch("http://api/items", session=session)
+    assert cache.fetch("http://api/items", session=session)["id"].tolist() == [1]
+    assert session.requests[1] == {"If-None-Match": '"v1"'}
+
+
+
+def test_ttl_overrides_from_etl(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'etl.db'}")
+    monkeypatch.setenv("ETL_STATE_DIR", str(tmp_path / "state"))
+    from etl import ETL
+    cache = ETL(ttl_overrides={r"/items$": 600}).response_cache
+    session = Session(Response(payload=[{"id": 1}], headers={"Cache-Control": "no-cache"}))
+    cache.fetch("http://api/items", session=session)
+    cache.fetch("http://api/items", session=session)
+    assert len(session.requests) == 1
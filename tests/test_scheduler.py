@@ -0,0 +1,26 @@
+import time
+
+import pytest
+
+from scheduler import PipelineScheduler, fcntl
+
+
+@pytest.mark.skipif(fcntl is None, reason="needs fcntl locks")
+def test_files_skipped_for_a_held_lock_are_queued_again(tmp_path):
+    path = tmp_path / "a.csv"
+    path.write_text("id\n1\n")
+    runs = []
+    scheduler = PipelineScheduler(str(tmp_path / "scheduler.json"), poll_interval=1)
+    job = scheduler.add("landing", runs.append, watch=str(tmp_path), pattern="*.csv", settle=0)
+
+    # Another process running the same job holds its lock
+    lock = scheduler._lock(job)
+    assert lock
+    job.running, scheduler.running = 1, 1
+    scheduler._run(job, [str(path)])
+    assert not runs and str(path) not in scheduler._job_state("landing")["files"]
+    lock.close()
+
+    assert scheduler._settle(job, time.time()) is not None and job.pending is None
+    scheduler._settle(job, time.time() + 1)
+    assert job.pending == [str(path)]
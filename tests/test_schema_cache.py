@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def etl(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'etl.db'}")
+    monkeypatch.setenv("ETL_STATE_DIR", str(tmp_path / "state"))
+    from etl import ETL
+    return ETL()
+
+
+@pytest.fixture
+def source(tmp_path):
+    rng = np.random.default_rng(1)
+    rows = 3000
+    # Few distinct emails, so the schema learns the column as a category
+    emails = np.array(["x y@z!.com", "a.b@c.org", "bad#mail@q.com", None, "ok@ok.io"], dtype=object)
+    df = pd.DataFrame({
+        "id": np.arange(rows),
+        "name": rng.choice(["ann lee", "bob"], rows),
+        "email": rng.choice(emails, rows),
+        "amount": rng.normal(100, 15, rows).round(2),
+        "transaction_date": rng.choice(["2024-01-05", "2024-02-11"], rows),
+    })
+    directory = tmp_path / "source"
+    directory.mkdir()
+    for i in range(3):
+        df.iloc[i * 1000:(i + 1) * 1000].to_csv(directory / f"part{i}.csv", index=False)
+    return str(directory)
+
+
+@pytest.mark.parametrize("options", [{}, {"chunksize": 400}, {"per_file": True, "workers": 1}],
+                         ids=["whole", "chunked", "per_file"])
+def test_schema_does_not_change_output(etl, source, tmp_path, options):
+    outputs = []
+    for schema in (False, True):
+        destination = str(tmp_path / f"out_{schema}.csv")
+        etl.run_pipeline(source, destination, "file", "file",
+                         source_options={"schema": True} if schema else None, **options)
+        outputs.append(pd.read_csv(destination).sort_values("id").reset_index(drop=True))
+    plain, learned = outputs
+    pd.testing.assert_frame_equal(plain, learned)
+    assert not plain["email"].str.contains(r"[^a-zA-Z0-9@._-]").any()
+
+
+def test_per_file_schema_skips_unreadable_first_file(etl, source, tmp_path):
+    bad = tmp_path / "source" / "part.csv"
+    bad.write_text("")
+    destination = str(tmp_path / "out.csv")
+    etl.run_pipeline(source, destination, "file", "file", per_file=True, workers=1,
+                     source_options={"schema": True})
+    assert [path for path, _ in etl.file_errors] == [str(bad)]
+    assert len(pd.read_csv(destination)) > 0
@@ -0,0 +1,84 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sql_pushdown import transform_query
+
+COMPARED = ["id", "email", "amount", "amount_squared"]
+
+
+@pytest.fixture
+def source():
+    rng = np.random.default_rng(5)
+    rows = 101
+    df = pd.DataFrame({
+        "id": np.arange(rows, dtype="int64"),
+        "email": rng.choice(["a@b.com", "c@d.org", None], rows).astype(object),
+        "amount": rng.normal(100, 20, rows).round(2),
+    })
+    # Outliers on both sides, a missing amount and exact duplicates
+    df.loc[[3, 40], "amount"] = [900.0, -700.0]
+    df.loc[7, "amount"] = np.nan
+    return pd.concat([df, df.iloc[10:25]], ignore_index=True)
+
+
+def _expected(df):
+    from etl import ETL
+    return ETL._transform_rows(df.copy())[COMPARED].sort_values("id").reset_index(drop=True)
+
+
+def _sorted(result):
+    return result[COMPARED].sort_values("id").reset_index(drop=True)
+
+
+def test_quartiles_in_sqlite_with_window_fallback(source):
+    conn = sqlite3.connect(":memory:")
+    source.to_sql("transactions", conn, index=False)
+    result = pd.read_sql(transform_query("transactions", list(source.columns), "sqlite"), conn)
+    pd.testing.assert_frame_equal(_sorted(result), _expected(source), check_dtype=False)
+
+
+@pytest.mark.parametrize("dialect", ["duckdb", "generic"], ids=["percentile_cont", "window"])
+def test_quartiles_in_duckdb(source, dialect):
+    duckdb = pytest.importorskip("duckdb")
+    conn = duckdb.connect()
+    conn.register("transactions", source)
+    result = conn.execute(transform_query("transactions", list(source.columns), dialect)).df()
+    pd.testing.assert_frame_equal(_sorted(result), _expected(source), check_dtype=False)
+
+
+@pytest.mark.parametrize("rows", [1, 2, 4])
+def test_window_fallback_interpolates_like_pandas(rows):
+    source = pd.DataFrame({"id": range(rows), "amount": [1.0, 10.0, 11.0, 100.0][:rows]})
+    conn = sqlite3.connect(":memory:")
+    source.to_sql("transactions", conn, index=False)
+    query = transform_query("transactions", ["id", "amount"], "sqlite")
+    # Keep the query's CTEs and read the quartiles they compute
+    ctes = query[:query.index("\nSELECT prepared.")]
+    quartiles = pd.read_sql(ctes + "\nSELECT q1, q3 FROM quartiles", conn)
+    assert np.allclose(quartiles[["q1", "q3"]].iloc[0], source["amount"].quantile([0.25, 0.75]))
+
+
+def test_transform_in_database_matches_transform_data(source, tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'etl.db'}")
+    monkeypatch.setenv("ETL_STATE_DIR", str(tmp_path / "state"))
+    from etl import ETL
+    etl = ETL()
+    source.to_sql("transactions", etl.engine, index=False)
+    pd.testing.assert_frame_equal(_sorted(etl.transform_in_database("transactions")), _expected(source),
+                                  check_dtype=False)
+    chunks = list(etl.transform_in_database("transactions", chunksize=20))
+    assert sum(len(chunk) for chunk in chunks) == len(_expected(source))
+
+
+def test_missing_ids_are_rejected_in_database(source, tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'etl.db'}")
+    monkeypatch.setenv("ETL_STATE_DIR", str(tmp_path / "state"))
+    from etl import ETL
+    etl = ETL()
+    source.astype({"id": "float64"}).assign(id=lambda df: df["id"].where(df.index != 5)).to_sql(
+        "transactions", etl.engine, index=False)
+    with pytest.raises(ValueError, match="Missing ID"):
+        etl.transform_in_database("transactions")
@@ -0,0 +1,94 @@
+import os
+
+import pandas as pd
+import pytest
+
+from stage_cache import StageCache
+
+
+@pytest.fixture
+def etl(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'etl.db'}")
+    monkeypatch.setenv("ETL_STATE_DIR", str(tmp_path / "state"))
+    from etl import ETL
+    etl = ETL()
+    # Count extractions, which a cache hit skips
+    etl.extractions = 0
+    extract_file = etl.extract_file
+
+    def counting(*args, **kwargs):
+        etl.extractions += 1
+        return extract_file(*args, **kwargs)
+
+    etl.extract_file = counting
+    return etl
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "in.csv"
+    pd.DataFrame({"id": [1, 2, 3], "email": "a@b.com", "amount": [1.0, 2.0, 3.0]}).to_csv(path, index=False)
+    return str(path)
+
+
+def _run(etl, source, destination, **options):
+    assert etl.run_pipeline(source, str(destination), "file", "file", cache=True, **options)
+    return pd.read_csv(destination)
+
+
+def test_unchanged_source_is_not_extracted_again(etl, source, tmp_path):
+    first = _run(etl, source, tmp_path / "a.csv")
+    mtime = os.path.getmtime(tmp_path / "a.csv")
+    # Same destination: nothing to do; another destination: loaded from the cache
+    _run(etl, source, tmp_path / "a.csv")
+    assert os.path.getmtime(tmp_path / "a.csv") == mtime
+    pd.testing.assert_frame_equal(_run(etl, source, tmp_path / "b.csv"), first)
+    # A destination that went missing is loaded again, still without extracting
+    os.remove(tmp_path / "a.csv")
+    pd.testing.assert_frame_equal(_run(etl, source, tmp_path / "a.csv"), first)
+    assert etl.extractions == 1
+
+
+def test_touching_a_file_without_changing_it_is_a_hit(etl, source, tmp_path):
+    _run(etl, source, tmp_path / "a.csv")
+    os.utime(source, (0, 0))
+    _run(etl, source, tmp_path / "b.csv")
+    assert etl.extractions == 1
+
+
+def test_changed_source_options_or_code_miss(etl, source, tmp_path, monkeypatch):
+    _run(etl, source, tmp_path / "a.csv")
+    with open(source, "a") as f:
+        f.write("4,c@d.com,4.0\n")
+    assert _run(etl, source, tmp_path / "a.csv")["id"].tolist() == [1, 2, 3, 4]
+    assert etl.extractions == 2
+
+    _run(etl, source, tmp_path / "a.csv", source_options={"columns": ["id", "amount"]})
+    assert etl.extractions == 3
+
+    import etl as etl_module
+    monkeypatch.setattr(etl_module, "TRANSFORM_CODE_FILES", etl_module.TRANSFORM_CODE_FILES[:-1])
+    _run(etl, source, tmp_path / "a.csv")
+    assert etl.extractions == 4
+
+
+def test_invalidate_forgets_outputs_and_runs(etl, source, tmp_path):
+    _run(etl, source, tmp_path / "a.csv")
+    etl.stage_cache.invalidate()
+    _run(etl, source, tmp_path / "a.csv")
+    assert etl.extractions == 2
+
+
+def test_least_recently_used_outputs_are_evicted(tmp_path):
+    frame = pd.DataFrame({"value": range(500)})
+    cache = StageCache(str(tmp_path))
+    cache.put("old", frame)
+    # Room for two outputs
+    cache.max_bytes = 2 * cache.index["outputs"]["old"]["size"]
+    cache.put("recent", frame)
+    assert cache.get("old") is not None
+    cache.put("new", frame)
+    assert cache.get("recent") is None
+    assert cache.get("old") is not None and cache.get("new") is not None
+    # The index survives a restart
+    assert set(StageCache(str(tmp_path)).index["outputs"]) == {"old", "new"}
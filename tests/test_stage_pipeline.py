@@ -0,0 +1,39 @@
+import itertools
+import threading
+
+import pytest
+
+from stage_pipeline import run_stages
+
+
+def test_items_go_through_every_stage_in_order():
+    loaded = []
+    assert run_stages(iter(range(20)), [lambda x: x * x, loaded.append], maxsize=1) == 20
+    assert loaded == [x * x for x in range(20)]
+
+
+@pytest.mark.parametrize("failing", ["source", "first", "last"])
+def test_first_error_stops_every_stage(failing):
+    closed = threading.Event()
+
+    def source():
+        # Endless, so the run only ends if the error stops the producer
+        try:
+            for i in itertools.count():
+                if failing == "source" and i == 5:
+                    raise ValueError("source")
+                yield i
+        finally:
+            closed.set()
+
+    def stage(name):
+        def func(x):
+            if failing == name and x == 5:
+                raise ValueError(name)
+            return x
+        return func
+
+    with pytest.raises(ValueError, match=failing):
+        run_stages(source(), [stage("first"), stage("last")], poll_interval=0.01)
+    assert closed.is_set()
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith("stage-")]
@@ -0,0 +1,393 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Series forecast together in one vectorised batch (and handed to one worker process)
+BATCH_SERIES = 1000
+
+# (alpha, beta, gamma) searched per series by in-sample one-step squared error; beta 0 fits no trend
+ETS_GRID = [(alpha, beta, gamma) for alpha in (0.1, 0.3, 0.6) for beta in (0.0, 0.1) for gamma in (0.05, 0.2, 0.5)]
+
+# Trend damping, so long horizons do not extrapolate a trend forever
+DAMPING = 0.98
+
+# Batches waiting for a worker per process, so results stream out while later batches are prepared
+BATCHES_IN_FLIGHT_PER_WORKER = 2
+
+MODELS = ("naive", "seasonal_naive", "ets", "prophet")
+
+
+def _ets_init(Y, first_ordinal, m):
+    """Level and seasonal indices from each series' first season; recursion starts after it."""
+    rows = np.arange(len(Y))
+    first = (~np.isnan(Y)).argmax(axis=1)
+    cols = np.minimum(first[:, None] + np.arange(m), Y.shape[1] - 1)
+    window = Y[rows[:, None], cols]
+    level = np.nanmean(window, axis=1)
+    season = np.zeros((len(Y), m))
+    season[rows[:, None], (first_ordinal + cols) % m] = np.nan_to_num(window - level[:, None])
+    return level, season, first + m - 1
+
+
+def _ets_run(Y, first_ordinal, m, alpha, beta, gamma, level, trend, season, start, last):
+    """Additive damped Holt-Winters over the columns after ``start`` up to ``last`` of each row.
+
+    State arrays are (series, parameter sets) and (series, parameter sets, m); all series and
+    parameter sets advance together, one column at a time. Gaps advance level and trend without
+    an update. Returns the final state and the sum of squared one-step errors.
+    """
+    sse = np.zeros_like(level)
+    start, last = start[:, None], last[:, None]
+    for col in range(max(start.min() + 1, 0), last.max() + 1):
+        y = Y[:, col][:, None]
+        active = (col > start) & (col <= last)
+        observed = active & ~np.isnan(y)
+        gap = active & np.isnan(y)
+        slot = (first_ordinal + col) % m
+        seasonal = season[:, :, slot]
+        expected = level + DAMPING * trend
+        new_level = alpha * (y - seasonal) + (1 - alpha) * expected
+        new_trend = beta * (new_level - level) + (1 - beta) * DAMPING * trend
+        sse += np.where(observed, (y - expected - seasonal) ** 2, 0)
+        season[:, :, slot] = np.where(observed, gamma * (y - new_level) + (1 - gamma) * seasonal, seasonal)
+        level = np.where(observed, new_level, np.where(gap, expected, level))
+        trend = np.where(observed, new_trend, np.where(gap, DAMPING * trend, trend))
+    return level, trend, season, sse
+
+
+def _ets_forecast(level, trend, season, last_ordinal, m, horizon):
+    steps = np.arange(1, horizon + 1)
+    damped = np.cumsum(DAMPING ** steps)
+    slots = (last_ordinal[:, None] + steps) % m
+    return level[:, None] + damped * trend[:, None] + season[np.arange(len(level))[:, None], slots]
+
+
+def _recent_by_slot(Y, first_ordinal, m, start, recent):
+    """Latest value observed in each seasonal slot after ``start``, on top of ``recent``."""
+    for col in range(max(start.min() + 1, 0), Y.shape[1]):
+        y = Y[:, col]
+        observed = (col > start) & ~np.isnan(y)
+        recent[observed, (first_ordinal + col) % m] = y[observed]
+    return recent
+
+
+def _grid(rows, config, first_ordinal=None):
+    """Series by period matrix of values; column 0 is period ``first_ordinal`` (default: the earliest row)."""
+    ordinals = pd.PeriodIndex(rows["date"], freq=config["freq"]).asi8
+    codes, ids = pd.factorize(rows["series_id"])
+    if len(ordinals):
+        first_ordinal = ordinals.min() if first_ordinal is None else min(first_ordinal, ordinals.min())
+    else:
+        first_ordinal = 0
+    Y = np.full((len(ids), (ordinals.max() - first_ordinal + 1) if len(ordinals) else 0), np.nan)
+    Y[codes, ordinals - first_ordinal] = rows["value"].to_numpy(dtype="float64")
+    return Y, list(ids), first_ordinal
+
+
+def _fit_baselines(rows, states, config):
+    """Fit or update every series of ``rows`` with the NumPy models, all series at once.
+
+    ``states`` holds the cached state of series being updated; their rows start after the
+    cached period. Returns the new state of every series.
+    """
+    m, model = config["season_length"], config["model"]
+    # Start right after the earliest cached period, so the periods between a series' cached
+    # state and its first new row are advanced as gaps
+    resume = min((states[series_id]["last_ordinal"] + 1 for series_id in rows["series_id"].unique()
+                  if series_id in states), default=None)
+    Y, ids, first_ordinal = _grid(rows, config, resume)
+    if not ids:
+        return {}
+    observed = ~np.isnan(Y)
+    last = Y.shape[1] - 1 - observed[:, ::-1].argmax(axis=1)
+    cached = [states.get(series_id) for series_id in ids]
+    start = np.array([state["last_ordinal"] - first_ordinal if state else -1 for state in cached])
+    counts = observed.sum(axis=1) + np.array([state["observations"] if state else 0 for state in cached])
+
+    # Seasonal-naive state, which is also the fallback for series too short for ETS
+    recent = np.full((len(ids), m), np.nan)
+    for i, state in enumerate(cached):
+        if state:
+            recent[i] = state["recent"]
+    recent = _recent_by_slot(Y, first_ordinal, m, start, recent)
+    last_value = Y[np.arange(len(ids)), last]
+
+    new_states = {}
+    for i, series_id in enumerate(ids):
+        used = model if model != "ets" or counts[i] >= 2 * m else ("seasonal_naive" if counts[i] >= m else "naive")
+        new_states[series_id] = {"model": used, "last_ordinal": int(first_ordinal + last[i]),
+                                 "observations": int(counts[i]), "recent": recent[i], "last_value": last_value[i]}
+    if model != "ets":
+        return new_states
+
+    # Series with a cached ETS state continue from it with their fitted parameters
+    update = np.array([bool(state) and state["model"] == "ets" for state in cached])
+    refit = np.array([new_states[series_id]["model"] == "ets" for series_id in ids]) & ~update
+    if update.any():
+        index = np.flatnonzero(update)
+        params = np.array([cached[i]["params"] for i in index])
+        level, trend, season, _ = _ets_run(
+            Y[index], first_ordinal, m, params[:, :1], params[:, 1:2], params[:, 2:],
+            np.array([[cached[i]["level"]] for i in index]), np.array([[cached[i]["trend"]] for i in index]),
+            np.array([[cached[i]["season"]] for i in index]), start[index], last[index])
+        for k, i in enumerate(index):
+            new_states[ids[i]].update(params=cached[i]["params"], level=level[k, 0], trend=trend[k, 0],
+                                      season=season[k, 0], sse=cached[i]["sse"])
+    if refit.any():
+        index = np.flatnonzero(refit)
+        grid = np.array(ETS_GRID)
+        level, season, begin = _ets_init(Y[index], first_ordinal, m)
+        level = np.repeat(level[:, None], len(grid), axis=1)
+        season = np.repeat(season[:, None, :], len(grid), axis=1)
+        level, trend, season, sse = _ets_run(Y[index], first_ordinal, m, grid[:, 0], grid[:, 1], grid[:, 2],
+                                             level, np.zeros_like(level), season, begin, last[index])
+        best = sse.argmin(axis=1)
+        for k, i in enumerate(index):
+            new_states[ids[i]].update(params=tuple(grid[best[k]]), level=level[k, best[k]],
+                                      trend=trend[k, best[k]], season=season[k, best[k]], sse=sse[k, best[k]])
+    return new_states
+
+
+def _predict_baselines(states, config):
+    horizon, m = config["horizon"], config["season_length"]
+    ids = list(states)
+    last_ordinal = np.array([states[series_id]["last_ordinal"] for series_id in ids])
+    steps = np.arange(1, horizon + 1)
+    last_value = np.array([states[series_id]["last_value"] for series_id in ids], dtype="float64")
+    recent = np.array([states[series_id]["recent"] for series_id in ids], dtype="float64").reshape(len(ids), m)
+    seasonal = recent[np.arange(len(ids))[:, None], (last_ordinal[:, None] + steps) % m]
+    yhat = np.where(np.isnan(seasonal), last_value[:, None], seasonal)
+    models = np.array([states[series_id]["model"] for series_id in ids])
+    yhat[models == "naive"] = last_value[models == "naive", None]
+    ets = np.flatnonzero(models == "ets")
+    if len(ets):
+        yhat[ets] = _ets_forecast(np.array([states[ids[i]]["level"] for i in ets]),
+                                  np.array([states[ids[i]]["trend"] for i in ets]),
+                                  np.array([states[ids[i]]["season"] for i in ets]), last_ordinal[ets], m, horizon)
+    return ids, last_ordinal, models, yhat
+
+
+def _fit_prophet(rows, config):
+    from prophet import Prophet
+    from prophet.serialize import model_to_json
+
+    new_states = {}
+    for series_id, history in rows.groupby("series_id", sort=False):
+        model = Prophet(**config["prophet_options"])
+        model.fit(history.rename(columns={"date": "ds", "value": "y"})[["ds", "y"]])
+        new_states[series_id] = {"model": "prophet", "prophet": model_to_json(model),
+                                 "last_ordinal": int(pd.Period(history["date"].max(), config["freq"]).ordinal),
+                                 "observations": len(history)}
+    return new_states
+
+
+def _predict_prophet(states, config):
+    from prophet.serialize import model_from_json
+
+    ids, last_ordinal, yhat = list(states), [], []
+    for series_id in ids:
+        model = model_from_json(states[series_id]["prophet"])
+        future = model.make_future_dataframe(periods=config["horizon"], freq=config["freq"], include_history=False)
+        yhat.append(model.predict(future)["yhat"].to_numpy())
+        last_ordinal.append(states[series_id]["last_ordinal"])
+    return ids, np.array(last_ordinal), np.array(["prophet"] * len(ids)), np.array(yhat).reshape(len(ids), -1)
+
+
+def _forecast_batch(rows, states, config):
+    """Fit the series of one batch and forecast them; returns (forecast frame, new states).
+
+    ``states`` holds every cached series of the batch; series without rows are forecast
+    from their cached state as they are.
+    """
+    if config["model"] == "prophet":
+        new_states = _fit_prophet(rows, config) if len(rows) else {}
+        new_states.update({series_id: state for series_id, state in states.items() if series_id not in new_states})
+        ids, last_ordinal, models, yhat = _predict_prophet(new_states, config)
+    else:
+        fitted = _fit_baselines(rows, states, config)
+        new_states = {**states, **fitted}
+        ids, last_ordinal, models, yhat = _predict_baselines(new_states, config)
+    horizon = config["horizon"]
+    ordinals = (last_ordinal[:, None] + np.arange(1, horizon + 1)).ravel()
+    forecast = pd.DataFrame({
+        "series_id": np.repeat(np.array(ids, dtype=object), horizon),
+        "date": pd.PeriodIndex.from_ordinals(ordinals, freq=config["freq"]).to_timestamp(),
+        "yhat": yhat.ravel(),
+        "model": np.repeat(models, horizon),
+    })
+    return forecast, new_states
+
+
+class _Done:
+    def __init__(self, value):
+        self.value = value
+
+    def result(self):
+        return self.value
+
+
+class Forecaster:
+    """Forecast many series from one long-format frame of ``series_id``, ``date`` and ``value``.
+
+    ``model`` is one of:
+
+    - ``"naive"``: the last value
+    - ``"seasonal_naive"``: the last value of the same season (``season_length`` periods back)
+    - ``"ets"``: additive damped Holt-Winters with smoothing parameters picked per series
+      from ETS_GRID; series shorter than two seasons fall back to seasonal naive
+    - ``"prophet"``: one Prophet model per series (needs the prophet package), built with
+      ``prophet_options``
+
+    Series are split into batches of ``batch_series``; the NumPy models fit a whole batch
+    at once, and batches run on ``workers`` processes (default: all CPUs; 1 runs here).
+    Forecasts are yielded batch by batch as they finish.
+
+    With ``cache_dir`` the fitted state of every series is kept between runs, keyed by a
+    hash of its history. Series whose history is unchanged are forecast from the cache,
+    series that only gained newer periods continue from their cached state (for ETS with
+    the parameters picked before; Prophet refits them), and the rest are refit.
+    """
+
+    def __init__(self, horizon=14, freq="D", season_length=7, model="ets", cache_dir=None, workers=None,
+                 batch_series=BATCH_SERIES, prophet_options=None):
+        if model not in MODELS:
+            raise ValueError(f"Unsupported model: {model}. Use one of {', '.join(MODELS)}.")
+        self.config = {"horizon": horizon, "freq": freq, "season_length": season_length, "model": model,
+                       "prophet_options": prophet_options or {}}
+        self.cache_dir = cache_dir
+        self.workers = workers or os.cpu_count()
+        self.batch_series = batch_series
+        self.last_run = {}
+
+    def _config_key(self):
+        # The horizon only shapes the forecast, not the fitted state
+        parts = {key: value for key, value in self.config.items() if key != "horizon"}
+        if self.config["model"] == "ets":
+            parts.update(grid=ETS_GRID, damping=DAMPING)
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _cache_path(self):
+        return os.path.join(self.cache_dir, "forecast_state.pkl")
+
+    def load_states(self):
+        if not self.cache_dir or not os.path.exists(self._cache_path()):
+            return {}
+        with open(self._cache_path(), "rb") as f:
+            cached = pickle.load(f)
+        return cached["states"] if cached["config"] == self._config_key() else {}
+
+    def save_states(self, states):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self._cache_path() + ".tmp", "wb") as f:
+            pickle.dump({"config": self._config_key(), "states": states}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(self._cache_path() + ".tmp", self._cache_path())
+
+    @staticmethod
+    def _fingerprints(df):
+        # Sum of row hashes per series: independent of row order, changed by any edit
+        hashes = pd.util.hash_pandas_object(df[["series_id", "date", "value"]], index=False).to_numpy()
+        return pd.Series(hashes).groupby(df["series_id"].to_numpy(), sort=False).sum()
+
+    def _plan(self, df, states):
+        """Rows to fit and cached state for every series; updates ``last_run`` counts."""
+        fingerprints = self._fingerprints(df)
+        ordinals = pd.PeriodIndex(df["date"], freq=self.config["freq"]).asi8
+        cached_last = df["series_id"].map({series_id: state["last_ordinal"] for series_id, state in states.items()})
+        seen = ordinals <= cached_last.to_numpy(dtype="float64", na_value=np.nan)
+        prefix = self._fingerprints(df[seen])
+
+        fresh, reuse, update = [], {}, {}
+        for series_id, fingerprint in fingerprints.items():
+            state = states.get(series_id)
+            if state is None:
+                fresh.append(series_id)
+            elif state["fingerprint"] == fingerprint:
+                reuse[series_id] = state
+            elif prefix.get(series_id) == state["fingerprint"] and state["model"] == self.config["model"] != "prophet":
+                # Only newer periods were added; a series that outgrew its fallback model is refit
+                update[series_id] = state
+            else:
+                fresh.append(series_id)
+        self.last_run = {"series": len(fingerprints), "reused": len(reuse), "updated": len(update),
+                         "refit": len(fresh)}
+        keep = ~df["series_id"].isin(reuse) & ~(df["series_id"].isin(update) & seen)
+        return df[keep], {**reuse, **update}, fingerprints
+
+    def forecast(self, df):
+        """Yield forecast frames (series_id, date, yhat, model), one per batch of series.
+
+        The cache is saved once every batch has been yielded.
+        """
+        df = df[["series_id", "date", "value"]].assign(date=pd.to_datetime(df["date"]))
+        df = df.dropna(subset=["series_id", "date"]).drop_duplicates(["series_id", "date"], keep="last")
+        states = self.load_states()
+        rows, cached, fingerprints = self._plan(df, states)
+        logger.info("Forecasting %(series)d series: %(refit)d fit, %(updated)d updated, %(reused)d from cache",
+                    self.last_run)
+
+        series = fingerprints.index.to_numpy()
+        batches = (series[start:start + self.batch_series] for start in range(0, len(series), self.batch_series))
+        batch_of = pd.Series(np.arange(len(series)) // self.batch_series, index=series)
+        groups = dict(iter(rows.groupby(rows["series_id"].map(batch_of).to_numpy(), sort=False)))
+
+        executor = ProcessPoolExecutor(self.workers) if self.workers > 1 else None
+        submit = executor.submit if executor else lambda func, *args: _Done(func(*args))
+        try:
+            in_flight = deque()
+            for index, batch in enumerate(batches):
+                batch_rows = groups.get(index, rows.iloc[:0])
+                batch_states = {series_id: cached[series_id] for series_id in batch if series_id in cached}
+                in_flight.append(submit(_forecast_batch, batch_rows, batch_states, self.config))
+                if len(in_flight) >= self.workers * BATCHES_IN_FLIGHT_PER_WORKER:
+                    yield self._collect(in_flight.popleft(), states, fingerprints)
+            while in_flight:
+                yield self._collect(in_flight.popleft(), states, fingerprints)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        if self.cache_dir:
+            self.save_states(states)
+
+    @staticmethod
+    def _collect(future, states, fingerprints):
+        forecast, new_states = future.result()
+        for series_id, state in new_states.items():
+            states[series_id] = {**state, "fingerprint": fingerprints[series_id]}
+        return forecast
+
+    def forecast_frame(self, df):
+        """All of ``forecast`` as one DataFrame."""
+        return pd.concat(self.forecast(df), ignore_index=True)
+
+
+# Example usage
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    rng = np.random.default_rng(0)
+    stores, days = 2000, 730
+    dates = pd.date_range("2023-01-01", periods=days, freq="D")
+    weekly = 10 * np.sin(2 * np.pi * np.arange(days) / 7)
+    sales = rng.uniform(50, 150, (stores, 1)) + weekly + rng.normal(0, 5, (stores, days))
+    history = pd.DataFrame({
+        "series_id": np.repeat([f"store-{i}" for i in range(stores)], days),
+        "date": np.tile(dates, stores),
+        "value": sales.ravel(),
+    })
+    forecaster = Forecaster(horizon=28, cache_dir="forecast_cache")
+    for batch in forecaster.forecast(history):
+        print(batch.head(3))
+    print(forecaster.last_run)
+
+    # A day later only the new day is folded into each cached state
+    new_day = history[history["date"] == dates[-1]].assign(date=dates[-1] + pd.Timedelta(days=1))
+    forecaster.forecast_frame(pd.concat([history, new_day]))
+    print(forecaster.last_run)